@@ -0,0 +1,124 @@
+/**
+ * Akrizu Knowledge — Chunk Tagging Micro-Benchmark
+ * Times tag/priority detection and task-hint detection over every chunk of
+ * the real knowledge base: the keyword automaton (helpers/keyword-matcher.mjs)
+ * against the previous per-keyword String#includes / RegExp scans, and
+ * checks that both produce identical results.
+ *
+ * Usage:
+ *   node scripts/bench-chunk-tagging.mjs [--rounds 50]
+ */
+import { relative } from "path";
+import { CONFIG } from "../src/config.mjs";
+import { chunkFile, listKnowledgeFiles, analyzeChunk, TAG_KEYWORDS } from "../src/chunker.mjs";
+import { detectTaskHints } from "../src/helpers/detectors.mjs";
+
+// ─── Previous implementations (reference) ────────────────
+
+function legacyTags(content) {
+  const lower = content.toLowerCase();
+  const tags = new Set();
+  for (const [tag, keywords] of Object.entries(TAG_KEYWORDS)) {
+    for (const kw of keywords) {
+      if (lower.includes(kw)) {
+        tags.add(tag);
+        break;
+      }
+    }
+  }
+  return [...tags];
+}
+
+function legacyPriority(content, category) {
+  const lower = content.toLowerCase();
+  if (lower.includes("critical") || lower.includes("hard rule") || lower.includes("must") || lower.includes("mandatory")) {
+    return "critical";
+  }
+  if (lower.includes("important") || lower.includes("required") || lower.includes("should")) {
+    return "high";
+  }
+  if (category === "template") return "medium";
+  return "normal";
+}
+
+function legacyHints(task) {
+  const hints = new Set();
+  if (/\bmvp\b|init-mvp|minimum viable product/i.test(task)) hints.add("mvp");
+  if (/\b(debug|error|fix|bug|issue|fail|broken|hover)\b/i.test(task)) hints.add("debug");
+  if (/\b(create|build|add|make|scaffold|implement)\b/i.test(task)) hints.add("create");
+  if (/\b(admin|package|npm|library)\b/i.test(task)) hints.add("admin");
+  return hints;
+}
+
+// ─── Harness ─────────────────────────────────────────────
+
+function time(label, rounds, fn) {
+  fn(); // warm-up (JIT)
+  const started = process.hrtime.bigint();
+  for (let i = 0; i < rounds; i++) fn();
+  const ms = Number(process.hrtime.bigint() - started) / 1e6 / rounds;
+  return { label, ms };
+}
+
+function same(a, b) {
+  return a.length === b.length && a.every((v, i) => v === b[i]);
+}
+
+async function main() {
+  const args = process.argv.slice(2);
+  const roundsIdx = args.indexOf("--rounds");
+  const rounds = roundsIdx !== -1 ? parseInt(args[roundsIdx + 1], 10) : 50;
+
+  const files = await listKnowledgeFiles();
+  const chunks = files.flatMap((file) => chunkFile(file));
+  const totalChars = chunks.reduce((sum, c) => sum + c.content.length, 0);
+  console.log(`📂 ${relative(process.cwd(), CONFIG.knowledgeBasePath) || "."}: ${files.length} files, `
+    + `${chunks.length} chunks, ${(totalChars / 1024).toFixed(0)} KB`);
+
+  // Same answers first — a fast wrong matcher is not a speedup
+  let mismatches = 0;
+  for (const { content, metadata } of chunks) {
+    const { tags, priority } = analyzeChunk(content, metadata.category);
+    const hints = [...detectTaskHints(content)].sort();
+    if (!same(tags, legacyTags(content))
+      || priority !== legacyPriority(content, metadata.category)
+      || !same(hints, [...legacyHints(content)].sort())) {
+      mismatches++;
+      if (mismatches <= 5) console.error(`❌ Mismatch: ${metadata.source_file} > ${metadata.section}`);
+    }
+  }
+  if (mismatches > 0) {
+    console.error(`❌ ${mismatches} chunk(s) tagged differently`);
+    process.exit(1);
+  }
+  console.log(`✅ Identical tags, priorities and task hints for all ${chunks.length} chunks\n`);
+
+  const results = [
+    ["tags + priority", time("includes", rounds, () => {
+      for (const c of chunks) {
+        legacyTags(c.content);
+        legacyPriority(c.content, c.metadata.category);
+      }
+    }), time("automaton", rounds, () => {
+      for (const c of chunks) analyzeChunk(c.content, c.metadata.category);
+    })],
+    ["task hints", time("regex", rounds, () => {
+      for (const c of chunks) legacyHints(c.content);
+    }), time("automaton", rounds, () => {
+      for (const c of chunks) detectTaskHints(c.content);
+    })],
+  ];
+
+  console.log(`⏱️  Per pass over the corpus (mean of ${rounds} rounds):`);
+  for (const [name, before, after] of results) {
+    const mbPerS = (totalChars / 1e6) / (after.ms / 1000);
+    console.log(`   ${name.padEnd(16)} ${before.label.padEnd(9)} ${before.ms.toFixed(2).padStart(8)} ms  →  `
+      + `${after.label} ${after.ms.toFixed(2).padStart(8)} ms  (${(before.ms / after.ms).toFixed(1)}×, `
+      + `${mbPerS.toFixed(0)} MB/s)`);
+  }
+}
+
+main().catch((err) => {
+  console.error("💥 Benchmark failed:", err.message);
+  process.exit(1);
+});
@@ -4,9 +4,11 @@
  * and attaches rich metadata (tags, category, priority, source).
  */
 import { readFileSync, statSync } from 'fs';
+import { createHash } from 'crypto';
 import { basename, dirname, relative, extname } from 'path';
 import { glob } from 'glob';
 import { CONFIG } from './config.mjs';
+import { KeywordMatcher, patternsFrom } from './helpers/keyword-matcher.mjs';
 
 // ─── Category Detection ─────────────────────────────────
 
@@ -29,7 +31,7 @@ function detectCategory(filePath) {
 
 // ─── Tag Detection (Keyword-Based) ──────────────────────
 
-const TAG_KEYWORDS = {
+export const TAG_KEYWORDS = {
   backend: ['api', 'endpoint', 'server', 'route', 'controller', 'nestjs', 'express'],
   frontend: ['ui', 'component', 'jsx', 'tsx', 'css', 'tailwind', 'shadcn', 'react', 'next.js', 'nextjs'],
   api: ['rest', 'fetch', 'axios', 'http', 'crud', 'get', 'post', 'put', 'delete', 'endpoint'],
@@ -48,32 +50,35 @@ const TAG_KEYWORDS = {
   scalability: ['scalability', 'scale', 'growth', 'modular', 'barrel', 'dry', '3-use'],
 };
 
-function detectTags(content) {
-  const lower = content.toLowerCase();
-  const tags = new Set();
-  for (const [tag, keywords] of Object.entries(TAG_KEYWORDS)) {
-    for (const kw of keywords) {
-      if (lower.includes(kw)) {
-        tags.add(tag);
-        break;
-      }
-    }
-  }
-  return [...tags];
-}
-
 // ─── Priority Detection ─────────────────────────────────
 
-function detectPriority(content, category) {
-  const lower = content.toLowerCase();
-  if (lower.includes('critical') || lower.includes('hard rule') || lower.includes('must') || lower.includes('mandatory')) {
-    return 'critical';
-  }
-  if (lower.includes('important') || lower.includes('required') || lower.includes('should')) {
-    return 'high';
-  }
-  if (category === 'template') return 'medium';
-  return 'normal';
+export const PRIORITY_KEYWORDS = {
+  critical: ['critical', 'hard rule', 'must', 'mandatory'],
+  high: ['important', 'required', 'should'],
+};
+
+// Tag and priority keywords share one automaton, so a chunk is scanned once
+const CHUNK_MATCHER = new KeywordMatcher([
+  ...patternsFrom(TAG_KEYWORDS, { prefix: 'tag:' }),
+  ...patternsFrom(PRIORITY_KEYWORDS, { prefix: 'priority:' }),
+]);
+const TAG_ORDER = Object.keys(TAG_KEYWORDS);
+
+/**
+ * Tags (in TAG_KEYWORDS order) and priority of a chunk from a single scan.
+ * Keywords match anywhere, like String#includes on the lowercased text.
+ * @param {string} content
+ * @param {string} category
+ * @returns {{tags: string[], priority: string}}
+ */
+export function analyzeChunk(content, category) {
+  const found = CHUNK_MATCHER.scan(content);
+  const tags = TAG_ORDER.filter((tag) => found.has(`tag:${tag}`));
+  let priority = 'normal';
+  if (found.has('priority:critical')) priority = 'critical';
+  else if (found.has('priority:high')) priority = 'high';
+  else if (category === 'template') priority = 'medium';
+  return { tags, priority };
 }
 
 // ─── Section Splitter ────────────────────────────────────
@@ -85,7 +90,7 @@ function detectPriority(content, category) {
  * @param {string} filePath - Source file path
  * @returns {Array<{section: string, content: string, lineStart: number}>}
  */
-function splitBySection(content, filePath) {
+export function splitBySection(content, filePath) {
   const lines = content.split('\n');
   const chunks = [];
   let currentH1 = basename(filePath, extname(filePath));
@@ -157,17 +162,75 @@ function splitBySection(content, filePath) {
   return chunks;
 }
 
+// ─── Stable Point IDs ────────────────────────────────────
+
+/**
+ * Deterministic Qdrant point ID for a chunk: the first 52 bits of
+ * sha256("source_file#section#ordinal"), so it is a safe JS integer.
+ * `ordinal` counts earlier sections with the same title in the same file.
+ * Mirrored by point_id() in scripts/akrizu_stack/ingest.py.
+ * @param {string} sourceFile - Relative path, e.g. "rules/coding-standard.md"
+ * @param {string} section
+ * @param {number} [ordinal=0]
+ * @returns {number}
+ */
+export function pointId(sourceFile, section, ordinal = 0) {
+  const hex = createHash('sha256').update(`${sourceFile}#${section}#${ordinal}`).digest('hex');
+  return parseInt(hex.slice(0, 13), 16);
+}
+
 // ─── Main Chunking Pipeline ──────────────────────────────
 
 /**
- * Scan the knowledge base and produce tagged chunks ready for embedding.
- * @returns {Array<{id: string, content: string, metadata: object}>}
+ * Chunk a single markdown file.
+ * @param {string} filePath - Absolute path inside the knowledge base
+ * @returns {Array<{pointId: number, content: string, metadata: object}>}
  */
-export async function chunkKnowledgeBase() {
+export function chunkFile(filePath) {
+  const normalizedPath = filePath.replace(/\\/g, '/');
+  const relPath = relative(CONFIG.knowledgeBasePath, normalizedPath).replace(/\\/g, '/');
+  const content = readFileSync(normalizedPath, 'utf-8');
+  const category = detectCategory(normalizedPath);
+  const stat = statSync(normalizedPath);
+  const seen = new Map();
+
+  return splitBySection(content, normalizedPath).map((section) => {
+    const ordinal = seen.get(section.section) || 0;
+    seen.set(section.section, ordinal + 1);
+    const { tags, priority } = analyzeChunk(section.content, category);
+    return {
+      pointId: pointId(relPath, section.section, ordinal),
+      content: section.content,
+      metadata: {
+        source_file: relPath,
+        section: section.section,
+        category,
+        tags,
+        priority,
+        line_start: section.lineStart,
+        file_size: stat.size,
+        last_modified: stat.mtime.toISOString(),
+        char_count: section.content.length,
+      },
+    };
+  });
+}
+
+/**
+ * List the markdown files of the knowledge base.
+ * @returns {Promise<string[]>}
+ */
+export async function listKnowledgeFiles() {
   const basePath = CONFIG.knowledgeBasePath.replace(/\\/g, '/');
-  const pattern = `${basePath}/**/*.md`;
+  return glob(`${basePath}/**/*.md`, { nodir: true, windowsPathsNoEscape: true });
+}
 
-  const files = await glob(pattern, { nodir: true, windowsPathsNoEscape: true });
+/**
+ * Scan the knowledge base and produce tagged chunks ready for embedding.
+ * @returns {Array<{id: string, pointId: number, content: string, metadata: object}>}
+ */
+export async function chunkKnowledgeBase() {
+  const files = await listKnowledgeFiles();
 
   console.log(`📂 Found ${files.length} markdown files in knowledge base`);
 
@@ -175,33 +238,8 @@ export async function chunkKnowledgeBase() {
   let chunkId = 0;
 
   for (const filePath of files) {
-    const normalizedPath = filePath.replace(/\\/g, '/');
-    const relPath = relative(CONFIG.knowledgeBasePath, normalizedPath).replace(/\\/g, '/');
-    const content = readFileSync(normalizedPath, 'utf-8');
-    const category = detectCategory(normalizedPath);
-    const stat = statSync(normalizedPath);
-
-    const sections = splitBySection(content, normalizedPath);
-
-    for (const section of sections) {
-      const tags = detectTags(section.content);
-      const priority = detectPriority(section.content, category);
-
-      allChunks.push({
-        id: `chunk-${chunkId++}`,
-        content: section.content,
-        metadata: {
-          source_file: relPath,
-          section: section.section,
-          category,
-          tags,
-          priority,
-          line_start: section.lineStart,
-          file_size: stat.size,
-          last_modified: stat.mtime.toISOString(),
-          char_count: section.content.length,
-        },
-      });
+    for (const chunk of chunkFile(filePath)) {
+      allChunks.push({ id: `chunk-${chunkId++}`, ...chunk });
     }
   }
 
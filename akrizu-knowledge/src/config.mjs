@@ -23,6 +23,38 @@ export const CONFIG = {
   ollamaUrl: process.env.OLLAMA_URL || 'http://localhost:11434',
   ollamaEmbedModel: process.env.OLLAMA_EMBED_MODEL || 'nomic-embed-text',
 
+  // Embedding cache (shared with scripts/akrizu_stack; EMBED_CACHE_PATH=off disables it)
+  embedCachePath: process.env.EMBED_CACHE_PATH === 'off'
+    ? ''
+    : resolve(__dirname, '..', process.env.EMBED_CACHE_PATH || '.cache/embeddings.bin'),
+  embedCacheMaxMb: parseInt(process.env.EMBED_CACHE_MAX_MB || '256', 10),
+
+  // Incremental sync state (file mtimes and per-section hashes)
+  syncManifestPath: resolve(__dirname, '..', process.env.SYNC_MANIFEST_PATH || '.cache/sync-manifest.json'),
+
+  // In-memory query cache for /context and /search (QUERY_CACHE_SIZE=0 disables it)
+  queryCacheSize: parseInt(process.env.QUERY_CACHE_SIZE || '500', 10),
+  queryCacheTtlMs: parseInt(process.env.QUERY_CACHE_TTL_SECONDS || '600', 10) * 1000,
+  // Bumped on every collection write so other processes drop cached results
+  collectionVersionPath: resolve(__dirname, '..', process.env.COLLECTION_VERSION_PATH || '.cache/collection-version.json'),
+
+  // Conversation memory file size before it is rotated into memory/archive/ (0 = never)
+  memoryRotateKb: parseInt(process.env.MEMORY_ROTATE_KB || '256', 10),
+
+  // Context packing (prompt injection): default token budget, per-model
+  // overrides as "model=tokens,...", MMR relevance/diversity trade-off and
+  // the shingle similarity at which a chunk counts as a near-duplicate
+  contextTokenBudget: parseInt(process.env.CONTEXT_TOKEN_BUDGET || '4000', 10),
+  contextTokenBudgets: Object.fromEntries(
+    (process.env.CONTEXT_TOKEN_BUDGETS || '')
+      .split(',')
+      .map((entry) => entry.split('='))
+      .filter(([model, tokens]) => model?.trim() && tokens)
+      .map(([model, tokens]) => [model.trim(), parseInt(tokens, 10)]),
+  ),
+  contextMmrLambda: parseFloat(process.env.CONTEXT_MMR_LAMBDA || '0.7'),
+  contextDupThreshold: parseFloat(process.env.CONTEXT_DUP_THRESHOLD || '0.8'),
+
   // Groq
   groqApiKey: process.env.GROQ_API_KEY || '',
 
@@ -0,0 +1,229 @@
+/**
+ * Senior Dev Mind — Token-Budgeted Context Packer
+ * Assembles retrieved chunks into the context block injected into prompts:
+ *   1. exact duplicates (same normalized text) are dropped
+ *   2. chunks are picked greedily by MMR — relevance (priority + search score)
+ *      minus similarity to what is already picked (word-shingle Jaccard);
+ *      near-duplicates above CONTEXT_DUP_THRESHOLD are dropped
+ *   3. picked chunks are packed until the model's token budget is spent;
+ *      critical-priority chunks are always kept
+ * Tokens are counted with js-tiktoken (cl100k_base) when it is installed, else
+ * estimated as length / 4.
+ */
+import { createHash } from "crypto";
+import { CONFIG } from "./config.mjs";
+
+const PRIORITY_WEIGHT = { critical: 1, high: 0.75, medium: 0.5, normal: 0.35 };
+// Words per shingle for the near-duplicate similarity
+const SHINGLE_WORDS = 3;
+const SEPARATOR = "\n\n";
+
+// ─── Token Counting ──────────────────────────────────────
+
+let encoder;
+
+async function loadEncoder() {
+  if (encoder !== undefined) return encoder;
+  try {
+    const { getEncoding } = await import("js-tiktoken");
+    encoder = getEncoding("cl100k_base");
+  } catch (err) {
+    console.warn(`⚠️  js-tiktoken unavailable (${err.message}) — estimating tokens as length / 4`);
+    encoder = null;
+  }
+  return encoder;
+}
+
+/**
+ * Token count of a string.
+ * @param {string} text
+ * @returns {Promise<number>}
+ */
+export async function countTokens(text) {
+  if (!text) return 0;
+  const enc = await loadEncoder();
+  return enc ? enc.encode(text).length : Math.ceil(text.length / 4);
+}
+
+/** Tokenizer used for counts: "cl100k_base" or "estimate" */
+export function tokenizerName() {
+  return encoder ? "cl100k_base" : "estimate";
+}
+
+/**
+ * Token budget for a model: CONTEXT_TOKEN_BUDGETS entry for the exact name,
+ * then for the name without its ":tag" / "groq:" prefix, else CONTEXT_TOKEN_BUDGET.
+ * @param {string} [model]
+ * @returns {number}
+ */
+export function budgetFor(model) {
+  const budgets = CONFIG.contextTokenBudgets;
+  if (model) {
+    const bare = model.replace(/^groq:/, "");
+    for (const name of [model, bare, bare.split(":")[0]]) {
+      if (budgets[name] !== undefined) return budgets[name];
+    }
+  }
+  return CONFIG.contextTokenBudget;
+}
+
+// ─── Redundancy ──────────────────────────────────────────
+
+function normalize(text) {
+  return text.toLowerCase().replace(/\s+/g, " ").trim();
+}
+
+function shingles(text) {
+  const words = normalize(text).split(" ");
+  const set = new Set();
+  if (words.length < SHINGLE_WORDS) {
+    set.add(words.join(" "));
+    return set;
+  }
+  for (let i = 0; i + SHINGLE_WORDS <= words.length; i++) {
+    set.add(words.slice(i, i + SHINGLE_WORDS).join(" "));
+  }
+  return set;
+}
+
+function jaccard(a, b) {
+  const [small, large] = a.size <= b.size ? [a, b] : [b, a];
+  let shared = 0;
+  for (const item of small) {
+    if (large.has(item)) shared++;
+  }
+  const union = a.size + b.size - shared;
+  return union === 0 ? 0 : shared / union;
+}
+
+// ─── Stats (reported on /stats) ──────────────────────────
+
+const stats = {
+  packs: 0,
+  chunksIn: 0,
+  chunksKept: 0,
+  duplicatesDropped: 0,
+  overBudgetDropped: 0,
+  rawTokens: 0,
+  packedTokens: 0,
+  tokensSaved: 0,
+};
+
+export function contextPackerStats() {
+  return {
+    ...stats,
+    tokenizer: tokenizerName(),
+    savingsPercent: stats.rawTokens > 0 ? Math.round((stats.tokensSaved / stats.rawTokens) * 100) : 0,
+  };
+}
+
+// ─── Packing ─────────────────────────────────────────────
+
+function formatChunk(r) {
+  const src = r.payload?.source_file || "";
+  const section = r.payload?.section || "";
+  const content = r.payload?.content || r.content || "";
+  return `[${src} > ${section}]\n${content}`;
+}
+
+/**
+ * Pack retrieved chunks into one context string within a token budget.
+ * @param {Array<{ score?: number, payload: { content: string, source_file: string, section: string, priority?: string } }>} results
+ *   Chunks without a score (loaded by file) count as fully relevant.
+ * @param {object} [options]
+ * @param {number} [options.budget] - Max tokens (defaults to budgetFor(options.model))
+ * @param {string} [options.model] - Target model, for its budget
+ * @param {number} [options.lambda] - MMR trade-off: 1 = relevance only, 0 = diversity only
+ * @param {number} [options.dupThreshold] - Similarity at which a chunk counts as a duplicate
+ * @returns {Promise<{ text: string, kept: Array, rawTokens: number, packedTokens: number, tokensSaved: number, dropped: { duplicate: number, overBudget: number } }>}
+ */
+export async function packContext(results, options = {}) {
+  const {
+    model,
+    budget = budgetFor(model),
+    lambda = CONFIG.contextMmrLambda,
+    dupThreshold = CONFIG.contextDupThreshold,
+  } = options;
+
+  const rawTokens = await countTokens(results.map(formatChunk).join(SEPARATOR));
+
+  // 1. Exact duplicates
+  const seen = new Set();
+  const candidates = [];
+  let duplicate = 0;
+  for (const r of results) {
+    const block = formatChunk(r);
+    const content = r.payload?.content || r.content || "";
+    const hash = createHash("sha1").update(normalize(content)).digest("hex");
+    if (seen.has(hash)) {
+      duplicate++;
+      continue;
+    }
+    seen.add(hash);
+    const priority = r.payload?.priority || "normal";
+    candidates.push({
+      result: r,
+      block,
+      tokens: await countTokens(block),
+      critical: priority === "critical",
+      relevance: ((PRIORITY_WEIGHT[priority] ?? PRIORITY_WEIGHT.normal) + (r.score ?? 1)) / 2,
+      shingles: shingles(content),
+      maxSim: 0,
+    });
+  }
+
+  // 2 + 3. MMR selection within the budget (critical chunks first, always kept)
+  const kept = [];
+  let used = 0;
+  let overBudget = 0;
+  const remaining = new Set(candidates);
+  while (remaining.size > 0) {
+    let best = null;
+    let bestScore = -Infinity;
+    for (const c of remaining) {
+      const mmr = lambda * c.relevance - (1 - lambda) * c.maxSim + (c.critical ? 2 : 0);
+      if (mmr > bestScore) {
+        best = c;
+        bestScore = mmr;
+      }
+    }
+    remaining.delete(best);
+
+    if (best.maxSim >= dupThreshold) {
+      duplicate++;
+      continue;
+    }
+    const cost = best.tokens + (kept.length > 0 ? 1 : 0); // + separator
+    if (!best.critical && used + cost > budget) {
+      overBudget++;
+      continue;
+    }
+    kept.push(best);
+    used += cost;
+    for (const c of remaining) {
+      c.maxSim = Math.max(c.maxSim, jaccard(c.shingles, best.shingles));
+    }
+  }
+
+  const text = kept.map((c) => c.block).join(SEPARATOR);
+  const packedTokens = await countTokens(text);
+  const tokensSaved = Math.max(0, rawTokens - packedTokens);
+
+  stats.packs++;
+  stats.chunksIn += results.length;
+  stats.chunksKept += kept.length;
+  stats.duplicatesDropped += duplicate;
+  stats.overBudgetDropped += overBudget;
+  stats.rawTokens += rawTokens;
+  stats.packedTokens += packedTokens;
+  stats.tokensSaved += tokensSaved;
+
+  return {
+    text,
+    kept: kept.map((c) => c.result),
+    rawTokens,
+    packedTokens,
+    tokensSaved,
+    dropped: { duplicate, overBudget },
+  };
+}
@@ -1,6 +1,6 @@
 import { search } from "../qdrant.mjs";
 import { embed } from "../embedder.mjs";
-import { summarizeContext } from "../summarizer.mjs";
+import { summarizeResults } from "../summarizer.mjs";
 import { printTerminalLog } from "../helpers/pretty-log.mjs";
 import * as loader from "../helpers/context-loader.mjs";
 
@@ -47,7 +47,7 @@ export const getSmartContext = async (req, res) => {
 
 export const getCompressedContext = async (req, res) => {
   try {
-    const { task, limit = 3 } = req.query;
+    const { task, limit = 3, budget, model } = req.query;
     if (!task || typeof task !== "string" || task.trim() === "") {
       return res.status(400).json({ error: "task query param is required." });
     }
@@ -57,16 +57,10 @@ export const getCompressedContext = async (req, res) => {
     const taskResults = await search(vector, { limit: parseInt(limit, 10) });
     const dedupedTaskResults = loader.deduplicateResults(taskResults);
 
-    const fullRaw = [
-      loader.formatRaw(seniorChunks),
-      loader.formatRaw(mvpChunks),
-      loader.formatRaw(debugChunks),
-      loader.formatRaw(createChunks),
-      loader.formatRaw(adminChunks),
-      loader.formatRaw(dedupedTaskResults)
-    ].filter(Boolean).join("\n\n");
-
-    const { compressed, skipped, rawTokens, compressedTokens, tokensSaved } = await summarizeContext(fullRaw);
+    const { compressed, skipped, rawTokens = 0, compressedTokens = 0, tokensSaved, dropped } = await summarizeResults(
+      [...seniorChunks, ...mvpChunks, ...debugChunks, ...createChunks, ...adminChunks, ...dedupedTaskResults],
+      { budget: budget ? parseInt(budget, 10) : undefined, model },
+    );
 
     printTerminalLog({
       timestamp: new Date().toISOString(),
@@ -81,7 +75,7 @@ export const getCompressedContext = async (req, res) => {
     res.json({
       task,
       compressed,
-      compressionStats: { skipped, rawTokens, compressedTokens, tokensSaved, savingsPercent: rawTokens > 0 ? `${Math.round((tokensSaved / rawTokens) * 100)}%` : "0%" },
+      compressionStats: { skipped, rawTokens, compressedTokens, tokensSaved, dropped, savingsPercent: rawTokens > 0 ? `${Math.round((tokensSaved / rawTokens) * 100)}%` : "0%" },
       sources: {
         seniorDevRules: seniorChunks.map(p => ({ file: p.payload.source_file, section: p.payload.section })),
         taskSpecific: dedupedTaskResults.map(r => ({ file: r.payload.source_file, section: r.payload.section, score: parseFloat(r.score.toFixed(4)) })),
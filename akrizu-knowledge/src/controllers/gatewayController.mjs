@@ -1,12 +1,10 @@
 import fetch from "node-fetch";
-import { readFileSync } from "fs";
-import { fileURLToPath } from "url";
-import { dirname, join } from "path";
 import { CONFIG } from "../config.mjs";
 import { embed } from "../embedder.mjs";
 import { search } from "../qdrant.mjs";
 import * as loader from "../helpers/context-loader.mjs";
 import { printTerminalLog } from "../helpers/pretty-log.mjs";
+import { buildSystemPrompt } from "../helpers/system-prompt.mjs";
 import { summarizeResults } from "../summarizer.mjs";
 import { isCasualChat } from "../helpers/detectors.mjs";
 
@@ -40,11 +38,13 @@ export const handleChatCompletion = async (req, res) => {
           .slice(0, 5)
           .join(' ');
         
-        const { seniorChunks, mvpChunks, debugChunks, createChunks, adminChunks } =
-          await loader.loadStandardChunks(userMessage);
-
-        const vector = await embed(userMessage.trim());
-        const taskResults = await search(vector, { limit: 10 }); 
+        // Standard chunks come from an in-memory snapshot; the query
+        // embedding and search run alongside instead of after it
+        const [{ seniorChunks, mvpChunks, debugChunks, createChunks, adminChunks }, taskResults] =
+          await Promise.all([
+            loader.loadStandardChunks(userMessage),
+            embed(userMessage.trim()).then((vector) => search(vector, { limit: 10 })),
+          ]);
         const dedupedTaskResults = loader.deduplicateResults(taskResults);
 
         const allChunks = [
@@ -56,42 +56,27 @@ export const handleChatCompletion = async (req, res) => {
           ...dedupedTaskResults,
         ];
 
-        // Use the summarizer to follow the "Token-Optimized" requirement
-        const { compressed } = await summarizeResults(allChunks);
+        // Pack into the model's token budget (duplicates dropped, critical rules kept)
+        const { compressed, kept = [], rawTokens = 0, compressedTokens = 0, tokensSaved = 0 } =
+          await summarizeResults(allChunks, { model });
         ragContext = compressed;
 
-        sourcesFound = allChunks.map((p) => p.payload.source_file);
+        sourcesFound = kept.map((p) => p.payload.source_file);
 
         printTerminalLog({
           timestamp: new Date().toISOString(),
           endpoint: "/v1/chat/completions",
           task: taskSummary + "...",
-          rulesApplied: allChunks.length,
+          rulesApplied: kept.length,
           topSources: sourcesFound.slice(0, 5),
+          compressionStats: { rawTokens, compressedTokens, savingsPercent: rawTokens > 0 ? `${Math.round((tokensSaved / rawTokens) * 100)}%` : "0%" },
           ip: req.headers["x-forwarded-for"] || req.ip || null,
         });
       }
 
-      // 4. Injection: Read System Prompt from external file
+      // 4. Injection: System Prompt (parsed once, re-read when system-promts.md changes)
       // Always inject the persona rules (Operational Protocols) to prevent monologue leakage
-      const __dirname = dirname(fileURLToPath(import.meta.url));
-      const promptPath = join(__dirname, "../system-promts.md");
-      let contextInstruction = "";
-      try {
-        let rawPrompt = readFileSync(promptPath, "utf-8");
-        
-        // If RAG context is empty (casual chat), remove the RAG section to avoid model confusion
-        if (!ragContext) {
-          rawPrompt = rawPrompt.replace(/### AKRIZU PROJECT KNOWLEDGE \(RAG\)[\s\S]*?---/, "");
-          rawPrompt = rawPrompt.replace("---", "");
-          contextInstruction = rawPrompt.trim();
-        } else {
-          contextInstruction = rawPrompt.replace("{{RAG_CONTEXT}}", ragContext);
-        }
-      } catch (err) {
-        console.error("Failed to load system-promts.md, using minimal fallback", err);
-        contextInstruction = `### OPERATIONAL PROTOCOLS (STRICTLY MANDATORY)\nAct as a Senior Web Developer. NO MONOLOGUE. NO CHAIN OF THOUGHT.`;
-      }
+      const contextInstruction = buildSystemPrompt(ragContext);
 
       // Check if there's already a system message
       const systemIndex = messages.findIndex((m) => m.role === "system");
@@ -13,11 +13,12 @@ export const postMemorySave = async (req, res) => {
         .json({ error: "summary (string or string[]) is required" });
     }
 
-    await saveMemory(task, summary, tags);
+    const id = await saveMemory(task, summary, tags);
 
     res.json({
       status: "ok",
       message: `Memory saved and ingested for: "${task}"`,
+      id,
       task,
       summary,
       tags,
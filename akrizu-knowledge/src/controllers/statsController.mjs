@@ -1,5 +1,7 @@
 import { getStats, scrollAll } from "../qdrant.mjs";
 import { CONFIG } from "../config.mjs";
+import { queryCacheStats } from "../query-cache.mjs";
+import { contextPackerStats } from "../context-packer.mjs";
 
 export const getHealth = async (req, res) => {
   try {
@@ -26,6 +28,8 @@ export const getStatsHandler = async (req, res) => {
       vectorSize: CONFIG.vectorSize,
       segmentsCount: stats.segments_count,
       indexedVectorsCount: stats.indexed_vectors_count,
+      queryCache: queryCacheStats(),
+      contextPacker: contextPackerStats(),
     });
   } catch (err) {
     res.status(500).json({ error: err.message });
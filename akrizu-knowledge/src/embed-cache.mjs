@@ -0,0 +1,241 @@
+/**
+ * Senior Dev Mind — Embedding Cache
+ * Content-addressed on-disk cache of embedding vectors, shared by ingest,
+ * sync, memory saves and the Python tooling (scripts/akrizu_stack/embed_cache.py).
+ *
+ * File format (little-endian, append-only):
+ *   header  "AKEMB001"                                                  8 bytes
+ *   record  key (32, sha256) | last_used f64 (8) | dim u32 (4) | marker u32 (4) | float32[dim]
+ *
+ * key = sha256(model + "\0" + dim + "\0" + text)
+ * When the file outgrows the size cap it is rewritten keeping the most
+ * recently used vectors (LRU compaction).
+ */
+import {
+  openSync, closeSync, readSync, writeSync, fstatSync, statSync,
+  mkdirSync, renameSync, existsSync, writeFileSync,
+} from 'fs';
+import { createHash } from 'crypto';
+import { dirname } from 'path';
+import { CONFIG } from './config.mjs';
+
+const MAGIC = Buffer.from('AKEMB001');
+const RECORD_HEADER = 48;
+const RECORD_MARKER = 0xae4b1d5e;
+const MAX_DIM = 1 << 16;
+// Compaction shrinks the file to this fraction of the cap
+const COMPACT_TARGET = 0.8;
+
+/**
+ * Cache key for a text embedded with a given model and dimension.
+ * @param {string} model - Provider/model id, e.g. "ollama/nomic-embed-text"
+ * @param {number} dim
+ * @param {string} text
+ * @returns {string} hex sha256
+ */
+export function cacheKey(model, dim, text) {
+  return createHash('sha256').update(`${model}\0${dim}\0${text}`).digest('hex');
+}
+
+function recordSize(dim) {
+  return RECORD_HEADER + dim * 4;
+}
+
+function encodeRecord(key, lastUsed, vector) {
+  const buf = Buffer.alloc(recordSize(vector.length));
+  buf.write(key, 0, 'hex');
+  buf.writeDoubleLE(lastUsed, 32);
+  buf.writeUInt32LE(vector.length, 40);
+  buf.writeUInt32LE(RECORD_MARKER, 44);
+  for (let i = 0; i < vector.length; i++) {
+    buf.writeFloatLE(vector[i], RECORD_HEADER + i * 4);
+  }
+  return buf;
+}
+
+export class EmbeddingCache {
+  /**
+   * @param {string} path - Cache file
+   * @param {object} [options]
+   * @param {number} [options.maxBytes=256MB] - Size cap before LRU compaction
+   */
+  constructor(path, { maxBytes = 256 * 1024 * 1024 } = {}) {
+    this.path = path;
+    this.maxBytes = maxBytes;
+    this.entries = new Map(); // key → { offset, lastUsed, vector: Float32Array }
+    this.appendFd = null; // O_APPEND: safe concurrent appends across processes
+    this.touchFd = null; // positional writes for last_used
+    this.ino = null;
+    this.scanned = 0;
+    this.hits = 0;
+    this.misses = 0;
+    this.damaged = false;
+  }
+
+  open() {
+    mkdirSync(dirname(this.path), { recursive: true });
+    if (!existsSync(this.path) || statSync(this.path).size === 0) {
+      writeFileSync(this.path, MAGIC);
+    }
+    this.appendFd = openSync(this.path, 'a');
+    this.touchFd = openSync(this.path, 'r+');
+    const stat = fstatSync(this.touchFd);
+    this.ino = stat.ino;
+    this.entries.clear();
+    this.scanned = 0;
+    this.damaged = false;
+
+    const magic = Buffer.alloc(MAGIC.length);
+    readSync(this.touchFd, magic, 0, MAGIC.length, 0);
+    if (!magic.equals(MAGIC)) {
+      // Not ours (or truncated) — start over rather than misread vectors
+      this.close();
+      renameSync(this.path, `${this.path}.corrupt`);
+      return this.open();
+    }
+    this.scanned = MAGIC.length;
+    this._scan(stat.size);
+    return this;
+  }
+
+  /** Index records between the last scanned offset and `size` */
+  _scan(size) {
+    if (size <= this.scanned) return;
+    const buf = Buffer.alloc(size - this.scanned);
+    readSync(this.touchFd, buf, 0, buf.length, this.scanned);
+
+    let pos = 0;
+    while (pos + RECORD_HEADER <= buf.length) {
+      const dim = buf.readUInt32LE(pos + 40);
+      if (buf.readUInt32LE(pos + 44) !== RECORD_MARKER || dim === 0 || dim > MAX_DIM) {
+        // Garbage in the middle of the file: the next put() rewrites it
+        this.damaged = true;
+        break;
+      }
+      const end = pos + recordSize(dim);
+      if (end > buf.length) break; // Partially written by another process
+      const key = buf.toString('hex', pos, pos + 32);
+      this.entries.set(key, {
+        offset: this.scanned + pos,
+        lastUsed: buf.readDoubleLE(pos + 32),
+        vector: new Float32Array(buf.buffer, buf.byteOffset + pos + RECORD_HEADER, dim).slice(),
+      });
+      pos = end;
+    }
+    this.scanned += pos;
+  }
+
+  /** Pick up records appended (or a compaction done) by other processes */
+  refresh() {
+    let stat;
+    try {
+      stat = statSync(this.path);
+    } catch {
+      return this.open();
+    }
+    if (stat.ino !== this.ino) {
+      this.close();
+      return this.open();
+    }
+    this._scan(stat.size);
+    return this;
+  }
+
+  /**
+   * @returns {number[]|null} Cached vector or null
+   */
+  get(model, dim, text) {
+    const key = cacheKey(model, dim, text);
+    let entry = this.entries.get(key);
+    if (!entry) {
+      this.refresh();
+      entry = this.entries.get(key);
+    }
+    if (!entry || entry.vector.length !== dim) {
+      this.misses++;
+      return null;
+    }
+    this.hits++;
+    entry.lastUsed = Date.now() / 1000;
+    const stamp = Buffer.alloc(8);
+    stamp.writeDoubleLE(entry.lastUsed, 0);
+    writeSync(this.touchFd, stamp, 0, 8, entry.offset + 32);
+    return Array.from(entry.vector);
+  }
+
+  /** Store a vector computed for `text` */
+  put(model, dim, text, vector) {
+    if (vector.length !== dim) return;
+    const key = cacheKey(model, dim, text);
+    writeSync(this.appendFd, encodeRecord(key, Date.now() / 1000, vector));
+    this.refresh();
+    if (this.damaged || this.scanned > this.maxBytes) this.compact();
+  }
+
+  /** Rewrite the file with the most recently used entries that fit in the target size */
+  compact(targetBytes = this.maxBytes * COMPACT_TARGET) {
+    this.refresh();
+    const ranked = [...this.entries.entries()].sort((a, b) => b[1].lastUsed - a[1].lastUsed);
+    const parts = [MAGIC];
+    let size = MAGIC.length;
+    for (const [key, entry] of ranked) {
+      const bytes = recordSize(entry.vector.length);
+      if (size + bytes > targetBytes) break;
+      parts.push(encodeRecord(key, entry.lastUsed, entry.vector));
+      size += bytes;
+    }
+    const tmp = `${this.path}.${process.pid}.tmp`;
+    writeFileSync(tmp, Buffer.concat(parts));
+    try {
+      renameSync(tmp, this.path);
+    } catch (err) {
+      // Windows refuses to replace a file another process has open
+      console.warn(`⚠️  Embedding cache compaction skipped: ${err.message}`);
+      return;
+    }
+    this.close();
+    this.open();
+  }
+
+  stats() {
+    const lookups = this.hits + this.misses;
+    return {
+      entries: this.entries.size,
+      bytes: this.scanned,
+      hits: this.hits,
+      misses: this.misses,
+      hitRate: lookups ? this.hits / lookups : 0,
+    };
+  }
+
+  close() {
+    for (const fd of [this.appendFd, this.touchFd]) {
+      if (fd !== null) closeSync(fd);
+    }
+    this.appendFd = null;
+    this.touchFd = null;
+  }
+}
+
+// ─── Shared instance ─────────────────────────────────────
+
+let shared;
+
+/**
+ * Process-wide cache from CONFIG, or null when disabled (EMBED_CACHE_PATH=off)
+ * or unusable.
+ * @returns {EmbeddingCache|null}
+ */
+export function getEmbeddingCache() {
+  if (shared !== undefined) return shared;
+  shared = null;
+  if (!CONFIG.embedCachePath) return shared;
+  try {
+    shared = new EmbeddingCache(CONFIG.embedCachePath, {
+      maxBytes: CONFIG.embedCacheMaxMb * 1024 * 1024,
+    }).open();
+  } catch (err) {
+    console.warn(`⚠️  Embedding cache disabled: ${err.message}`);
+  }
+  return shared;
+}
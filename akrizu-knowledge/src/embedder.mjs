@@ -2,8 +2,35 @@
  * Senior Dev Mind — Embedding Provider
  * Supports: Ollama (local) and Groq (cloud).
  * Falls back from Ollama → Groq automatically.
+ * Vectors from the configured provider are kept in the on-disk embedding
+ * cache (embed-cache.mjs), so unchanged text is never re-embedded, and
+ * repeated queries are answered from memory (query-cache.mjs).
  */
 import { CONFIG } from './config.mjs';
+import { getEmbeddingCache } from './embed-cache.mjs';
+import { getCachedEmbedding, putCachedEmbedding } from './query-cache.mjs';
+
+// Texts per Ollama /api/embed request
+const OLLAMA_BATCH_SIZE = 32;
+
+/**
+ * Identifier of the configured embedding model, part of every cache key.
+ * @returns {string}
+ */
+export function embeddingModelId() {
+  switch (CONFIG.embeddingProvider) {
+    case 'ollama':
+      return `ollama/${CONFIG.ollamaEmbedModel}`;
+    case 'gemini':
+      return 'gemini/gemini-embedding-001';
+    case 'openai':
+      return 'openai/text-embedding-3-small';
+    case 'huggingface':
+      return `huggingface/${CONFIG.huggingfaceModel}`;
+    default:
+      return CONFIG.embeddingProvider;
+  }
+}
 
 /**
  * Get embedding vector for a text string.
@@ -11,44 +38,123 @@ import { CONFIG } from './config.mjs';
  * @returns {Promise<number[]>} - The embedding vector (768-dim)
  */
 export async function embed(text) {
+  const model = embeddingModelId();
+  const recent = getCachedEmbedding(model, text);
+  if (recent) return recent;
+
+  const cache = getEmbeddingCache();
+  const cached = cache?.get(model, CONFIG.vectorSize, text);
+  if (cached) {
+    putCachedEmbedding(model, text, cached);
+    return cached;
+  }
+
+  const { vector, fallback } = await embedUncached(text);
+  // Never cache the sparse fallback under the primary model's key
+  if (!fallback) {
+    cache?.put(model, CONFIG.vectorSize, text, vector);
+    putCachedEmbedding(model, text, vector);
+  }
+  return vector;
+}
+
+async function embedUncached(text) {
   const provider = CONFIG.embeddingProvider;
 
   try {
     if (provider === 'ollama') {
-      return await embedWithOllama(text);
+      return { vector: await embedWithOllama(text) };
     } else if (provider === 'groq') {
-      return await embedWithGroq(text);
+      return { vector: await embedWithGroq(text) };
     } else if (provider === 'gemini') {
-      return await embedWithGemini(text);
+      return { vector: await embedWithGemini(text) };
     } else if (provider === 'openai') {
-      return await embedWithOpenAI(text);
+      return { vector: await embedWithOpenAI(text) };
     } else if (provider === 'huggingface') {
-      return await embedWithHuggingFace(text);
+      return { vector: await embedWithHuggingFace(text) };
     }
     throw new Error(`Unknown embedding provider: ${provider}`);
   } catch (err) {
     // Auto-fallback: Ollama fails → try Groq
     if (provider === 'ollama' && CONFIG.groqApiKey) {
       console.warn(`⚠️  Ollama failed, falling back to Groq: ${err.message}`);
-      return await embedWithGroq(text);
+      return { vector: await embedWithGroq(text), fallback: true };
     }
     throw err;
   }
 }
 
 /**
- * Batch embed multiple texts.
+ * Batch embed multiple texts. Cached texts are served from disk; with
+ * Ollama the rest go out as multi-input /api/embed requests.
  * @param {string[]} texts - Array of texts to embed
  * @returns {Promise<number[][]>} - Array of embedding vectors
  */
 export async function embedBatch(texts) {
-  const results = [];
-  for (const text of texts) {
-    results.push(await embed(text));
+  const cache = getEmbeddingCache();
+  const model = embeddingModelId();
+  const results = new Array(texts.length);
+  const missing = [];
+
+  texts.forEach((text, i) => {
+    const cached = cache?.get(model, CONFIG.vectorSize, text);
+    if (cached) results[i] = cached;
+    else missing.push(i);
+  });
+
+  if (missing.length > 0 && CONFIG.embeddingProvider === 'ollama') {
+    for (let start = 0; start < missing.length; start += OLLAMA_BATCH_SIZE) {
+      const slice = missing.slice(start, start + OLLAMA_BATCH_SIZE);
+      let vectors;
+      try {
+        vectors = await embedManyWithOllama(slice.map((i) => texts[i]));
+      } catch {
+        continue; // embedded one by one below (with the Groq fallback)
+      }
+      slice.forEach((i, j) => {
+        results[i] = vectors[j];
+        cache?.put(model, CONFIG.vectorSize, texts[i], vectors[j]);
+      });
+    }
+  }
+
+  for (const i of missing) {
+    if (!results[i]) results[i] = await embed(texts[i]);
   }
   return results;
 }
 
+/**
+ * Embed chunks for ingestion, reporting failures per chunk instead of
+ * aborting the whole run.
+ * @param {Array<{content: string}>} chunks
+ * @param {(done: number, total: number) => void} [onProgress]
+ * @returns {Promise<{vectors: Array<number[]|null>, errors: Array<{index: number, error: Error}>}>}
+ */
+export async function embedChunks(chunks, onProgress = () => {}) {
+  const vectors = new Array(chunks.length).fill(null);
+  const errors = [];
+
+  for (let start = 0; start < chunks.length; start += OLLAMA_BATCH_SIZE) {
+    const slice = chunks.slice(start, start + OLLAMA_BATCH_SIZE);
+    try {
+      const batch = await embedBatch(slice.map((c) => c.content));
+      batch.forEach((v, j) => { vectors[start + j] = v; });
+    } catch {
+      // Isolate the failing chunk(s)
+      for (let j = 0; j < slice.length; j++) {
+        try {
+          vectors[start + j] = await embed(slice[j].content);
+        } catch (error) {
+          errors.push({ index: start + j, error });
+        }
+      }
+    }
+    onProgress(Math.min(start + OLLAMA_BATCH_SIZE, chunks.length), chunks.length);
+  }
+  return { vectors, errors };
+}
+
 // ─── Ollama ──────────────────────────────────────────────
 
 async function embedWithOllama(text) {
@@ -77,6 +183,28 @@ async function embedWithOllama(text) {
   throw new Error('Ollama returned no embeddings');
 }
 
+async function embedManyWithOllama(texts) {
+  const res = await fetch(`${CONFIG.ollamaUrl}/api/embed`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      model: CONFIG.ollamaEmbedModel,
+      input: texts,
+    }),
+  });
+
+  if (!res.ok) {
+    const body = await res.text();
+    throw new Error(`Ollama embed failed (${res.status}): ${body}`);
+  }
+
+  const data = await res.json();
+  if (!data.embeddings || data.embeddings.length !== texts.length) {
+    throw new Error(`Ollama returned ${data.embeddings?.length || 0} embeddings for ${texts.length} inputs`);
+  }
+  return data.embeddings;
+}
+
 // ─── Gemini ────────────────────────────────────────────────
 
 async function embedWithGemini(text) {
@@ -1,34 +1,113 @@
-import { scrollByFile } from "../qdrant.mjs";
-import { isMvpTask, isDebugTask, isCreateTask, isAdminTask } from "./detectors.mjs";
+import { statSync } from "fs";
+import { resolve } from "path";
+import { chunkFile } from "../chunker.mjs";
+import { CONFIG } from "../config.mjs";
+import { scrollByFiles } from "../qdrant.mjs";
+import { collectionVersion } from "../query-cache.mjs";
+import { detectTaskHints } from "./detectors.mjs";
+
+// Rule files injected by task hint ("senior" is always included)
+const STANDARD_FILES = {
+  senior: ["workflows/senior-dev-rules.md"],
+  mvp: ["rules/mvp-workflows.md"],
+  debug: ["rules/trace-logs-explain-fix.md", "rules/troubleshooting.md"],
+  create: ["rules/create-feature.md"],
+  admin: [],
+};
+const ALL_STANDARD_FILES = Object.values(STANDARD_FILES).flat();
+
+// ─── Standard Chunk Snapshot ─────────────────────────────
+// The standard files are scrolled once and kept in memory. A refresh checks
+// each file's scrolled chunks against the file's current sections on disk
+// and only then records the file's stat as confirmed. When the collection
+// version moves, the snapshot is refreshed only if a standard file is not
+// confirmed at its current stat: an edit not yet (or not fully) indexed
+// keeps it refreshing until Qdrant matches, whichever ingester writes it.
+// Memory saves and writes to other files leave it alone. A refresh runs in
+// the background while the old snapshot is served, so requests never wait
+// on Qdrant for these files after the first load.
+
+const STANDARD_CHUNK_LIMIT = 50; // per file
+
+let snapshot = null; // { version, confirmed: Map<file, stat stamp | undefined>, byFile: Map<file, points> }
+let refreshing = null;
+
+function statStamp(file) {
+  try {
+    const st = statSync(resolve(CONFIG.knowledgeBasePath, file));
+    return `${st.ino}:${st.mtimeMs}:${st.size}`;
+  } catch {
+    return null;
+  }
+}
+
+/** Whether the scrolled points are exactly the file's current sections (none if it is gone) */
+function matchesDisk(file, points) {
+  let chunks = [];
+  try {
+    chunks = chunkFile(resolve(CONFIG.knowledgeBasePath, file)).slice(0, STANDARD_CHUNK_LIMIT);
+  } catch {
+    // Missing file: only an empty scroll matches
+  }
+  return chunks.length === points.length && chunks.every((chunk, i) =>
+    chunk.content === points[i].payload.content && chunk.metadata.line_start === points[i].payload.line_start);
+}
+
+function refreshSnapshot() {
+  refreshing ??= (async () => {
+    const version = collectionVersion();
+    // Stat before scrolling: an edit landing mid-refresh leaves the file unconfirmed
+    const stamps = new Map(ALL_STANDARD_FILES.map((file) => [file, statStamp(file)]));
+    const byFile = await scrollByFiles(ALL_STANDARD_FILES, STANDARD_CHUNK_LIMIT);
+    const confirmed = new Map(ALL_STANDARD_FILES.map((file) =>
+      [file, matchesDisk(file, byFile.get(file)) ? stamps.get(file) : undefined]));
+    snapshot = { version, confirmed, byFile };
+    return snapshot;
+  })().finally(() => {
+    refreshing = null;
+  });
+  return refreshing;
+}
+
+function snapshotStale() {
+  return ALL_STANDARD_FILES.some((file) => snapshot.confirmed.get(file) !== statStamp(file));
+}
+
+async function standardSnapshot() {
+  if (!snapshot) return refreshing ?? refreshSnapshot();
+  const version = collectionVersion();
+  if (snapshot.version !== version && !refreshing) {
+    if (snapshotStale()) {
+      refreshSnapshot().catch((err) => console.warn(`⚠️  Standard chunk refresh failed: ${err.message}`));
+    } else {
+      snapshot.version = version;
+    }
+  }
+  return snapshot;
+}
 
 /**
  * Loads standard context chunks based on the task description.
  */
 export async function loadStandardChunks(task) {
-  const seniorChunks = await scrollByFile("workflows/senior-dev-rules.md");
-  const mvpChunks = isMvpTask(task) ? await scrollByFile("rules/mvp-workflows.md") : [];
-  const debugChunks = isDebugTask(task) ? [
-    ...(await scrollByFile("rules/trace-logs-explain-fix.md")),
-    ...(await scrollByFile("rules/troubleshooting.md")),
-  ] : [];
-  const createChunks = isCreateTask(task) ? await scrollByFile("rules/create-feature.md") : [];
-  const adminChunks = isAdminTask(task) ? [] : [];
+  const hints = detectTaskHints(task);
+  const { byFile } = await standardSnapshot();
+  const chunksOf = (key, on = true) => (on ? STANDARD_FILES[key].flatMap((file) => byFile.get(file) || []) : []);
 
-  return { seniorChunks, mvpChunks, debugChunks, createChunks, adminChunks };
+  return {
+    seniorChunks: chunksOf("senior"),
+    mvpChunks: chunksOf("mvp", hints.has("mvp")),
+    debugChunks: chunksOf("debug", hints.has("debug")),
+    createChunks: chunksOf("create", hints.has("create")),
+    adminChunks: chunksOf("admin", hints.has("admin")),
+  };
 }
 
 /**
  * Deduplicates task-specific results against standard chunks.
  */
 export function deduplicateResults(taskResults) {
-  return taskResults.filter(r => {
-    const file = r.payload.source_file;
-    return file !== "workflows/senior-dev-rules.md" &&
-           file !== "rules/mvp-workflows.md" &&
-           file !== "rules/trace-logs-explain-fix.md" &&
-           file !== "rules/troubleshooting.md" &&
-           file !== "rules/create-feature.md";
-  });
+  return taskResults.filter(r => !ALL_STANDARD_FILES.includes(r.payload.source_file));
 }
 
 /**
@@ -1,17 +1,38 @@
+import { KeywordMatcher } from "./keyword-matcher.mjs";
+
+// Task hints: every detector's keywords in one automaton, so a task is scanned once
+const word = (label, ...keywords) => keywords.map((keyword) => ({ keyword, label, wholeWord: true }));
+const TASK_MATCHER = new KeywordMatcher([
+  // MVP-related tasks
+  ...word("mvp", "mvp"),
+  { keyword: "init-mvp", label: "mvp" },
+  { keyword: "minimum viable product", label: "mvp" },
+  // Debugging-related tasks
+  ...word("debug", "debug", "error", "fix", "bug", "issue", "fail", "broken", "hover"),
+  // Creation/build tasks
+  ...word("create", "create", "build", "add", "make", "scaffold", "implement"),
+  // Admin/package tasks
+  ...word("admin", "admin", "package", "npm", "library"),
+]);
+
+/**
+ * Which task hints (mvp, debug, create, admin) apply to a task description.
+ * @param {string} [task]
+ * @returns {Set<string>}
+ */
+export const detectTaskHints = (task = "") => TASK_MATCHER.scan(task);
+
 // Simple keyword detector for MVP-related tasks
-export const isMvpTask = (task = "") => /\bmvp\b|init-mvp|minimum viable product/i.test(task);
+export const isMvpTask = (task = "") => detectTaskHints(task).has("mvp");
 
 // Simple keyword detector for debugging-related tasks
-export const isDebugTask = (task = "") =>
-  /\b(debug|error|fix|bug|issue|fail|broken|hover)\b/i.test(task);
+export const isDebugTask = (task = "") => detectTaskHints(task).has("debug");
 
 // Simple keyword detector for creation/build tasks
-export const isCreateTask = (task = "") =>
-  /\b(create|build|add|make|scaffold|implement)\b/i.test(task);
+export const isCreateTask = (task = "") => detectTaskHints(task).has("create");
 
 // Simple keyword detector for admin/package tasks
-export const isAdminTask = (task = "") =>
-  /\b(admin|package|npm|library)\b/i.test(task);
+export const isAdminTask = (task = "") => detectTaskHints(task).has("admin");
 
 // Detector for casual greetings and non-technical chat
 export const isCasualChat = (message = "") => {
@@ -0,0 +1,130 @@
+/**
+ * Senior Dev Mind — Keyword Matcher
+ * Aho–Corasick automaton over many keywords at once: one left-to-right scan
+ * of the lowercased text finds every keyword, however many there are.
+ * Built once at module load by chunker.mjs (tags + priority) and
+ * helpers/detectors.mjs (task hints).
+ */
+
+function isWordChar(code) {
+  return (code >= 48 && code <= 57) // 0-9
+    || (code >= 65 && code <= 90) // A-Z
+    || (code >= 97 && code <= 122) // a-z
+    || code === 95; // _
+}
+
+export class KeywordMatcher {
+  /**
+   * @param {Array<{keyword: string, label: string, wholeWord?: boolean}>} patterns
+   *   `wholeWord` requires a word boundary on both sides, like /\bkeyword\b/.
+   */
+  constructor(patterns) {
+    this.patterns = patterns.map((p) => ({ ...p, keyword: p.keyword.toLowerCase() }));
+    this.labels = [...new Set(this.patterns.map((p) => p.label))];
+    const labelIds = new Map(this.labels.map((label, id) => [label, id]));
+    this.labelOf = Int32Array.from(this.patterns, (p) => labelIds.get(p.label));
+
+    // Character classes: 0 = any char that occurs in no keyword (always back to the root)
+    this.classOf = new Uint16Array(65536);
+    let classes = 1;
+    for (const { keyword } of this.patterns) {
+      for (let i = 0; i < keyword.length; i++) {
+        const code = keyword.charCodeAt(i);
+        if (this.classOf[code] === 0) this.classOf[code] = classes++;
+      }
+    }
+    this.classes = classes;
+
+    // Trie
+    const children = [new Map()];
+    const out = [[]];
+    this.patterns.forEach((pattern, index) => {
+      let state = 0;
+      for (let i = 0; i < pattern.keyword.length; i++) {
+        const cls = this.classOf[pattern.keyword.charCodeAt(i)];
+        let target = children[state].get(cls);
+        if (target === undefined) {
+          target = children.length;
+          children.push(new Map());
+          out.push([]);
+          children[state].set(cls, target);
+        }
+        state = target;
+      }
+      out[state].push(index);
+    });
+
+    // Breadth-first over the trie: fail links (longest proper suffix that is
+    // also a trie path) folded into a dense transition table, so scanning is
+    // one table lookup per character
+    const delta = new Int32Array(children.length * classes);
+    const fail = new Int32Array(children.length);
+    for (const [cls, target] of children[0]) delta[cls] = target;
+    const queue = [...children[0].values()];
+    for (let head = 0; head < queue.length; head++) {
+      const state = queue[head];
+      out[state] = out[state].concat(out[fail[state]]);
+      for (let cls = 1; cls < classes; cls++) {
+        const target = children[state].get(cls);
+        if (target === undefined) {
+          delta[state * classes + cls] = delta[fail[state] * classes + cls];
+        } else {
+          fail[target] = delta[fail[state] * classes + cls];
+          delta[state * classes + cls] = target;
+          queue.push(target);
+        }
+      }
+    }
+    this.delta = delta;
+    this.out = out; // state → indexes of patterns ending here (incl. via fail links)
+  }
+
+  /**
+   * Labels of every pattern found in `text` (case-insensitive).
+   * @param {string} text
+   * @returns {Set<string>}
+   */
+  scan(text) {
+    const lower = text.toLowerCase();
+    const { delta, classOf, classes, out, patterns, labelOf } = this;
+    const found = new Uint8Array(this.labels.length);
+    let remaining = this.labels.length;
+    let state = 0;
+
+    for (let i = 0; i < lower.length && remaining > 0; i++) {
+      state = delta[state * classes + classOf[lower.charCodeAt(i)]];
+      const matches = out[state];
+      if (matches.length === 0) continue;
+
+      for (const index of matches) {
+        if (found[labelOf[index]]) continue;
+        const pattern = patterns[index];
+        if (pattern.wholeWord) {
+          const start = i - pattern.keyword.length + 1;
+          if (start > 0 && isWordChar(lower.charCodeAt(start - 1))) continue;
+          if (i + 1 < lower.length && isWordChar(lower.charCodeAt(i + 1))) continue;
+        }
+        found[labelOf[index]] = 1;
+        remaining--;
+      }
+    }
+
+    const labels = new Set();
+    for (let id = 0; id < found.length; id++) {
+      if (found[id]) labels.add(this.labels[id]);
+    }
+    return labels;
+  }
+}
+
+/**
+ * Patterns for a { label: keywords[] } table.
+ * @param {Record<string, string[]>} table
+ * @param {object} [options]
+ * @param {string} [options.prefix=''] - Prepended to every label
+ * @param {boolean} [options.wholeWord=false]
+ */
+export function patternsFrom(table, { prefix = '', wholeWord = false } = {}) {
+  return Object.entries(table).flatMap(([label, keywords]) =>
+    keywords.map((keyword) => ({ keyword, label: `${prefix}${label}`, wholeWord })));
+}
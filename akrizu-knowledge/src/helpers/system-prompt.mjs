@@ -0,0 +1,62 @@
+/**
+ * Senior Dev Mind — Gateway System Prompt
+ * system-promts.md parsed once into its RAG and casual variants and kept in
+ * memory; the file is re-read only when its mtime or size changes.
+ */
+import { readFileSync, statSync } from "fs";
+import { fileURLToPath } from "url";
+import { dirname, join } from "path";
+
+const __dirname = dirname(fileURLToPath(import.meta.url));
+const PROMPT_PATH = join(__dirname, "../system-promts.md");
+const PLACEHOLDER = "{{RAG_CONTEXT}}";
+const FALLBACK_PROMPT = `### OPERATIONAL PROTOCOLS (STRICTLY MANDATORY)\nAct as a Senior Web Developer. NO MONOLOGUE. NO CHAIN OF THOUGHT.`;
+// How often the file is stat'ed for edits
+const STAT_CHECK_MS = 1000;
+
+let prompt = null; // { stamp, head, tail, casual } — tail is null without a placeholder
+let lastCheck = 0;
+
+function parsePrompt(raw, stamp) {
+  const at = raw.indexOf(PLACEHOLDER);
+  return {
+    stamp,
+    head: at === -1 ? raw : raw.slice(0, at),
+    tail: at === -1 ? null : raw.slice(at + PLACEHOLDER.length),
+    // Without RAG context (casual chat) the RAG section would only confuse the model
+    casual: raw
+      .replace(/### AKRIZU PROJECT KNOWLEDGE \(RAG\)[\s\S]*?---/, "")
+      .replace("---", "")
+      .trim(),
+  };
+}
+
+function currentPrompt() {
+  const now = Date.now();
+  if (prompt && now - lastCheck < STAT_CHECK_MS) return prompt;
+  lastCheck = now;
+  try {
+    const stat = statSync(PROMPT_PATH);
+    const stamp = `${stat.mtimeMs}:${stat.size}`;
+    if (!prompt || prompt.stamp !== stamp) {
+      prompt = parsePrompt(readFileSync(PROMPT_PATH, "utf-8"), stamp);
+    }
+  } catch (err) {
+    if (prompt?.stamp !== null) {
+      console.error("Failed to load system-promts.md, using minimal fallback", err);
+    }
+    prompt = { stamp: null, head: FALLBACK_PROMPT, tail: null, casual: FALLBACK_PROMPT };
+  }
+  return prompt;
+}
+
+/**
+ * System message for a gateway request.
+ * @param {string} ragContext - Compressed RAG context ("" for casual chat)
+ * @returns {string}
+ */
+export function buildSystemPrompt(ragContext) {
+  const { head, tail, casual } = currentPrompt();
+  if (!ragContext) return casual;
+  return tail === null ? head : `${head}${ragContext}${tail}`;
+}
@@ -6,8 +6,9 @@
  */
 import { CONFIG, validateConfig } from './config.mjs';
 import { chunkKnowledgeBase } from './chunker.mjs';
-import { embed } from './embedder.mjs';
-import { ensureCollection, upsertPoints, getStats } from './qdrant.mjs';
+import { embedChunks } from './embedder.mjs';
+import { getEmbeddingCache } from './embed-cache.mjs';
+import { ensureCollection, upsertPoints, batchUpdate, getStats } from './qdrant.mjs';
 
 async function main() {
   console.log('');
@@ -36,32 +37,30 @@ async function main() {
     return;
   }
 
-  // 4. Embed each chunk
+  // 4. Embed chunks (cached vectors are reused, the rest are batched)
   console.log(`🔮 Embedding ${chunks.length} chunks (this may take a moment)...`);
+  const { vectors, errors } = await embedChunks(chunks, (done, total) => {
+    process.stdout.write(`\r   Embedding ${done}/${total}...`);
+  });
   const points = [];
-  let success = 0;
-  let failed = 0;
-
   for (let i = 0; i < chunks.length; i++) {
-    const chunk = chunks[i];
-    try {
-      process.stdout.write(`\r   Embedding ${i + 1}/${chunks.length}...`);
-      const vector = await embed(chunk.content);
-      points.push({
-        id: i + 1, // Qdrant requires integer IDs
-        vector,
-        payload: {
-          content: chunk.content,
-          ...chunk.metadata,
-        },
-      });
-      success++;
-    } catch (err) {
-      console.error(`\n   ❌ Failed to embed chunk "${chunk.metadata.section}" from ${chunk.metadata.source_file}: ${err.message}`);
-      failed++;
-    }
+    if (!vectors[i]) continue;
+    points.push({
+      id: chunks[i].pointId, // Stable per file + section, shared with sync.mjs
+      vector: vectors[i],
+      payload: {
+        content: chunks[i].content,
+        ...chunks[i].metadata,
+      },
+    });
+  }
+  for (const { index, error } of errors) {
+    const chunk = chunks[index];
+    console.error(`\n   ❌ Failed to embed chunk "${chunk.metadata.section}" from ${chunk.metadata.source_file}: ${error.message}`);
   }
-  console.log(`\n   ✅ Embedded: ${success} | ❌ Failed: ${failed}`);
+  const cacheStats = getEmbeddingCache()?.stats();
+  console.log(`\n   ✅ Embedded: ${points.length} | ❌ Failed: ${errors.length}`
+    + (cacheStats ? ` | 💾 Cache hits: ${cacheStats.hits}/${cacheStats.hits + cacheStats.misses}` : ''));
   console.log('');
 
   // 5. Upsert to Qdrant
@@ -71,6 +70,19 @@ async function main() {
     console.log('');
   }
 
+  // Drop points for sections that no longer exist (and sequential IDs from older
+  // ingests); memory.mjs summaries not yet picked up by sync are kept
+  await batchUpdate([{
+    delete: {
+      filter: {
+        must_not: [
+          { has_id: chunks.map((c) => c.pointId) },
+          { key: 'auto_generated', match: { value: true } },
+        ],
+      },
+    },
+  }]);
+
   // 6. Show stats
   const stats = await getStats();
   console.log('╔═══════════════════════════════════════════╗');
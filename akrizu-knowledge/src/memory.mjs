@@ -1,7 +1,14 @@
 /**
  * Senior Dev Mind — Conversation Memory Auto-Append
  * Appends structured conversation summaries to .agent/memory/conversation-summaries.md
- * then auto re-ingests that file into Qdrant so it's searchable via RAG.
+ * and upserts only the new entries into Qdrant so they are searchable via RAG.
+ *
+ * Saves are queued: concurrent saves are appended in one write, embedded in
+ * one batch and upserted in one request. Each entry gets the point ID the
+ * chunker gives that section (pointId of file + section + ordinal), so a
+ * later sync or ingest of the file updates the same points instead of adding
+ * duplicates. Past MEMORY_ROTATE_KB the file is moved to memory/archive/ and
+ * a fresh one is started, so save cost does not grow with the history.
  *
  * Usage (CLI):
  *   node src/memory.mjs --task "build login page" --summary "Used MVVM, created useLogin.ts, added Zod schema"
@@ -11,14 +18,13 @@
  *   POST /memory/save { task, summary, tags? }
  */
 
-import { appendFileSync, existsSync, mkdirSync } from "fs";
-import { resolve, dirname } from "path";
+import { appendFileSync, existsSync, mkdirSync, readFileSync, renameSync, statSync } from "fs";
+import { resolve, dirname, relative, basename, extname } from "path";
 import { fileURLToPath } from "url";
 import { CONFIG } from "./config.mjs";
-import { embed } from "./embedder.mjs";
-import { upsertPoints, scrollAll } from "./qdrant.mjs";
-
-const __dirname = dirname(fileURLToPath(import.meta.url));
+import { embedBatch } from "./embedder.mjs";
+import { upsertPoints, batchUpdate } from "./qdrant.mjs";
+import { analyzeChunk, chunkFile, pointId, splitBySection } from "./chunker.mjs";
 
 // ─── Constants ───────────────────────────────────────────
 const MEMORY_FILE = resolve(
@@ -26,6 +32,13 @@ const MEMORY_FILE = resolve(
   "memory",
   "conversation-summaries.md"
 );
+const MEMORY_REL_PATH = "memory/conversation-summaries.md";
+const ARCHIVE_DIR = resolve(CONFIG.knowledgeBasePath, "memory", "archive");
+const FILE_HEADER = "# Conversation Summaries\nAuto-generated by Senior Dev Mind RAG memory hook.\n";
+// Most entries embedded and upserted together
+const MAX_BATCH = 32;
+// splitBySection() drops sections with this little text
+const MIN_SECTION_CHARS = 30;
 
 // ─── Format Summary Entry ────────────────────────────────
 
@@ -43,82 +56,191 @@ export function formatSummaryEntry(task, summary, tags = []) {
     ? summary.map((s) => `- ${s}`).join("\n")
     : `- ${summary}`;
   const tagLine = tags.length > 0 ? `**Tags**: ${tags.join(", ")}\n` : "";
+  // The heading must stay on one line to remain one section
+  const title = String(task).replace(/\s+/g, " ").trim();
 
-  return `\n## [${date} ${time}] ${task}\n${tagLine}${bullets}\n`;
+  return `\n## [${date} ${time}] ${title}\n${tagLine}${bullets}\n`;
 }
 
-// ─── Append to Memory File ───────────────────────────────
+// ─── Section Index ───────────────────────────────────────
+// What the chunker would see in the memory file: its size, current # title,
+// line count and how often each ## title occurs (for the point ID ordinal).
+// Built from one read of the file; kept up to date as entries are appended,
+// and rebuilt only when someone else changed the file.
 
-/**
- * Appends a summary entry to conversation-summaries.md.
- * Creates the file and directory if they don't exist.
- * @param {string} task
- * @param {string|string[]} summary
- * @param {string[]} [tags=[]]
- */
-export function appendSummary(task, summary, tags = []) {
-  const dir = dirname(MEMORY_FILE);
+let index = null;
 
-  // Ensure directory exists
+function ensureMemoryFile() {
+  const dir = dirname(MEMORY_FILE);
   if (!existsSync(dir)) {
     mkdirSync(dir, { recursive: true });
   }
-
-  // Create file with header if it doesn't exist
   if (!existsSync(MEMORY_FILE)) {
-    appendFileSync(
-      MEMORY_FILE,
-      "# Conversation Summaries\nAuto-generated by Senior Dev Mind RAG memory hook.\n",
-      "utf-8"
-    );
+    appendFileSync(MEMORY_FILE, FILE_HEADER, "utf-8");
     console.log("📄 Created conversation-summaries.md");
   }
+}
+
+function buildIndex() {
+  const content = readFileSync(MEMORY_FILE, "utf-8");
+  const titles = new Map();
+  for (const chunk of splitBySection(content, MEMORY_FILE)) {
+    titles.set(chunk.section, (titles.get(chunk.section) || 0) + 1);
+  }
+  const h1Lines = content.split("\n").filter((line) => /^# /.test(line));
+  return {
+    size: Buffer.byteLength(content, "utf-8"),
+    h1: h1Lines.length > 0
+      ? h1Lines[h1Lines.length - 1].replace(/^# /, "").trim()
+      : basename(MEMORY_FILE, extname(MEMORY_FILE)),
+    newlines: content.split("\n").length - 1,
+    titles,
+  };
+}
 
-  const entry = formatSummaryEntry(task, summary, tags);
-  appendFileSync(MEMORY_FILE, entry, "utf-8");
-  console.log(`✅ Appended summary for: "${task}"`);
+function memoryIndex() {
+  ensureMemoryFile();
+  if (!index || statSync(MEMORY_FILE).size !== index.size) {
+    index = buildIndex();
+  }
+  return index;
 }
 
-// ─── Re-ingest Memory File into Qdrant ───────────────────
+// ─── Append + Ingest a Batch ─────────────────────────────
 
 /**
- * Embeds and upserts the latest summary entry into Qdrant.
- * Uses a lightweight single-entry upsert instead of full re-ingest.
- * @param {string} task
- * @param {string|string[]} summary
- * @param {string[]} [tags=[]]
+ * Appends a batch of entries in one write and upserts the indexable ones.
+ * @param {Array<{task: string, summary: string|string[], tags: string[]}>} entries
+ * @returns {Promise<Array<number|null>>} point ID per entry (null = too short to index)
  */
-export async function ingestSummary(task, summary, tags = []) {
-  const content = formatSummaryEntry(task, summary, tags).trim();
-  const relPath = "memory/conversation-summaries.md";
-
-  // Get current max ID to avoid collision
-  const existing = await scrollAll({ category: "memory", limit: 500 });
-  const maxId = existing.reduce((max, p) => Math.max(max, p.id || 0), 0);
-  const newId = maxId + 1;
-
-  // Embed the summary content
-  const vector = await embed(content);
-
-  // Upsert into Qdrant
-  await upsertPoints([
-    {
-      id: newId,
-      vector,
+async function ingestEntries(entries) {
+  const idx = memoryIndex();
+  const createdAt = new Date().toISOString();
+  const points = [];
+  const ids = [];
+  let text = "";
+
+  for (const { task, summary, tags } of entries) {
+    const entry = formatSummaryEntry(task, summary, tags);
+    const [, heading, ...body] = entry.split("\n");
+    const section = heading.replace(/^## /, "").trim();
+    const sectionText = body.join("\n").trim();
+    // The heading is on the line after the entry's leading newline
+    const lineStart = idx.newlines + 2;
+
+    text += entry;
+    idx.newlines += entry.split("\n").length - 1;
+
+    if (sectionText.length <= MIN_SECTION_CHARS) {
+      ids.push(null);
+      continue;
+    }
+    const ordinal = idx.titles.get(section) || 0;
+    idx.titles.set(section, ordinal + 1);
+
+    // Same content and ID the chunker produces for this section
+    const content = `# ${idx.h1}\n## ${section}\n${sectionText}`;
+    const { tags: detected, priority } = analyzeChunk(content, "memory");
+    const id = pointId(MEMORY_REL_PATH, section, ordinal);
+    ids.push(id);
+    points.push({
+      id,
+      content,
       payload: {
-        content,
-        source_file: relPath,
-        section: task,
+        source_file: MEMORY_REL_PATH,
+        section,
         category: "memory",
-        tags: tags.length > 0 ? tags : ["memory", "conversation"],
-        priority: "normal",
+        tags: tags.length > 0 ? tags : detected.length > 0 ? detected : ["memory", "conversation"],
+        priority,
+        line_start: lineStart,
+        char_count: content.length,
         auto_generated: true,
-        created_at: new Date().toISOString(),
+        created_at: createdAt,
       },
-    },
-  ]);
+    });
+  }
+
+  try {
+    appendFileSync(MEMORY_FILE, text, "utf-8");
+  } catch (err) {
+    index = null; // unknown state — re-read on the next save
+    throw err;
+  }
+  idx.size += Buffer.byteLength(text, "utf-8");
 
-  console.log(`🔮 Ingested summary into Qdrant (id: ${newId})`);
+  if (points.length > 0) {
+    const vectors = await embedBatch(points.map((p) => p.content));
+    await upsertPoints(points.map((p, i) => ({
+      id: p.id,
+      vector: vectors[i],
+      payload: { content: p.content, ...p.payload },
+    })));
+  }
+  return ids;
+}
+
+// ─── Rotation ────────────────────────────────────────────
+
+/**
+ * Moves a full memory file to memory/archive/ and starts a new one. The
+ * archived sections are re-keyed to their new source file; their text is
+ * unchanged, so vectors come from the embedding cache.
+ */
+async function rotateIfNeeded() {
+  const limit = CONFIG.memoryRotateKb * 1024;
+  if (!index || limit <= 0 || index.size < limit) return;
+
+  const stamp = new Date().toISOString().replace(/[-:]/g, "").replace("T", "-").slice(0, 15);
+  const archivePath = resolve(ARCHIVE_DIR, `conversation-summaries-${stamp}.md`);
+  mkdirSync(ARCHIVE_DIR, { recursive: true });
+  renameSync(MEMORY_FILE, archivePath);
+  index = null;
+  ensureMemoryFile();
+
+  const archiveRel = relative(CONFIG.knowledgeBasePath, archivePath).replace(/\\/g, "/");
+  const chunks = chunkFile(archivePath);
+  const vectors = await embedBatch(chunks.map((c) => c.content));
+  await upsertPoints(chunks.map((c, i) => ({
+    id: c.pointId,
+    vector: vectors[i],
+    payload: { content: c.content, ...c.metadata },
+  })));
+  await batchUpdate([{
+    delete: { filter: { must: [{ key: "source_file", match: { value: MEMORY_REL_PATH } }] } },
+  }]);
+  console.log(`🗄️  Rotated conversation summaries → ${archiveRel} (${chunks.length} sections)`);
+}
+
+// ─── Save Queue ──────────────────────────────────────────
+
+const queue = [];
+let draining = null;
+
+async function drain() {
+  while (queue.length > 0) {
+    const batch = queue.splice(0, MAX_BATCH);
+    try {
+      const ids = await ingestEntries(batch);
+      batch.forEach((entry, i) => entry.resolve(ids[i]));
+    } catch (err) {
+      batch.forEach((entry) => entry.reject(err));
+    }
+  }
+  try {
+    await rotateIfNeeded();
+  } catch (err) {
+    console.error(`⚠️  Memory rotation failed: ${err.message}`);
+  }
+}
+
+function scheduleDrain() {
+  // Deferred a tick so saves made together go out as one batch
+  draining ??= Promise.resolve()
+    .then(drain)
+    .finally(() => {
+      draining = null;
+      if (queue.length > 0) scheduleDrain();
+    });
 }
 
 // ─── Main Export: Save Summary ───────────────────────────
@@ -128,19 +250,24 @@ export async function ingestSummary(task, summary, tags = []) {
  * @param {string} task - What was done
  * @param {string|string[]} summary - Key decisions/outcomes
  * @param {string[]} [tags=[]] - Optional tags
+ * @returns {Promise<number|null>} point ID (null if the entry is too short to index)
  */
 export async function saveMemory(task, summary, tags = []) {
   if (!task || !summary) {
     throw new Error("task and summary are required");
   }
 
-  // Step 1 — Append to markdown file (persistent log)
-  appendSummary(task, summary, tags);
-
-  // Step 2 — Ingest into Qdrant (searchable via RAG)
-  await ingestSummary(task, summary, tags);
+  const id = await new Promise((resolve, reject) => {
+    queue.push({ task, summary, tags, resolve, reject });
+    scheduleDrain();
+  });
 
-  console.log(`\n🧠 Memory saved and searchable via RAG for: "${task}"`);
+  if (id === null) {
+    console.log(`⚠️  Memory saved for: "${task}" — too short to be indexed`);
+  } else {
+    console.log(`🧠 Memory saved and searchable via RAG for: "${task}" (id: ${id})`);
+  }
+  return id;
 }
 
 // ─── CLI Mode ────────────────────────────────────────────
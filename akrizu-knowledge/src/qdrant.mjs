@@ -4,6 +4,7 @@
  */
 import { QdrantClient } from "@qdrant/js-client-rest";
 import { CONFIG } from "./config.mjs";
+import { bumpCollectionVersion, cachedSearch, searchKey } from "./query-cache.mjs";
 
 let client = null;
 
@@ -85,32 +86,53 @@ export async function ensureCollection() {
     field_schema: "keyword",
   });
 
+  bumpCollectionVersion();
   console.log(`✅ Collection "${name}" created with indexes`);
   return await qdrant.getCollection(name);
 }
 
 /**
  * Upsert points into the collection.
+ * Every write bumps the collection version, invalidating cached search results.
  * @param {Array<{id: number, vector: number[], payload: object}>} points
  */
 export async function upsertPoints(points) {
   const qdrant = getClient();
   const batchSize = 50;
 
-  for (let i = 0; i < points.length; i += batchSize) {
-    const batch = points.slice(i, i + batchSize);
-    await qdrant.upsert(CONFIG.collection, {
-      wait: true,
-      points: batch,
-    });
-    console.log(
-      `   📤 Upserted batch ${Math.floor(i / batchSize) + 1}/${Math.ceil(points.length / batchSize)}`,
-    );
+  try {
+    for (let i = 0; i < points.length; i += batchSize) {
+      const batch = points.slice(i, i + batchSize);
+      await qdrant.upsert(CONFIG.collection, {
+        wait: true,
+        points: batch,
+      });
+      console.log(
+        `   📤 Upserted batch ${Math.floor(i / batchSize) + 1}/${Math.ceil(points.length / batchSize)}`,
+      );
+    }
+  } finally {
+    bumpCollectionVersion();
+  }
+}
+
+/**
+ * Apply several point operations (set_payload, delete, ...) in one request.
+ * @param {Array<object>} operations - Qdrant batch update operations
+ */
+export async function batchUpdate(operations) {
+  if (operations.length === 0) return;
+  const qdrant = getClient();
+  try {
+    return await qdrant.batchUpdate(CONFIG.collection, { wait: true, operations });
+  } finally {
+    bumpCollectionVersion();
   }
 }
 
 /**
  * Search for similar vectors with optional filters.
+ * Results are cached per (vector, filters, limit) until the collection changes.
  * @param {number[]} vector - Query vector
  * @param {object} [options] - Search options
  * @param {number} [options.limit=5] - Max results
@@ -155,7 +177,8 @@ export async function search(vector, options = {}) {
     searchParams.filter = filter;
   }
 
-  return qdrant.search(CONFIG.collection, searchParams);
+  const key = searchKey(vector, { limit, category, tags, priority, scoreThreshold });
+  return cachedSearch(key, () => qdrant.search(CONFIG.collection, searchParams));
 }
 
 /**
@@ -196,25 +219,71 @@ export async function scrollAll(options = {}) {
 }
 
 /**
- * Scroll all chunks from a specific source file.
+ * Scroll every point matching a filter, following next_page_offset.
+ * @param {object} filter - Qdrant filter
+ * @param {number} [pageSize=256] - Points per scroll request
+ * @returns {Promise<Array>}
+ */
+async function scrollEvery(filter, pageSize = 256) {
+  const qdrant = getClient();
+  const points = [];
+  let offset;
+  do {
+    const result = await qdrant.scroll(CONFIG.collection, {
+      limit: pageSize,
+      with_payload: true,
+      with_vector: false,
+      filter,
+      ...(offset !== undefined && { offset }),
+    });
+    points.push(...result.points);
+    offset = result.next_page_offset ?? undefined;
+  } while (offset !== undefined);
+  return points;
+}
+
+/**
+ * Point IDs are content hashes, so scroll order is not document order:
+ * sort a file's chunks by their line before anything is cut off.
+ */
+function byLineStart(a, b) {
+  return (a.payload.line_start ?? 0) - (b.payload.line_start ?? 0);
+}
+
+/**
+ * Scroll all chunks from a specific source file, in document order.
  * Used by GET /context/smart to always inject senior-dev-rules.md as base.
  * @param {string} sourceFile - Relative source file path e.g. "workflows/senior-dev-rules.md"
- * @param {number} [limit=50] - Max records to return
+ * @param {number} [limit=50] - Max records to return (the first sections of the file)
  * @returns {Promise<Array>}
  */
 export async function scrollByFile(sourceFile, limit = 50) {
-  const qdrant = getClient();
-
-  const result = await qdrant.scroll(CONFIG.collection, {
-    limit,
-    with_payload: true,
-    with_vector: false,
-    filter: {
-      must: [{ key: "source_file", match: { value: sourceFile } }],
-    },
+  const points = await scrollEvery({
+    must: [{ key: "source_file", match: { value: sourceFile } }],
   });
+  return points.sort(byLineStart).slice(0, limit);
+}
 
-  return result.points;
+/**
+ * Scroll the chunks of several source files in one pass.
+ * @param {string[]} sourceFiles - Relative source file paths
+ * @param {number} [limitPerFile=50] - Max records kept per file (the first sections of each)
+ * @returns {Promise<Map<string, Array>>} source file → points in document order
+ */
+export async function scrollByFiles(sourceFiles, limitPerFile = 50) {
+  const byFile = new Map(sourceFiles.map((file) => [file, []]));
+  if (sourceFiles.length === 0) return byFile;
+
+  const points = await scrollEvery({
+    must: [{ key: "source_file", match: { any: sourceFiles } }],
+  });
+  for (const point of points) {
+    byFile.get(point.payload.source_file)?.push(point);
+  }
+  for (const [file, filePoints] of byFile) {
+    byFile.set(file, filePoints.sort(byLineStart).slice(0, limitPerFile));
+  }
+  return byFile;
 }
 
 /**
@@ -222,5 +291,9 @@ export async function scrollByFile(sourceFile, limit = 50) {
  */
 export async function deleteCollection() {
   const qdrant = getClient();
-  return qdrant.deleteCollection(CONFIG.collection);
+  try {
+    return await qdrant.deleteCollection(CONFIG.collection);
+  } finally {
+    bumpCollectionVersion();
+  }
 }
@@ -0,0 +1,209 @@
+/**
+ * Senior Dev Mind — Query Cache
+ * In-memory two-tier cache for the retrieval endpoints:
+ *   embeddings  query text → vector            (per embedding model)
+ *   results     (vector, filters, limit) → hits (per collection version)
+ *
+ * Both tiers are LRU with a TTL. Every write that goes through qdrant.mjs
+ * bumps the collection version; the version file lets writes from other
+ * processes (npm run ingest / sync, the Python ingester) invalidate the
+ * server's result cache too.
+ */
+import { readFileSync, writeFileSync, statSync, mkdirSync, renameSync } from 'fs';
+import { createHash } from 'crypto';
+import { dirname } from 'path';
+import { CONFIG } from './config.mjs';
+
+// How often the version file is re-checked for writes made by other processes
+const VERSION_CHECK_MS = 1000;
+
+export class LruCache {
+  /**
+   * @param {object} [options]
+   * @param {number} [options.maxEntries=500] - 0 disables the cache
+   * @param {number} [options.ttlMs=600000]
+   */
+  constructor({ maxEntries = 500, ttlMs = 600_000 } = {}) {
+    this.maxEntries = maxEntries;
+    this.ttlMs = ttlMs;
+    this.entries = new Map(); // key → { value, expires }; Map order = recency
+    this.hits = 0;
+    this.misses = 0;
+    this.evictions = 0;
+  }
+
+  get(key) {
+    const entry = this.entries.get(key);
+    if (!entry || entry.expires <= Date.now()) {
+      if (entry) this.entries.delete(key);
+      this.misses++;
+      return undefined;
+    }
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    this.hits++;
+    return entry.value;
+  }
+
+  set(key, value) {
+    if (this.maxEntries <= 0) return;
+    this.entries.delete(key);
+    this.entries.set(key, { value, expires: Date.now() + this.ttlMs });
+    while (this.entries.size > this.maxEntries) {
+      this.entries.delete(this.entries.keys().next().value);
+      this.evictions++;
+    }
+  }
+
+  clear() {
+    this.entries.clear();
+  }
+
+  stats() {
+    const lookups = this.hits + this.misses;
+    return {
+      entries: this.entries.size,
+      maxEntries: this.maxEntries,
+      hits: this.hits,
+      misses: this.misses,
+      evictions: this.evictions,
+      hitRate: lookups > 0 ? parseFloat((this.hits / lookups).toFixed(4)) : 0,
+    };
+  }
+}
+
+// ─── Collection Version ──────────────────────────────────
+// The file holds { [collection]: counter }. The server does not trust the
+// counter alone (two writers can race to the same value); any change to the
+// file's identity (rename → new inode, mtime) counts as a new version.
+
+let embeddingCache = null;
+let resultCache = null;
+let localVersion = 0;
+let fileStamp = null;
+let lastCheck = 0;
+
+function readVersionFile() {
+  try {
+    return JSON.parse(readFileSync(CONFIG.collectionVersionPath, 'utf-8'));
+  } catch {
+    return {};
+  }
+}
+
+function stampOf(path) {
+  try {
+    const st = statSync(path);
+    return `${st.ino}:${st.mtimeMs}:${st.size}`;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Record a write to the collection: invalidates this process's result cache
+ * and bumps the shared version file for other processes.
+ * @returns {number} the new local version
+ */
+export function bumpCollectionVersion() {
+  localVersion++;
+  resultCache?.clear();
+  if (!CONFIG.collectionVersionPath) return localVersion;
+  try {
+    const versions = readVersionFile();
+    versions[CONFIG.collection] = (versions[CONFIG.collection] || 0) + 1;
+    mkdirSync(dirname(CONFIG.collectionVersionPath), { recursive: true });
+    const tmp = `${CONFIG.collectionVersionPath}.${process.pid}.tmp`;
+    writeFileSync(tmp, JSON.stringify(versions));
+    renameSync(tmp, CONFIG.collectionVersionPath);
+    fileStamp = stampOf(CONFIG.collectionVersionPath);
+  } catch (err) {
+    console.warn(`⚠️  Could not update collection version file: ${err.message}`);
+  }
+  return localVersion;
+}
+
+/**
+ * Current collection version, picking up writes from other processes
+ * (checked at most once per VERSION_CHECK_MS).
+ * @returns {number}
+ */
+export function collectionVersion() {
+  const now = Date.now();
+  if (CONFIG.collectionVersionPath && now - lastCheck >= VERSION_CHECK_MS) {
+    lastCheck = now;
+    const stamp = stampOf(CONFIG.collectionVersionPath);
+    if (stamp !== fileStamp) {
+      fileStamp = stamp;
+      localVersion++;
+      resultCache?.clear();
+    }
+  }
+  return localVersion;
+}
+
+// ─── Shared Caches ───────────────────────────────────────
+
+function caches() {
+  if (!embeddingCache) {
+    const options = { maxEntries: CONFIG.queryCacheSize, ttlMs: CONFIG.queryCacheTtlMs };
+    embeddingCache = new LruCache(options);
+    resultCache = new LruCache(options);
+  }
+  return { embeddingCache, resultCache };
+}
+
+/** Key for a query embedding */
+export function embeddingKey(model, text) {
+  return `${model}\0${text}`;
+}
+
+/**
+ * Key for a search: sha1 of the float32 vector plus the normalized options.
+ * @param {ArrayLike<number>} vector
+ * @param {object} options
+ */
+export function searchKey(vector, options) {
+  const { limit, category, tags, priority, scoreThreshold } = options;
+  return createHash('sha1')
+    .update(Buffer.from(Float32Array.from(vector).buffer))
+    .update(JSON.stringify([limit, category ?? null, tags ?? null, priority ?? null, scoreThreshold]))
+    .digest('hex');
+}
+
+/** Cached query vector, or undefined */
+export function getCachedEmbedding(model, text) {
+  return caches().embeddingCache.get(embeddingKey(model, text));
+}
+
+export function putCachedEmbedding(model, text, vector) {
+  caches().embeddingCache.set(embeddingKey(model, text), vector);
+}
+
+/**
+ * Return cached search results for `key`, or run `load()` and cache its
+ * result unless the collection changed while it was in flight.
+ * @param {string} key - from searchKey()
+ * @param {() => Promise<Array>} load
+ * @returns {Promise<Array>}
+ */
+export async function cachedSearch(key, load) {
+  const { resultCache: cache } = caches();
+  const version = collectionVersion();
+  const cached = cache.get(key);
+  if (cached) return cached;
+  const results = await load();
+  if (collectionVersion() === version) cache.set(key, results);
+  return results;
+}
+
+/** Hit-rate stats for /stats */
+export function queryCacheStats() {
+  const { embeddingCache: embeddings, resultCache: results } = caches();
+  return {
+    collectionVersion: collectionVersion(),
+    ttlSeconds: Math.round(CONFIG.queryCacheTtlMs / 1000),
+    embeddings: embeddings.stats(),
+    results: results.stats(),
+  };
+}
@@ -1,13 +1,16 @@
 /**
- * Senior Dev Mind — Pass-Through RAG Summarizer (Self-Hosted)
+ * Senior Dev Mind — RAG Context Summarizer (Self-Hosted)
  *
  * Previous versions used Groq for compression.
- * In the Akrizu Engine (VPS), we use raw RAG text because local models
- * like Qwen 2.5 and DeepSeek have large context windows.
+ * In the Akrizu Engine (VPS), context stays 100% local: retrieved chunks are
+ * packed into a token budget by context-packer.mjs (duplicates and
+ * near-duplicates dropped, highest priority/score first) instead of being
+ * rewritten by a model.
  */
+import { countTokens, packContext } from "./context-packer.mjs";
 
 /**
- * Returns raw context as-is.
+ * Returns a pre-assembled context string as-is, with its token count.
  * No longer requires GROQ_API_KEY.
  *
  * @param {string} rawContext - Raw RAG context string
@@ -18,35 +21,36 @@ export async function summarizeContext(rawContext) {
     return { compressed: "", skipped: true, tokensSaved: 0 };
   }
 
-  // Akrizu Engine: Always skip compression to maintain 100% local operation
+  const tokens = await countTokens(rawContext);
   return {
     compressed: rawContext,
     skipped: true,
     tokensSaved: 0,
-    rawTokens: Math.ceil(rawContext.length / 4),
-    compressedTokens: Math.ceil(rawContext.length / 4),
+    rawTokens: tokens,
+    compressedTokens: tokens,
   };
 }
 
 /**
- * Formats an array of RAG results into a raw readable string.
+ * Packs an array of RAG results into a readable string within a token budget.
  *
- * @param {Array<{ payload: { content: string, source_file: string, section: string } }>} results
- * @returns {Promise<{ compressed: string, skipped: boolean, tokensSaved: number }>}
+ * @param {Array<{ score?: number, payload: { content: string, source_file: string, section: string, priority?: string } }>} results
+ * @param {object} [options] - See packContext() (budget, model, lambda, dupThreshold)
+ * @returns {Promise<{ compressed: string, skipped: boolean, tokensSaved: number, rawTokens: number, compressedTokens: number, kept: Array, dropped: object }>}
  */
-export async function summarizeResults(results) {
+export async function summarizeResults(results, options = {}) {
   if (!results || results.length === 0) {
     return { compressed: "", skipped: true, tokensSaved: 0 };
   }
 
-  const rawContext = results
-    .map((r) => {
-      const src = r.payload?.source_file || "";
-      const section = r.payload?.section || "";
-      const content = r.payload?.content || r.content || "";
-      return `[${src} > ${section}]\n${content}`;
-    })
-    .join("\n\n");
-
-  return summarizeContext(rawContext);
+  const { text, kept, rawTokens, packedTokens, tokensSaved, dropped } = await packContext(results, options);
+  return {
+    compressed: text,
+    skipped: false,
+    tokensSaved,
+    rawTokens,
+    compressedTokens: packedTokens,
+    kept,
+    dropped,
+  };
 }
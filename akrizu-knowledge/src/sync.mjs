@@ -8,73 +8,204 @@
  *   npm run sync -- --watch   — Watch for file changes and auto re-ingest
  *   npm run sync -- --file rules/coding-standard.md  — Re-ingest one file
  */
-import { watch } from 'fs';
-import {  statSync } from 'fs';
-import { resolve } from 'path';
+import { watch, statSync, readFileSync, writeFileSync, mkdirSync, renameSync } from 'fs';
+import { createHash } from 'crypto';
+import { dirname, relative, resolve } from 'path';
 import { CONFIG, validateConfig } from './config.mjs';
-import { embed } from './embedder.mjs';
-import { ensureCollection, upsertPoints, getClient, getStats } from './qdrant.mjs';
+import { embedChunks } from './embedder.mjs';
+import { chunkFile, listKnowledgeFiles } from './chunker.mjs';
+import { ensureCollection, upsertPoints, batchUpdate, getClient, getStats } from './qdrant.mjs';
 
-// ─── Re-ingest a single file ─────────────────────────────
+const MANIFEST_VERSION = 1;
+// Quiet period after the last file event, and the longest a burst can delay a sync
+const DEBOUNCE_MS = 500;
+const MAX_WAIT_MS = 5000;
 
-import { chunkKnowledgeBase } from './chunker.mjs';
+// ─── Manifest ────────────────────────────────────────────
+// files[relPath] = { mtimeMs, size, hash, points: { [pointId]: { hash, line } } }
+// Point IDs are stable (chunker.pointId), so a section keeps its ID across edits.
 
-async function reingestSingleFile(relativeFilePath) {
-  const fullPath = resolve(CONFIG.knowledgeBasePath, relativeFilePath);
-  console.log(`\n🔄 Re-ingesting: ${relativeFilePath}`);
+function sha256(text) {
+  return createHash('sha256').update(text).digest('hex');
+}
 
+function emptyManifest() {
+  return { version: MANIFEST_VERSION, collection: CONFIG.collection, files: {} };
+}
+
+function loadManifest() {
   try {
-    statSync(fullPath);
+    const manifest = JSON.parse(readFileSync(CONFIG.syncManifestPath, 'utf-8'));
+    if (manifest.version === MANIFEST_VERSION && manifest.collection === CONFIG.collection) {
+      return manifest;
+    }
   } catch {
-    console.log(`   ⚠️  File not found: ${fullPath}`);
-    return;
+    // Missing or unreadable — every file is treated as changed
   }
+  return emptyManifest();
+}
 
-  // Get all existing chunks — we'll re-chunk the whole file
-  const allChunks = await chunkKnowledgeBase();
-  const fileChunks = allChunks.filter(
-    (c) => c.metadata.source_file === relativeFilePath.replace(/\\/g, '/')
-  );
+function saveManifest(manifest) {
+  mkdirSync(dirname(CONFIG.syncManifestPath), { recursive: true });
+  const tmp = `${CONFIG.syncManifestPath}.tmp`;
+  writeFileSync(tmp, JSON.stringify(manifest));
+  renameSync(tmp, CONFIG.syncManifestPath);
+}
 
-  if (fileChunks.length === 0) {
-    console.log(`   ⚠️  No chunks found for ${relativeFilePath}`);
-    return;
-  }
+function sourceFileMatch(relPath) {
+  return { key: 'source_file', match: { value: relPath } };
+}
 
-  // Delete old points for this file using scroll + delete
-  const qdrant = getClient();
-  await qdrant.delete(CONFIG.collection, {
-    filter: {
-      must: [{ key: 'source_file', match: { value: relativeFilePath.replace(/\\/g, '/') } }],
-    },
-  });
-  console.log(`   🗑️  Deleted old chunks for ${relativeFilePath}`);
+// ─── Incremental Sync ────────────────────────────────────
 
-  // Get current max ID
-  const stats = await getStats();
-  const baseId = (stats.points_count || 0) + 1000; // Offset to avoid collisions
+/**
+ * Bring Qdrant in line with the given knowledge base files.
+ * Only sections whose text changed are embedded and upserted; moved sections
+ * and file metadata are patched with set_payload; removed sections, deleted
+ * files and stray points from older ID schemes are deleted.
+ * @param {string[]} relPaths - Paths relative to the knowledge base
+ * @param {object} manifest - Loaded manifest (updated and saved in place)
+ * @param {object} [options]
+ * @param {boolean} [options.force=false] - Ignore the manifest's mtime/hash shortcuts
+ * @returns {Promise<object>} Sync stats
+ */
+async function syncFiles(relPaths, manifest, { force = false } = {}) {
+  const started = Date.now();
+  const stats = { files: 0, unchanged: 0, embedded: 0, payloadUpdates: 0, deletedFiles: 0, failed: 0 };
+  const toEmbed = [];
+  const operations = [];
+  const entries = new Map(); // relPath → new manifest entry (null = file removed)
 
-  // Embed and upsert new chunks
-  const points = [];
-  for (let i = 0; i < fileChunks.length; i++) {
-    const chunk = fileChunks[i];
-    process.stdout.write(`\r   Embedding ${i + 1}/${fileChunks.length}...`);
+  for (const relPath of new Set(relPaths.map((p) => p.replace(/\\/g, '/')))) {
+    const fullPath = resolve(CONFIG.knowledgeBasePath, relPath);
+    const previous = force ? undefined : manifest.files[relPath];
+
+    let stat = null;
     try {
-      const vector = await embed(chunk.content);
+      stat = statSync(fullPath);
+    } catch {
+      // Deleted or renamed away
+    }
+
+    if (!stat || !stat.isFile()) {
+      operations.push({ delete: { filter: { must: [sourceFileMatch(relPath)] } } });
+      entries.set(relPath, null);
+      stats.deletedFiles++;
+      continue;
+    }
+    if (previous && previous.mtimeMs === stat.mtimeMs && previous.size === stat.size) {
+      stats.unchanged++;
+      continue;
+    }
+
+    const hash = sha256(readFileSync(fullPath));
+    const chunks = chunkFile(fullPath);
+    const points = {};
+    const unchangedIds = [];
+
+    for (const chunk of chunks) {
+      const chunkHash = sha256(chunk.content);
+      const old = previous?.points?.[chunk.pointId];
+      points[chunk.pointId] = { hash: chunkHash, line: chunk.metadata.line_start };
+
+      if (!old || old.hash !== chunkHash) {
+        toEmbed.push({ relPath, chunk });
+        continue;
+      }
+      // Same text ⇒ same category/tags/priority; only position and file metadata can differ
+      unchangedIds.push(chunk.pointId);
+      if (old.line !== chunk.metadata.line_start) {
+        operations.push({ set_payload: { payload: { line_start: chunk.metadata.line_start }, points: [chunk.pointId] } });
+        stats.payloadUpdates++;
+      }
+    }
+
+    if (unchangedIds.length > 0) {
+      const [{ metadata }] = chunks;
+      operations.push({
+        set_payload: {
+          payload: { file_size: metadata.file_size, last_modified: metadata.last_modified },
+          points: unchangedIds,
+        },
+      });
+      stats.payloadUpdates += unchangedIds.length;
+    }
+
+    // Remove sections that disappeared (and points left by older ID schemes)
+    operations.push({
+      delete: {
+        filter: {
+          must: [sourceFileMatch(relPath)],
+          must_not: [{ has_id: chunks.map((c) => c.pointId) }],
+        },
+      },
+    });
+    entries.set(relPath, { mtimeMs: stat.mtimeMs, size: stat.size, hash, points });
+    stats.files++;
+  }
+
+  if (toEmbed.length > 0) {
+    const { vectors, errors } = await embedChunks(toEmbed.map((t) => t.chunk), (done, total) => {
+      process.stdout.write(`\r   Embedding ${done}/${total}...`);
+    });
+    process.stdout.write('\n');
+    for (const { index, error } of errors) {
+      const { relPath, chunk } = toEmbed[index];
+      console.error(`   ❌ Failed to embed "${chunk.metadata.section}" from ${relPath}: ${error.message}`);
+      // Leave it out of the manifest so the next sync retries it
+      delete entries.get(relPath).points[chunk.pointId];
+      // Force a rescan of the file next time
+      entries.get(relPath).mtimeMs = 0;
+    }
+    const points = [];
+    toEmbed.forEach(({ chunk }, i) => {
+      if (!vectors[i]) return;
       points.push({
-        id: baseId + i,
-        vector,
+        id: chunk.pointId,
+        vector: vectors[i],
         payload: { content: chunk.content, ...chunk.metadata },
       });
-    } catch (err) {
-      console.error(`\n   ❌ Failed: ${err.message}`);
-    }
+    });
+    if (points.length > 0) await upsertPoints(points);
+    stats.embedded = points.length;
+    stats.failed = errors.length;
   }
 
-  if (points.length > 0) {
-    await upsertPoints(points);
-    console.log(`\n   ✅ Re-ingested ${points.length} chunks for ${relativeFilePath}`);
+  if (operations.length > 0) await batchUpdate(operations);
+
+  for (const [relPath, entry] of entries) {
+    if (entry) manifest.files[relPath] = entry;
+    else delete manifest.files[relPath];
   }
+  saveManifest(manifest);
+  stats.ms = Date.now() - started;
+  return stats;
+}
+
+function logStats(stats) {
+  console.log(
+    `   ✅ Synced ${stats.files} file(s) in ${stats.ms}ms — ${stats.embedded} embedded, `
+    + `${stats.payloadUpdates} payload update(s), ${stats.deletedFiles} file(s) removed`
+    + (stats.failed ? `, ❌ ${stats.failed} failed` : ''),
+  );
+}
+
+/** Every file on disk plus every file the manifest still remembers */
+async function allKnownFiles(manifest) {
+  const onDisk = (await listKnowledgeFiles()).map((f) =>
+    relative(CONFIG.knowledgeBasePath, f).replace(/\\/g, '/'));
+  return [...new Set([...onDisk, ...Object.keys(manifest.files)])];
+}
+
+// ─── Re-ingest a single file ─────────────────────────────
+
+async function reingestSingleFile(relativeFilePath) {
+  console.log(`\n🔄 Re-ingesting: ${relativeFilePath}`);
+  const stats = await syncFiles([relativeFilePath], loadManifest());
+  if (stats.deletedFiles) {
+    console.log(`   🗑️  File not found — removed its chunks: ${relativeFilePath}`);
+  }
+  logStats(stats);
 }
 
 // ─── Full Re-Ingest ──────────────────────────────────────
@@ -94,34 +225,11 @@ async function fullReingest() {
   await ensureCollection();
   console.log('');
 
-  // Chunk everything
-  const chunks = await chunkKnowledgeBase();
-  console.log('');
-
-  // Embed
-  console.log(`🔮 Embedding ${chunks.length} chunks...`);
-  const points = [];
-  for (let i = 0; i < chunks.length; i++) {
-    const chunk = chunks[i];
-    process.stdout.write(`\r   Embedding ${i + 1}/${chunks.length}...`);
-    try {
-      const vector = await embed(chunk.content);
-      points.push({
-        id: i + 1,
-        vector,
-        payload: { content: chunk.content, ...chunk.metadata },
-      });
-    } catch (err) {
-      console.error(`\n   ❌ Failed to embed "${chunk.metadata.section}": ${err.message}`);
-    }
-  }
-
-  console.log(`\n   ✅ Embedded: ${points.length}/${chunks.length}`);
-
-  if (points.length > 0) {
-    console.log(`\n📤 Upserting ${points.length} points...`);
-    await upsertPoints(points);
-  }
+  // Rebuild from scratch (unchanged text still comes from the embedding cache)
+  const manifest = emptyManifest();
+  const files = await allKnownFiles(manifest);
+  console.log(`🔮 Syncing ${files.length} files...`);
+  logStats(await syncFiles(files, manifest, { force: true }));
 
   const stats = await getStats();
   console.log(`\n✅ Sync complete — ${stats.points_count} points in "${CONFIG.collection}"\n`);
@@ -131,34 +239,50 @@ async function fullReingest() {
 
 function startWatcher() {
   const basePath = CONFIG.knowledgeBasePath;
-  console.log(`\n👁️  Watching for changes in: ${basePath}`);
-  console.log('   Press Ctrl+C to stop.\n');
+  const manifest = loadManifest();
+
+  // Bursts of events (editor save = several writes/renames) are coalesced
+  // into one sync pass; passes run one at a time.
+  const pending = new Set();
+  let timer = null;
+  let firstEventAt = 0;
+  let chain = Promise.resolve();
+
+  const run = (label, getFiles) => {
+    chain = chain
+      .then(async () => {
+        const files = await getFiles();
+        console.log(`\n📝 ${label}`);
+        logStats(await syncFiles(files, manifest));
+      })
+      .catch((err) => console.error(`   ❌ Re-ingest failed: ${err.message}`));
+  };
 
-  // Debounce map
-  const pending = new Map();
+  const flush = () => {
+    timer = null;
+    firstEventAt = 0;
+    const files = [...pending];
+    pending.clear();
+    run(`Detected changes: ${files.join(', ')}`, () => files);
+  };
 
   // Recursive directory watch
   const watcher = watch(basePath, { recursive: true }, (eventType, filename) => {
     if (!filename || !filename.endsWith('.md')) return;
 
-    const relPath = filename.replace(/\\/g, '/');
-
-    // Debounce: wait 2s after last change before re-ingesting
-    if (pending.has(relPath)) clearTimeout(pending.get(relPath));
-    pending.set(
-      relPath,
-      setTimeout(async () => {
-        pending.delete(relPath);
-        console.log(`\n📝 Detected change: ${relPath} (${eventType})`);
-        try {
-          await reingestSingleFile(relPath);
-        } catch (err) {
-          console.error(`   ❌ Re-ingest failed: ${err.message}`);
-        }
-      }, 2000)
-    );
+    pending.add(filename.replace(/\\/g, '/'));
+    if (!firstEventAt) firstEventAt = Date.now();
+    clearTimeout(timer);
+    const wait = Math.min(DEBOUNCE_MS, Math.max(0, firstEventAt + MAX_WAIT_MS - Date.now()));
+    timer = setTimeout(flush, wait);
   });
 
+  console.log(`\n👁️  Watching for changes in: ${basePath}`);
+  console.log('   Press Ctrl+C to stop.\n');
+
+  // Catch up with edits made while the watcher was not running
+  run('Reconciling knowledge base with the sync manifest', () => allKnownFiles(manifest));
+
   // Keep alive
   process.on('SIGINT', () => {
     watcher.close();
@@ -3,36 +3,70 @@
 RAG Control Panel Simulation - Python Version
 Simulates exact Electron renderer.js + ServiceManager.js flow
 """
-import subprocess
+import argparse
+import asyncio
 import time
 import json
 import sys
-import http.client
-from datetime import datetime
+import os
+
+# Shared probe/launcher tooling lives in ../scripts/akrizu_stack
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from akrizu_stack.logring import LogRing, LogFlusher
+from akrizu_stack.probe import AsyncHttpProbe, HttpProbe, LatencyHistogram, backoff_delays, port_open
+from akrizu_stack.standin import QdrantStandin, offline_env
+from akrizu_stack.supervisor import ServiceSpec, Supervisor
+from akrizu_stack.telemetry import TelemetrySampler, TelemetryServer, supervisor_pids
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
 
 class ServiceManager:
-    def __init__(self):
+    def __init__(self, log_capacity=5000, log_file=None, offline=False, telemetry_interval=1.0):
+        # Offline: Ollama is the akrizu_stack.standin stand-in and Node talks to a Qdrant stand-in
+        self.offline = offline
         self.services = {
             'ollama': {'name': 'Ollama Server', 'process': None, 'status': 'stopped', 'port': 11434},
             'ragServer': {'name': 'RAG Server', 'process': None, 'status': 'stopped', 'port': 6444},
             'syncWatcher': {'name': 'Sync Watcher', 'process': None, 'status': 'stopped', 'port': None}
         }
-        self.logs = []
+        self.logs = LogRing(log_capacity)
+        self.log_flusher = LogFlusher(path=log_file)
+        self.probes = {}
+        self.async_probes = {}
+        self.latency = {}
+        self.supervisor = Supervisor(on_line=self._on_output, on_event=self._on_event)
+        # CPU/RSS/IO of each supervised process tree (Linux /proc; 0 disables it)
+        self.telemetry = (TelemetrySampler(supervisor_pids(self.supervisor), interval=telemetry_interval).start()
+                          if telemetry_interval > 0 else None)
+    
+    OUTPUT_PREFIX = {'ollama': '[OLLAMA {level}] ', 'ragServer': '', 'syncWatcher': ''}
+    
+    def _on_output(self, service_name, line, level):
+        prefix = self.OUTPUT_PREFIX.get(service_name, '').format(level=level.upper())
+        self.add_log(service_name, f"{prefix}{line}", level)
+    
+    def _on_event(self, service_name, message, level):
+        self.add_log(service_name, f"[SUPERVISOR] {message}", level)
+        state = self.supervisor.get(service_name)
+        if state and state.status in ('crashed', 'failed') and service_name in self.services:
+            self.services[service_name]['status'] = 'stopped' if state.status == 'failed' else 'starting'
     
     def add_log(self, service_name, message, log_type='info'):
-        timestamp = datetime.now().strftime('%I:%M:%S %p')
-        log_entry = {'timestamp': timestamp, 'message': message.strip(), 'type': log_type}
-        self.logs.append(log_entry)
-        
-        type_prefix = {
-            'info': '[INFO]',
-            'success': '[SUCCESS]',
-            'error': '[ERROR]',
-            'stdout': '[STDOUT]',
-            'stderr': '[STDERR]'
-        }.get(log_type, '[INFO]')
-        
-        print(f"[{timestamp}] [{service_name.upper()}] {type_prefix} {message}")
+        record = self.logs.append(service_name, message.strip(), log_type)
+        self.log_flusher.submit(record)
+        return record
+    
+    def flush_logs(self):
+        """Write pending log lines now (keeps ordering with direct print() calls)"""
+        self.log_flusher.flush()
+    
+    def get_logs(self, service_name=None, log_type=None, limit=None):
+        """Latest log entries as dicts, filtered by service and/or type"""
+        if limit is None:
+            records = self.logs.query(service=service_name, level=log_type)
+        else:
+            records = self.logs.tail(limit, service=service_name, level=log_type)
+        return [r.as_dict() for r in records]
     
     def update_status(self, service_name, status):
         if service_name in self.services:
@@ -42,94 +76,128 @@ class ServiceManager:
     def sleep(self, ms):
         time.sleep(ms / 1000.0)
     
+    def probe_for(self, port, path='/health'):
+        """Persistent keep-alive probe per port/path"""
+        key = (port, path)
+        if key not in self.probes:
+            self.probes[key] = HttpProbe('localhost', port, path, timeout=2)
+        return self.probes[key]
+    
     def is_port_in_use(self, port):
-        """Check if port is in use using HTTP connection attempt"""
-        try:
-            conn = http.client.HTTPConnection('localhost', port, timeout=1)
-            conn.request('GET', '/health')
-            response = conn.getresponse()
-            conn.close()
-            return True
-        except:
-            return False
+        """Check if port is in use with a plain TCP connect (no HTTP round trip)"""
+        return port_open('localhost', port, timeout=1)
     
     def check_health(self, port):
-        """Check health endpoint"""
-        try:
-            conn = http.client.HTTPConnection('localhost', port, timeout=2)
-            conn.request('GET', '/health')
-            response = conn.getresponse()
-            data = response.read().decode('utf-8')
-            conn.close()
-            return {
-                'ok': 200 <= response.status < 300,
-                'status': response.status,
-                'body': data
-            }
-        except Exception as e:
-            return {'ok': False, 'status': 0, 'error': str(e)}
+        """Check health endpoint over a kept-alive connection"""
+        return self.probe_for(port).check().as_dict()
+    
+    def check_health_path(self, port, path):
+        """Health check against an arbitrary path (e.g. Ollama's /api/tags)"""
+        return self.probe_for(port, path).check().as_dict()
+    
+    def histogram(self, service_name, metric):
+        """Per-service latency histogram ('startup' or 'health')"""
+        return self.latency.setdefault(service_name, {}).setdefault(metric, LatencyHistogram())
+    
+    def async_probe_for(self, port, path='/health'):
+        """Persistent keep-alive asyncio probe per port/path"""
+        key = (port, path)
+        if key not in self.async_probes:
+            self.async_probes[key] = AsyncHttpProbe('localhost', port, path, timeout=2)
+        return self.async_probes[key]
+    
+    async def watch_health(self, service_name, path='/health', timeout=30):
+        """
+        Health-watch mode: poll one kept-alive connection until healthy, the
+        child exits, or the timeout passes. The backoff sleep waits on the
+        supervisor's exit future, so an exit is seen immediately.
+        """
+        port = self.services[service_name]['port']
+        probe = self.async_probe_for(port, path)
+        exited = self.supervisor.get(service_name).exited()
+        delays = backoff_delays(base=0.05, max_delay=1.0)
+        start = time.perf_counter()
+        deadline = start + timeout
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            res = await probe.check()
+            self.histogram(service_name, 'health').record(res.latency)
+            
+            if res.ok:
+                self.histogram(service_name, 'startup').record(time.perf_counter() - start)
+                self.add_log(service_name, f"[HEALTH] Attempt {attempt}: status {res.status}", 'info')
+                return {'healthy': True, 'exited': False, 'code': None, 'attempts': attempt}
+            if res.reachable:
+                self.add_log(service_name, f"[HEALTH] Attempt {attempt}: status {res.status}", 'error')
+            elif attempt == 1 or attempt % 10 == 0:
+                self.add_log(service_name, f"[HEALTH] Attempt {attempt}: port {port} not open yet", 'info')
+            
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return {'healthy': False, 'exited': False, 'code': None, 'attempts': attempt}
+            try:
+                code = await asyncio.wait_for(asyncio.shield(exited), min(next(delays), remaining))
+                return {'healthy': False, 'exited': True, 'code': code, 'attempts': attempt}
+            except asyncio.TimeoutError:
+                pass
+    
+    def latency_report(self):
+        """{service: {metric: histogram dict}}"""
+        return {
+            name: {metric: hist.as_dict() for metric, hist in metrics.items()}
+            for name, metrics in self.latency.items()
+        }
+    
+    def telemetry_report(self):
+        """{service: {latest, summary, samples}} from the resource sampler"""
+        return self.telemetry.snapshot() if self.telemetry else {}
+    
+    def node_env(self):
+        env = {**os.environ, 'NODE_NO_WARNINGS': '1', 'FORCE_COLOR': '0'}
+        if self.offline:
+            env.update(offline_env('http://127.0.0.1:11434', 'http://127.0.0.1:6333'))
+        return env
     
     async def start_ollama(self):
         self.add_log('ollama', '[OLLAMA] startOllama() called', 'info')
-        self.add_log('ollama', '[OLLAMA] Starting Ollama in WSL...', 'info')
-        
-        cmd = ['wsl', '-e', 'bash', '-c', 'OLLAMA_HOST=0.0.0.0:11434 ollama serve']
+        if self.offline:
+            self.add_log('ollama', '[OLLAMA] Starting Ollama stand-in (offline)...', 'info')
+            cmd = [sys.executable, '-m', 'akrizu_stack.standin', 'ollama', '--ollama-port', '11434']
+            spec = ServiceSpec('ollama', cmd, cwd=SCRIPTS_DIR)
+        else:
+            self.add_log('ollama', '[OLLAMA] Starting Ollama in WSL...', 'info')
+            cmd = ['wsl', '-e', 'bash', '-c', 'OLLAMA_HOST=0.0.0.0:11434 ollama serve']
+            spec = ServiceSpec('ollama', cmd)
         self.add_log('ollama', f"[OLLAMA] Spawning: {' '.join(cmd)}", 'info')
         
         try:
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.DEVNULL,
-                text=True,
-                bufsize=1
-            )
-            
-            self.add_log('ollama', f"[OLLAMA] Process spawned with PID: {proc.pid}", 'info')
-            self.services['ollama']['process'] = proc
-            
-            # Non-blocking output reading
-            import threading
-            
-            def read_stdout():
-                try:
-                    for line in proc.stdout:
-                        if line.strip():
-                            self.add_log('ollama', f"[OLLAMA STDOUT] {line.strip()}", 'stdout')
-                except:
-                    pass
+            state = await self.supervisor.start(spec)
+            self.add_log('ollama', f"[OLLAMA] Process spawned with PID: {state.pid}", 'info')
+            self.services['ollama']['process'] = state.proc
             
-            def read_stderr():
-                try:
-                    for line in proc.stderr:
-                        if line.strip():
-                            self.add_log('ollama', f"[OLLAMA STDERR] {line.strip()}", 'stderr')
-                except:
-                    pass
+            watch = await self.watch_health('ollama', path='/api/tags', timeout=20)
             
-            threading.Thread(target=read_stdout, daemon=True).start()
-            threading.Thread(target=read_stderr, daemon=True).start()
-            
-            self.add_log('ollama', '[OLLAMA] Waiting 2 seconds for startup...', 'info')
-            self.sleep(2000)
-            
-            # Check if process is still alive
-            if proc.poll() is None:
+            if watch['healthy'] and state.running:
                 self.add_log('ollama', '[OLLAMA] Ollama started successfully', 'success')
-            else:
-                exit_code = proc.poll()
-                self.add_log('ollama', f'[OLLAMA EXIT] Process exited with code: {exit_code}', 'error')
+            elif watch['exited']:
+                # Don't restart-loop on a port conflict
+                await self.supervisor.stop('ollama')
+                self.add_log('ollama', f"[OLLAMA EXIT] Process exited with code: {watch['code']}", 'error')
                 # Don't fail - Ollama might already be running
-                self.add_log('ollama', '[OLLAMA] Assuming Ollama is already running (port conflict)', 'info')
+                if (await self.async_probe_for(self.services['ollama']['port'], '/api/tags').check()).ok:
+                    self.add_log('ollama', '[OLLAMA] Ollama is already running (port conflict)', 'info')
+                else:
+                    self.add_log('ollama', '[OLLAMA] Process exited and the API is not answering on port 11434', 'error')
+            else:
+                self.add_log('ollama', '[OLLAMA] API not answering yet on port 11434', 'error')
             
         except Exception as e:
             self.add_log('ollama', f"[OLLAMA ERROR] Failed to start: {str(e)}", 'error')
             raise
     
     async def start_rag_server(self):
-        import os
-        
         service = self.services['ragServer']
         rag_path = os.path.join(os.path.dirname(__file__), 'rag')
         
@@ -137,79 +205,25 @@ class ServiceManager:
         self.add_log('ragServer', f'Working directory: {rag_path}', 'info')
         
         try:
-            proc = subprocess.Popen(
-                ['node', 'src/server.mjs'],
-                cwd=rag_path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.DEVNULL,
-                text=True,
-                bufsize=1,
-                env={**os.environ, 'NODE_NO_WARNINGS': '1', 'FORCE_COLOR': '0'}
-            )
-            
-            self.add_log('ragServer', f'[RAG] Process spawned with PID: {proc.pid}', 'info')
-            service['process'] = proc
+            state = await self.supervisor.start(ServiceSpec(
+                'ragServer', ['node', 'src/server.mjs'], cwd=rag_path, env=self.node_env()))
             
-            # Non-blocking output reading
-            import threading
+            self.add_log('ragServer', f'[RAG] Process spawned with PID: {state.pid}', 'info')
+            service['process'] = state.proc
             
-            def read_stdout():
-                try:
-                    for line in proc.stdout:
-                        if line.strip():
-                            self.add_log('ragServer', line.strip(), 'stdout')
-                except:
-                    pass
-            
-            def read_stderr():
-                try:
-                    for line in proc.stderr:
-                        if line.strip():
-                            self.add_log('ragServer', line.strip(), 'stderr')
-                except:
-                    pass
-            
-            threading.Thread(target=read_stdout, daemon=True).start()
-            threading.Thread(target=read_stderr, daemon=True).start()
-            
-            # Warmup before polling (matching ServiceManager.js line 195)
-            self.add_log('ragServer', '[HEALTH] Waiting 2 seconds before health checks...', 'info')
-            self.sleep(2000)
-            
-            # Poll for health up to 30 seconds (matching ServiceManager.js line 198)
-            healthy = False
-            for i in range(30):
-                self.sleep(1000)
-                
-                # Check if process died
-                if proc.poll() is not None:
-                    self.add_log('ragServer', f'[RAG EXIT] Process exited with code: {proc.poll()}', 'error')
-                    break
-                
-                port_open = self.is_port_in_use(service['port'])
-                if port_open:
-                    res = self.check_health(service['port'])
-                    status_msg = f"status {res.get('status', 0)}"
-                    if 'error' in res:
-                        status_msg += f" - {res['error']}"
-                    
-                    log_type = 'info' if res.get('ok') else 'error'
-                    self.add_log('ragServer', f"[HEALTH] Attempt {i + 1}: {status_msg}", log_type)
-                    
-                    if res.get('ok'):
-                        healthy = True
-                        break
-                else:
-                    self.add_log('ragServer', f"[HEALTH] Attempt {i + 1}: port 6444 not open yet", 'info')
+            # Single-connection health watch: one GET /health per tick answers both
+            # "is the port open" and "is it healthy"; a process exit ends the wait at once
+            watch = await self.watch_health('ragServer', timeout=30)
+            healthy = watch['healthy']
+            if watch['exited']:
+                self.add_log('ragServer', f"[RAG EXIT] Process exited with code: {watch['code']}", 'error')
             
             if healthy:
                 self.add_log('ragServer', 'RAG Server started on port 6444', 'success')
             else:
                 self.add_log('ragServer', 'RAG Server failed to start (port 6444 still closed or unhealthy)', 'error')
                 self.update_status('ragServer', 'stopped')
-                if proc.poll() is None:
-                    proc.terminate()
+                await self.supervisor.stop('ragServer')
                 service['process'] = None
                 raise Exception('RAG Server did not open port 6444')
                 
@@ -217,6 +231,46 @@ class ServiceManager:
             self.add_log('ragServer', f'[RAG ERROR] Failed to start: {str(e)}', 'error')
             raise
     
+    async def start_sync_watcher(self, timeout=15):
+        service = self.services['syncWatcher']
+        rag_path = os.path.join(os.path.dirname(__file__), 'rag')
+        
+        self.add_log('syncWatcher', 'Starting Sync Watcher...', 'info')
+        self.add_log('syncWatcher', f'Watching for changes in {rag_path}', 'info')
+        
+        state = await self.supervisor.start(ServiceSpec(
+            'syncWatcher', ['node', 'src/sync.mjs', '--watch'], cwd=rag_path,
+            env=self.node_env(), ready_line='Watching for changes'))
+        service['process'] = state.proc
+        
+        # Ready when the watcher prints its banner; an early exit fails the start
+        ready = asyncio.ensure_future(state.ready.wait())
+        done, _ = await asyncio.wait({ready, state.exited()}, timeout=timeout,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        if ready in done:
+            self.add_log('syncWatcher', 'Sync Watcher started successfully', 'success')
+            return
+        ready.cancel()
+        await self.supervisor.stop('syncWatcher')
+        service['process'] = None
+        self.add_log('syncWatcher', 'Sync Watcher failed to start', 'error')
+        raise Exception('Sync Watcher exited or did not report ready')
+    
+    async def stop(self, service_name):
+        """Stop a supervised service (whole process group)"""
+        code = await self.supervisor.stop(service_name)
+        self.services[service_name]['process'] = None
+        self.update_status(service_name, 'stopped')
+        return code
+    
+    async def stop_all(self):
+        """Stop every service in parallel"""
+        await self.supervisor.stop_all()
+        for name, service in self.services.items():
+            if service['process'] is not None:
+                service['process'] = None
+                self.update_status(name, 'stopped')
+    
     async def start(self, service_name):
         """Main start method matching ServiceManager.js"""
         self.add_log(service_name, f'[SERVICE] start() called for {service_name}', 'info')
@@ -244,6 +298,10 @@ class ServiceManager:
                 self.add_log(service_name, '[SERVICE] Calling startRagServer()', 'info')
                 await self.start_rag_server()
                 self.add_log(service_name, '[SERVICE] startRagServer() completed', 'info')
+            elif service_name == 'syncWatcher':
+                self.add_log(service_name, '[SERVICE] Calling startSyncWatcher()', 'info')
+                await self.start_sync_watcher()
+                self.add_log(service_name, '[SERVICE] startSyncWatcher() completed', 'info')
             else:
                 self.add_log(service_name, f'[SERVICE ERROR] No handler for service: {service_name}', 'error')
                 raise Exception(f'Unknown service: {service_name}')
@@ -261,20 +319,20 @@ class ServiceManager:
             return {'success': False, 'error': str(error)}
 
 
-async def simulate_button_click(service_name):
+async def simulate_button_click(manager, service_name):
     """Simulate renderer.js handleStart() function"""
+    manager.flush_logs()
     print(f"\n{'='*60}")
     print(f"SIMULATING START: {service_name.upper()}")
     print(f"{'='*60}")
     
-    manager = ServiceManager()
-    
     # Matching renderer.js lines 62-68
     manager.add_log(service_name, f'[UI] Button clicked for {service_name}', 'info')
     manager.add_log(service_name, f'[UI] ▶ Starting {service_name}...', 'info')
     manager.add_log(service_name, f"[UI] Calling IPC: window.electronAPI.startService('{service_name}')", 'info')
     
     # Matching main.js IPC handler
+    manager.flush_logs()
     print(f"[MAIN] IPC handler: service:start for {service_name}")
     print(f"[MAIN] Calling serviceManager.start('{service_name}')")
     
@@ -284,40 +342,75 @@ async def simulate_button_click(service_name):
     # Matching renderer.js lines 72-78
     manager.add_log(service_name, f'[IPC] Response received: {json.dumps(result)}', 'info')
     
+    manager.flush_logs()
+    for metric, hist in manager.latency.get(service_name, {}).items():
+        print(f"[LATENCY] {service_name} {metric}: {hist.format()}")
+    
     if not result['success']:
         manager.add_log(service_name, f"[ERROR] ✗ Failed to start: {result.get('error', 'Unknown error')}", 'error')
+        manager.flush_logs()
         print(f"\n❌ FAILED: {service_name}")
         return False
     else:
         manager.add_log(service_name, '[SUCCESS] ✓ Start command sent successfully', 'success')
+        manager.flush_logs()
         print(f"\n✅ SUCCESS: {service_name}")
         return True
 
 
 async def main():
+    parser = argparse.ArgumentParser(description="Simulate the Electron control panel start flow")
+    parser.add_argument('--offline', action='store_true',
+                        help='Use Ollama/Qdrant stand-ins (deterministic, no WSL or database needed)')
+    parser.add_argument('--telemetry-interval', type=float, default=1.0,
+                        help='Seconds between CPU/RSS/IO samples of each service (0 disables)')
+    parser.add_argument('--telemetry-port', type=int, default=None,
+                        help='Serve /metrics (Prometheus) and /telemetry (JSON) on this port')
+    args = parser.parse_args()
+    
     print("="*60)
-    print("RAG Control Panel Simulation - Python")
+    print("RAG Control Panel Simulation - Python" + (" (offline stand-ins)" if args.offline else ""))
     print("="*60)
     print()
     
-    # Test Ollama
-    success_ollama = await simulate_button_click('ollama')
-    
-    # Wait 3 seconds before next service
-    print("\n⏳ Waiting 3 seconds before starting RAG Server...")
-    time.sleep(3)
+    # One manager (and one event loop) supervises every service
+    manager = ServiceManager(offline=args.offline, telemetry_interval=args.telemetry_interval)
+    qdrant = QdrantStandin(port=6333).start() if args.offline else None
+    telemetry_server = None
+    if manager.telemetry and args.telemetry_port is not None:
+        telemetry_server = TelemetryServer(manager.telemetry, port=args.telemetry_port).start()
+        print(f"📈 Telemetry: {telemetry_server.url}/metrics")
     
-    # Test RAG Server
-    success_rag = await simulate_button_click('ragServer')
+    try:
+        # Test Ollama
+        success_ollama = await simulate_button_click(manager, 'ollama')
+        
+        # Test RAG Server and Sync Watcher (health-gated, no fixed wait in between)
+        success_rag = await simulate_button_click(manager, 'ragServer')
+        success_sync = await simulate_button_click(manager, 'syncWatcher')
+    finally:
+        if manager.telemetry:
+            manager.telemetry.stop()
+        if telemetry_server is not None:
+            telemetry_server.stop()
+        await manager.stop_all()
+        manager.log_flusher.close()
+        if qdrant is not None:
+            qdrant.stop()
     
     print("\n" + "="*60)
     print("SIMULATION COMPLETE")
     print("="*60)
-    print(f"Ollama:     {'✅ PASS' if success_ollama else '❌ FAIL'}")
-    print(f"RAG Server: {'✅ PASS' if success_rag else '❌ FAIL'}")
+    print(f"Ollama:       {'✅ PASS' if success_ollama else '❌ FAIL'}")
+    print(f"RAG Server:   {'✅ PASS' if success_rag else '❌ FAIL'}")
+    print(f"Sync Watcher: {'✅ PASS' if success_sync else '❌ FAIL'}")
     print("="*60)
+    if manager.telemetry and manager.telemetry.available:
+        print("Resource usage:")
+        print(manager.telemetry.format_summary())
+        print("="*60)
     
-    if success_ollama and success_rag:
+    if success_ollama and success_rag and success_sync:
         print("\n🎉 ALL TESTS PASSED - Electron should work the same way")
         sys.exit(0)
     else:
@@ -326,5 +419,4 @@ async def main():
 
 
 if __name__ == '__main__':
-    import asyncio
     asyncio.run(main())
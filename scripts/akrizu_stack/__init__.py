@@ -0,0 +1,4 @@
+"""
+Akrizu Stack — shared Python tooling
+Used by scripts/start-rag-stack.py and electron-rag/test_simulation.py
+"""
@@ -0,0 +1,571 @@
+"""
+Akrizu Stack — Launcher Daemon
+Long-lived supervisor for the stack's services: Ollama (WSL, or the offline
+stand-ins), the embedded vector store, the RAG server and the sync watcher.
+It is the only process that spawns them, so re-running the launcher never
+duplicates a service. It keeps:
+
+  .cache/launcher/registry.json   daemon + per-service PID, process group, port, status
+  .cache/launcher/control.sock    control API, one JSON request/response per line
+  .cache/launcher/services.log    service output
+
+Commands: status, start, stop, restart, reload (re-read .env, restart the
+services whose command or environment changed), logs, shutdown. start
+reuses a service that is already running and healthy; a healthy port this
+daemon did not spawn is reported as external and left alone. Stopping
+terminates process groups in parallel.
+
+Usage:
+  python -m akrizu_stack.daemon serve [--offline]        # foreground
+  python -m akrizu_stack.daemon status
+  python -m akrizu_stack.daemon start|stop|restart [service ...]
+  python -m akrizu_stack.daemon reload | shutdown
+  python -m akrizu_stack.daemon logs rag_server [-n 50]
+
+Where asyncio has no Unix sockets (Windows), the control API listens on
+127.0.0.1 and its port is recorded in the registry.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from akrizu_stack.ingest import AKRIZU_DIR, load_config, load_env
+from akrizu_stack.logring import LogFlusher, LogRing
+from akrizu_stack.probe import AsyncHttpProbe
+from akrizu_stack.standin import offline_env
+from akrizu_stack.supervisor import ServiceSpec, Supervisor
+
+RUN_DIR = AKRIZU_DIR / ".cache" / "launcher"
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+UNIX_SOCKETS = hasattr(socket, "AF_UNIX") and sys.platform != "win32"
+# Start order; stop runs in parallel
+SERVICES = ("ollama", "vector_store", "rag_server", "sync_watcher")
+
+
+# ─── Service table ───────────────────────────────────────
+
+class ServiceDef:
+    """
+    A ServiceSpec plus where its health endpoint answers (port None =
+    liveness only) and the .env values the process reads itself at startup.
+    """
+
+    def __init__(self, spec, port=None, path="/", expect=None, dotenv=None):
+        self.spec = spec
+        self.port = port
+        self.path = path
+        self.expect = expect
+        self.dotenv = dotenv or {}
+
+    def fingerprint(self):
+        """What reload compares: a change means the running process is out of date"""
+        return (self.spec.argv, self.spec.cwd, sorted((self.spec.env or {}).items()),
+                sorted(self.dotenv.items()))
+
+
+def stack_services(offline=False):
+    """The stack's services for the current .env (and --offline)"""
+    env = dict(os.environ)
+    if offline:
+        env.update(offline_env("http://127.0.0.1:11434", "http://127.0.0.1:6333"))
+    config = load_config()
+    # The Node services load .env through dotenv, so an edit there needs a restart
+    dotenv = load_env(AKRIZU_DIR / ".env")
+    node_env = {**env, "NODE_NO_WARNINGS": "1"}
+    services = {}
+    if offline:
+        services["ollama"] = ServiceDef(
+            ServiceSpec("ollama", [sys.executable, "-m", "akrizu_stack.standin",
+                                   "--ollama-port", "11434", "--qdrant-port", "6333"],
+                        cwd=str(SCRIPTS_DIR), env=env),
+            port=11434, path="/api/tags")
+    else:
+        services["ollama"] = ServiceDef(
+            ServiceSpec("ollama", ["wsl", "-e", "bash", "-c", "OLLAMA_HOST=0.0.0.0:11434 ollama serve"], env=env),
+            port=11434, path="/api/tags")
+        if config["vector_store"] == "embedded":
+            port = urlparse(config["qdrant_url"]).port or 6333
+            services["vector_store"] = ServiceDef(
+                ServiceSpec("vector_store", [sys.executable, "-m", "akrizu_stack.vector_store", "--port", str(port)],
+                            cwd=str(SCRIPTS_DIR), env=env),
+                port=port, path="/healthz")
+    # A 500 from /health means the server is up but Qdrant is not reachable yet
+    services["rag_server"] = ServiceDef(
+        ServiceSpec("rag_server", ["node", "src/server.mjs"], cwd=str(AKRIZU_DIR), env=node_env),
+        port=int(env.get("RAG_SERVER_PORT") or dotenv.get("RAG_SERVER_PORT") or 6444), path="/health",
+        expect=lambda status: status < 500, dotenv=dotenv)
+    services["sync_watcher"] = ServiceDef(
+        ServiceSpec("sync_watcher", ["node", "src/sync.mjs", "--watch"], cwd=str(AKRIZU_DIR), env=node_env,
+                    ready_line="Watching for changes"),
+        dotenv=dotenv)
+    return services
+
+
+# ─── Process groups ──────────────────────────────────────
+
+def pid_alive(pid):
+    if not pid:
+        return False
+    if sys.platform == "win32":
+        out = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/NH"], capture_output=True, text=True)
+        return str(pid) in out.stdout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _same_process(pid, argv):
+    """Guard against PID reuse: on Linux the command line must still match"""
+    try:
+        cmdline = Path(f"/proc/{pid}/cmdline").read_bytes().replace(b"\0", b" ").decode("utf-8", "replace")
+    except OSError:
+        return sys.platform != "linux"
+    return bool(argv) and argv[-1] in cmdline
+
+
+async def kill_group(pid, timeout=5.0):
+    """SIGTERM a process group, SIGKILL it after `timeout`"""
+    if sys.platform == "win32":
+        await asyncio.to_thread(subprocess.run, ["taskkill", "/PID", str(pid), "/T", "/F"], capture_output=True)
+        return
+    try:
+        os.killpg(pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return
+    end = time.monotonic() + timeout
+    while pid_alive(pid) and time.monotonic() < end:
+        await asyncio.sleep(0.05)
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+# ─── Daemon ──────────────────────────────────────────────
+
+class LauncherDaemon:
+    """Supervisor + registry + control API; run() serves until shutdown"""
+
+    def __init__(self, offline=False, run_dir=RUN_DIR, log_capacity=5000):
+        self.offline = offline
+        self.run_dir = Path(run_dir)
+        self.registry_path = self.run_dir / "registry.json"
+        self.socket_path = self.run_dir / "control.sock"
+        self.logs = LogRing(log_capacity)
+        self.flusher = None
+        self.supervisor = Supervisor(on_line=self._on_line, on_event=self._on_event)
+        self.defs = {}
+        self.external = set()
+        self.control = None
+        self.started_at = time.time()
+        self._server = None
+        self._shutdown = None
+
+    def _on_line(self, name, line, level):
+        self.flusher.submit(self.logs.append(name, line, level))
+
+    def _on_event(self, name, message, level):
+        self.flusher.submit(self.logs.append(name, message, level))
+        self.write_registry()
+
+    def log(self, message, level="info"):
+        self.flusher.submit(self.logs.append("daemon", message, level))
+
+    # ─── Registry ────────────────────────────────────────
+
+    def registry(self):
+        services = {}
+        for name, state in self.supervisor.services.items():
+            entry = state.as_dict()
+            service = self.defs.get(name)
+            entry.update(pgid=state.pid, port=service.port if service else None, argv=state.spec.argv)
+            services[name] = entry
+        for name in self.external:
+            services.setdefault(name, {"name": name, "status": "external", "pid": None,
+                                       "port": self.defs[name].port})
+        return {
+            "daemon": {"pid": os.getpid(), "control": self.control, "offline": self.offline,
+                       "started_at": self.started_at},
+            "services": services,
+        }
+
+    def write_registry(self):
+        tmp = self.registry_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.registry(), indent=2), encoding="utf-8")
+        os.replace(tmp, self.registry_path)
+
+    async def reap_orphans(self):
+        """Stop services a previous, crashed daemon left running, so none runs twice"""
+        try:
+            old = json.loads(self.registry_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return []
+        orphans = [(name, entry["pid"]) for name, entry in (old.get("services") or {}).items()
+                   if entry.get("pid") and pid_alive(entry["pid"]) and _same_process(entry["pid"], entry.get("argv"))]
+        if orphans:
+            self.log(f"Stopping orphaned services: {', '.join(f'{n} ({p})' for n, p in orphans)}")
+            await asyncio.gather(*(kill_group(pid) for _, pid in orphans))
+        return [name for name, _ in orphans]
+
+    # ─── Services ────────────────────────────────────────
+
+    async def healthy(self, name):
+        service = self.defs[name]
+        state = self.supervisor.get(name)
+        if service.port is None:
+            if state is None or not state.running:
+                return False
+            return state.ready.is_set() if service.spec.ready_line else True
+        probe = AsyncHttpProbe("127.0.0.1", service.port, service.path, expect=service.expect)
+        try:
+            return (await probe.check()).ok
+        finally:
+            await probe.close()
+
+    def _names(self, names):
+        names = list(self.defs) if names is None else list(names)
+        unknown = [name for name in names if name not in self.defs]
+        if unknown:
+            raise ValueError(f"Unknown service(s): {', '.join(unknown)} (have {', '.join(self.defs)})")
+        return [name for name in SERVICES if name in names]
+
+    async def _start_one(self, name):
+        state = self.supervisor.get(name)
+        if state is not None and state.running:
+            return "reused" if await self.healthy(name) else "starting"
+        if self.defs[name].port is not None and await self.healthy(name):
+            self.external.add(name)
+            return "external"
+        self.external.discard(name)
+        try:
+            await self.supervisor.start(self.defs[name].spec)
+        except OSError as e:
+            self.log(f"{name}: {e}", "error")
+            return f"failed: {e}"
+        return "started"
+
+    async def start(self, names=None):
+        """Start services that are not already running; never waits for readiness"""
+        names = self._names(names)
+        outcomes = await asyncio.gather(*(self._start_one(name) for name in names))
+        self.write_registry()
+        return dict(zip(names, outcomes))
+
+    async def stop(self, names=None, timeout=5.0):
+        """Stop our services' process groups in parallel; external services are left alone"""
+        names = [name for name in self._names(names) if self.supervisor.get(name)]
+        await asyncio.gather(*(self.supervisor.stop(name, timeout) for name in names))
+        for name in names:
+            del self.supervisor.services[name]
+        self.write_registry()
+        return {name: "stopped" for name in names}
+
+    async def restart(self, names=None):
+        await self.stop(names)
+        return await self.start(names)
+
+    async def reload(self):
+        """Re-read .env; restart running services whose command or environment changed"""
+        fresh = stack_services(self.offline)
+        changed = [name for name, service in fresh.items()
+                   if name in self.defs and service.fingerprint() != self.defs[name].fingerprint()]
+        removed = [name for name in self.defs if name not in fresh]
+        running = [name for name in changed + removed if self.supervisor.get(name)]
+        await self.stop(running)
+        self.defs = fresh
+        self.external.intersection_update(fresh)
+        restarted = await self.start([name for name in running if name in fresh])
+        return {"changed": changed, "removed": removed, "restarted": list(restarted)}
+
+    async def status(self):
+        names = list(self.defs)
+        health = await asyncio.gather(*(self.healthy(name) for name in names))
+        registry = self.registry()
+        services = {}
+        for name, ok in zip(names, health):
+            entry = registry["services"].get(name) or {"name": name, "status": "stopped", "pid": None,
+                                                       "port": self.defs[name].port}
+            entry["healthy"] = ok
+            if name not in self.supervisor.services and name not in self.external and ok:
+                entry["status"] = "external"
+            services[name] = entry
+        registry["services"] = services
+        registry["daemon"]["uptime"] = round(time.time() - self.started_at, 1)
+        return registry
+
+    # ─── Control API ─────────────────────────────────────
+
+    async def handle(self, request):
+        cmd = request.get("cmd")
+        names = request.get("services") or None
+        if cmd == "status":
+            return await self.status()
+        if cmd == "start":
+            return {"services": await self.start(names)}
+        if cmd == "stop":
+            return {"services": await self.stop(names)}
+        if cmd == "restart":
+            return {"services": await self.restart(names)}
+        if cmd == "reload":
+            return await self.reload()
+        if cmd == "logs":
+            records = self.logs.tail(int(request.get("n", 50)), service=request.get("service"))
+            return {"logs": [record.format() for record in records]}
+        if cmd == "shutdown":
+            self._shutdown.set()
+            return {"shutdown": True}
+        raise ValueError(f"Unknown command: {cmd}")
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = {"ok": True, **await self.handle(json.loads(line))}
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _listen(self):
+        if UNIX_SOCKETS:
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            self._server = await asyncio.start_unix_server(self._client, path=str(self.socket_path))
+            self.control = {"unix": str(self.socket_path)}
+        else:
+            self._server = await asyncio.start_server(self._client, "127.0.0.1", 0)
+            self.control = {"tcp": ["127.0.0.1", self._server.sockets[0].getsockname()[1]]}
+
+    async def run(self, start=False):
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        self.flusher = LogFlusher(path=self.run_dir / "services.log")
+        self._shutdown = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        if sys.platform != "win32":
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(sig, self._shutdown.set)
+        try:
+            await self.reap_orphans()
+            self.defs = stack_services(self.offline)
+            await self._listen()
+            self.write_registry()
+            self.log(f"Daemon {os.getpid()} listening on {self.control}")
+            if start:
+                await self.start()
+            await self._shutdown.wait()
+            self.log("Shutting down")
+            await self.stop()
+        finally:
+            if self._server is not None:
+                self._server.close()
+                await self._server.wait_closed()
+            if UNIX_SOCKETS and self.socket_path.exists():
+                self.socket_path.unlink()
+            try:
+                self.registry_path.unlink()
+            except OSError:
+                pass
+            self.flusher.close()
+
+
+# ─── Client ──────────────────────────────────────────────
+
+class DaemonError(RuntimeError):
+    pass
+
+
+class DaemonClient:
+    """Synchronous control API client; one short connection per request, so it is thread-safe"""
+
+    def __init__(self, control, timeout=30.0):
+        self.control = control
+        self.timeout = timeout
+
+    @classmethod
+    def from_registry(cls, run_dir=RUN_DIR, timeout=30.0):
+        """Client for the daemon recorded in the registry, or None"""
+        try:
+            registry = json.loads((Path(run_dir) / "registry.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        control = (registry.get("daemon") or {}).get("control")
+        return cls(control, timeout) if control else None
+
+    def _connect(self):
+        if "unix" in self.control:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = self.control["unix"]
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = tuple(self.control["tcp"])
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def request(self, cmd, **params):
+        with self._connect() as sock:
+            sock.sendall(json.dumps({"cmd": cmd, **params}).encode("utf-8") + b"\n")
+            buffer = b""
+            while not buffer.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    raise DaemonError("Daemon closed the connection")
+                buffer += chunk
+        response = json.loads(buffer)
+        if not response.pop("ok", False):
+            raise DaemonError(response.get("error", "request failed"))
+        return response
+
+    def status(self):
+        return self.request("status")
+
+    def start(self, *services):
+        return self.request("start", services=list(services))["services"]
+
+    def stop(self, *services):
+        return self.request("stop", services=list(services))["services"]
+
+    def restart(self, *services):
+        return self.request("restart", services=list(services))["services"]
+
+    def pids(self):
+        """{service: pid} of running services (a telemetry sampler source)"""
+        try:
+            services = self.status()["services"]
+        except (OSError, ValueError, DaemonError):
+            return {}
+        return {name: s["pid"] for name, s in services.items() if s.get("pid")}
+
+
+def attach(run_dir=RUN_DIR, timeout=30.0):
+    """Client for a live daemon, or None (no registry, or a stale one)"""
+    client = DaemonClient.from_registry(run_dir, timeout)
+    if client is None:
+        return None
+    try:
+        client.request("status")
+    except (OSError, ValueError, DaemonError):
+        return None
+    return client
+
+
+def spawn(offline=False, run_dir=RUN_DIR, deadline=10.0):
+    """Start a detached daemon and wait until it answers; returns its client"""
+    run_dir = Path(run_dir)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    cmd = [sys.executable, "-m", "akrizu_stack.daemon", "serve"] + (["--offline"] if offline else [])
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SCRIPTS_DIR),
+                                                                      os.environ.get("PYTHONPATH")]))}
+    kwargs = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+    else:
+        kwargs["start_new_session"] = True  # outlives the launcher's terminal
+    with open(run_dir / "daemon.log", "ab") as log_file:
+        proc = subprocess.Popen(cmd, cwd=str(SCRIPTS_DIR), env=env, stdin=subprocess.DEVNULL,
+                                stdout=log_file, stderr=log_file, **kwargs)
+    end = time.monotonic() + deadline
+    while time.monotonic() < end:
+        client = attach(run_dir)
+        if client is not None and client.status()["daemon"]["pid"] == proc.pid:
+            return client
+        if proc.poll() is not None:
+            raise DaemonError(f"Daemon exited with code {proc.returncode} (see {run_dir / 'daemon.log'})")
+        time.sleep(0.05)
+    raise DaemonError(f"Daemon did not answer within {deadline:.0f}s (see {run_dir / 'daemon.log'})")
+
+
+def ensure(offline=False, run_dir=RUN_DIR):
+    """(client, attached): the running daemon, else a newly spawned one"""
+    client = attach(run_dir)
+    if client is not None:
+        return client, True
+    return spawn(offline, run_dir), False
+
+
+# ─── CLI ─────────────────────────────────────────────────
+
+def format_status(status):
+    daemon = status["daemon"]
+    lines = [f"Daemon {daemon['pid']} ({'offline' if daemon['offline'] else 'online'}), "
+             f"up {daemon.get('uptime', 0):.0f}s"]
+    for name, s in status["services"].items():
+        health = "healthy" if s.get("healthy") else "not healthy"
+        port = f":{s['port']}" if s.get("port") else ""
+        pid = f"pid {s['pid']}" if s.get("pid") else "-"
+        lines.append(f"  {name:<13} {s['status']:<9} {health:<12} {pid:<11} {port}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Akrizu launcher daemon")
+    parser.add_argument("command", choices=("serve", "status", "start", "stop", "restart", "reload", "logs",
+                                            "shutdown"))
+    parser.add_argument("services", nargs="*", help=f"Subset of {', '.join(SERVICES)} (default: all)")
+    parser.add_argument("--offline", action="store_true", help="serve: Ollama/Qdrant stand-ins instead of WSL")
+    parser.add_argument("--start", action="store_true", help="serve: start every service right away")
+    parser.add_argument("-n", type=int, default=50, help="logs: lines to show")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        if attach() is not None:
+            print("✓ A launcher daemon is already running")
+            return 0
+        asyncio.run(LauncherDaemon(offline=args.offline).run(start=args.start))
+        return 0
+
+    client = attach()
+    if client is None:
+        print("✗ No launcher daemon running (start one with: python -m akrizu_stack.daemon serve)")
+        return 1
+    try:
+        if args.command == "status":
+            print(format_status(client.status()))
+        elif args.command == "logs":
+            for line in client.request("logs", service=args.services[0] if args.services else None,
+                                       n=args.n)["logs"]:
+                print(line)
+        elif args.command == "reload":
+            print(json.dumps(client.request("reload"), indent=2))
+        elif args.command == "shutdown":
+            pid = client.status()["daemon"]["pid"]
+            client.request("shutdown")
+            end = time.monotonic() + 30
+            while pid_alive(pid) and time.monotonic() < end:
+                time.sleep(0.05)
+            print("✓ Daemon stopped")
+        else:
+            for name, outcome in client.request(args.command, services=args.services)["services"].items():
+                print(f"  {name:<13} {outcome}")
+    except DaemonError as e:
+        print(f"✗ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
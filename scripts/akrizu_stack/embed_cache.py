@@ -0,0 +1,192 @@
+"""
+Akrizu Stack — Embedding Cache
+Python side of the content-addressed on-disk embedding cache shared with
+akrizu-knowledge/src/embed-cache.mjs (same file, same format).
+
+File format (little-endian, append-only):
+  header  b"AKEMB001"
+  record  key (32, sha256) | last_used f64 | dim u32 | marker u32 | float32[dim]
+
+key = sha256(model + "\\0" + dim + "\\0" + text). The file is memory-mapped for
+reads and last-used updates; new vectors are appended and the file is
+LRU-compacted once it outgrows its size cap.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+
+MAGIC = b"AKEMB001"
+RECORD_HEADER = 48
+RECORD_MARKER = 0xAE4B1D5E
+MAX_DIM = 1 << 16
+COMPACT_TARGET = 0.8
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_HEADER = struct.Struct("<32sdII")
+
+
+def cache_key(model, dim, text):
+    return hashlib.sha256(f"{model}\0{dim}\0{text}".encode("utf-8")).digest()
+
+
+def _encode(key, last_used, vector):
+    floats = array("f", vector)
+    if sys.byteorder == "big":
+        floats.byteswap()
+    return _HEADER.pack(key, last_used, len(floats), RECORD_MARKER) + floats.tobytes()
+
+
+class EmbeddingCache:
+    """Shared embedding cache; not thread-safe — use it from one thread"""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.entries = {}  # key → [offset, dim, last_used]
+        self.hits = 0
+        self.misses = 0
+        self._append = None
+        self._rw = None
+        self._map = None
+        self._ino = None
+        self._scanned = 0
+        self._damaged = False
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            self.path.write_bytes(MAGIC)
+        self._append = open(self.path, "ab")
+        self._rw = open(self.path, "r+b")
+        if self._rw.read(len(MAGIC)) != MAGIC:
+            # Not ours (or truncated) — start over rather than misread vectors
+            self.close()
+            os.replace(self.path, f"{self.path}.corrupt")
+            return self.open()
+        self._ino = os.fstat(self._rw.fileno()).st_ino
+        self.entries = {}
+        self._scanned = len(MAGIC)
+        self._damaged = False
+        self._remap()
+        return self
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        size = os.fstat(self._rw.fileno()).st_size
+        if size > len(MAGIC):
+            self._map = mmap.mmap(self._rw.fileno(), size, access=mmap.ACCESS_WRITE)
+        self._scan(size)
+
+    def _scan(self, size):
+        pos = self._scanned
+        while pos + RECORD_HEADER <= size:
+            key, last_used, dim, marker = _HEADER.unpack_from(self._map, pos)
+            if marker != RECORD_MARKER or dim == 0 or dim > MAX_DIM:
+                # Garbage in the middle of the file: the next put() rewrites it
+                self._damaged = True
+                break
+            end = pos + RECORD_HEADER + dim * 4
+            if end > size:
+                break  # Partially written by another process
+            self.entries[key] = [pos, dim, last_used]
+            pos = end
+        self._scanned = pos
+
+    def refresh(self):
+        """Pick up records appended (or a compaction done) by other processes"""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            self.close()
+            return self.open()
+        if stat.st_ino != self._ino:
+            self.close()
+            return self.open()
+        if stat.st_size > self._scanned:
+            self._remap()
+        return self
+
+    def _vector(self, offset, dim):
+        floats = array("f")
+        start = offset + RECORD_HEADER
+        floats.frombytes(self._map[start:start + dim * 4])
+        if sys.byteorder == "big":
+            floats.byteswap()
+        return floats.tolist()
+
+    def get(self, model, dim, text):
+        """Cached vector (list of floats) or None"""
+        key = cache_key(model, dim, text)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.refresh()
+            entry = self.entries.get(key)
+        if entry is None or entry[1] != dim:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry[2] = time.time()
+        # last_used is updated in place through the shared mapping
+        struct.pack_into("<d", self._map, entry[0] + 32, entry[2])
+        return self._vector(entry[0], dim)
+
+    def put(self, model, dim, text, vector):
+        if len(vector) != dim:
+            return
+        self._append.write(_encode(cache_key(model, dim, text), time.time(), vector))
+        self._append.flush()
+        self.refresh()
+        if self._damaged or self._scanned > self.max_bytes:
+            self.compact()
+
+    def compact(self, target_bytes=None):
+        """Rewrite the file with the most recently used entries that fit in the target size"""
+        target_bytes = target_bytes if target_bytes is not None else self.max_bytes * COMPACT_TARGET
+        self.refresh()
+        ranked = sorted(self.entries.items(), key=lambda item: -item[1][2])
+        tmp = Path(f"{self.path}.{os.getpid()}.tmp")
+        size = len(MAGIC)
+        with open(tmp, "wb") as out:
+            out.write(MAGIC)
+            for key, (offset, dim, last_used) in ranked:
+                record = RECORD_HEADER + dim * 4
+                if size + record > target_bytes:
+                    break
+                out.write(_HEADER.pack(key, last_used, dim, RECORD_MARKER))
+                out.write(self._map[offset + RECORD_HEADER:offset + record])
+                size += record
+        self.close()
+        try:
+            os.replace(tmp, self.path)
+        except OSError:
+            # Windows refuses to replace a file another process has open
+            tmp.unlink(missing_ok=True)
+        self.open()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self._scanned,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        for handle in (self._append, self._rw):
+            if handle is not None:
+                handle.close()
+        self._append = None
+        self._rw = None
@@ -0,0 +1,586 @@
+"""
+Akrizu Stack — Bulk Ingestion
+Rebuilds the Qdrant collection from the .agent knowledge base:
+chunks markdown exactly like src/chunker.mjs, embeds many chunks per
+Ollama /api/embed request (adaptive batch size, bounded worker pool) and
+streams fixed-size pages of points to Qdrant while embedding continues.
+
+Usage:
+  python -m akrizu_stack.ingest [--workers 4] [--batch 16] [--page 64] [--recreate]
+  python -m akrizu_stack.ingest --offline --embed-per-item-ms 2   # against local stand-ins
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+import threading
+import urllib.parse
+
+from akrizu_stack.embed_cache import EmbeddingCache
+from akrizu_stack.probe import HttpClient
+
+AKRIZU_DIR = Path(__file__).resolve().parents[2] / "akrizu-knowledge"
+
+
+# ─── Configuration (mirrors src/config.mjs) ──────────────
+
+def load_env(path):
+    """Minimal .env reader: KEY=VALUE lines, # comments, optional quotes"""
+    values = {}
+    try:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return values
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        values[key.strip()] = value.strip().strip("'\"")
+    return values
+
+
+def load_config(env_path=AKRIZU_DIR / ".env"):
+    """Same keys and defaults as CONFIG in src/config.mjs; the process env wins over .env"""
+    env = {**load_env(env_path), **os.environ}
+    return {
+        "qdrant_url": env.get("QDRANT_URL") or "http://localhost:6333",
+        "qdrant_api_key": env.get("QDRANT_API_KEY") or "",
+        "collection": env.get("QDRANT_COLLECTION") or "senior_dev_mind",
+        "vector_size": int(env.get("VECTOR_SIZE") or 768),
+        "ollama_url": env.get("OLLAMA_URL") or "http://localhost:11434",
+        "embed_model": env.get("OLLAMA_EMBED_MODEL") or "nomic-embed-text",
+        "knowledge_base_path": (AKRIZU_DIR / (env.get("KNOWLEDGE_BASE_PATH") or "../.agent")).resolve(),
+        # Same file as the Node side; EMBED_CACHE_PATH=off disables it
+        "embed_cache_path": (None if env.get("EMBED_CACHE_PATH") == "off" else
+                             (AKRIZU_DIR / (env.get("EMBED_CACHE_PATH") or ".cache/embeddings.bin")).resolve()),
+        "embed_cache_max_mb": int(env.get("EMBED_CACHE_MAX_MB") or 256),
+        "collection_version_path": (AKRIZU_DIR / (env.get("COLLECTION_VERSION_PATH")
+                                                  or ".cache/collection-version.json")).resolve(),
+        # "embedded": akrizu_stack.vector_store serves QDRANT_URL instead of a Qdrant service
+        "vector_store": env.get("VECTOR_STORE") or "qdrant",
+        "vector_store_path": (AKRIZU_DIR / (env.get("VECTOR_STORE_PATH") or ".cache/vector-store")).resolve(),
+    }
+
+
+def bump_collection_version(path, collection):
+    """Tell a running RAG server its cached search results are stale (see src/query-cache.mjs)"""
+    path = Path(path)
+    try:
+        versions = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        versions = {}
+    versions[collection] = versions.get(collection, 0) + 1
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(versions), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+# ─── Chunker (port of src/chunker.mjs) ───────────────────
+
+CATEGORY_MAP = {
+    'rules': 'rule',
+    'workflows': 'workflow',
+    'template': 'template',
+    'npm-packages': 'package',
+    'memory': 'memory',
+    'qa': 'qa',
+}
+
+TAG_KEYWORDS = {
+    'backend': ['api', 'endpoint', 'server', 'route', 'controller', 'nestjs', 'express'],
+    'frontend': ['ui', 'component', 'jsx', 'tsx', 'css', 'tailwind', 'shadcn', 'react', 'next.js', 'nextjs'],
+    'api': ['rest', 'fetch', 'axios', 'http', 'crud', 'get', 'post', 'put', 'delete', 'endpoint'],
+    'auth': ['nextauth', 'login', 'session', 'token', 'jwt', 'middleware', 'auth', 'password'],
+    'database': ['mongodb', 'mongoose', 'schema', 'collection', 'query', 'index', 'atlas'],
+    'debugging': ['debug', 'trace', 'error', 'fix', 'bug', 'troubleshoot', 'log', 'issue'],
+    'mvvm': ['mvvm', 'viewmodel', 'model', 'view', 'presentation', 'separation'],
+    'redux': ['redux', 'slice', 'store', 'dispatch', 'action', 'reducer', 'toolkit'],
+    'testing': ['test', 'lint', 'build', 'verify', 'validate', 'jest', 'vitest'],
+    'security': ['security', 'pci', 'encryption', 'xss', 'csrf', 'cors', 'sanitize', 'rate limit'],
+    'admin': ['admin', 'dashboard', 'sidebar', 'table', 'manage'],
+    'booking': ['booking', 'event', 'reservation', 'schedule', 'calendar'],
+    'performance': ['performance', 'lazy', 'dynamic import', 'optimization', 'cache', 'ssr', 'server component'],
+    'ui_ux': ['glassmorphism', 'animation', 'framer', 'hover', 'micro-interaction', 'responsive', 'premium'],
+    'structure': ['folder', 'directory', 'structure', 'organization', 'architecture', 'project-structure'],
+    'scalability': ['scalability', 'scale', 'growth', 'modular', 'barrel', 'dry', '3-use'],
+}
+
+
+def js_len(text):
+    """String length in UTF-16 code units, like JavaScript's .length"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def detect_category(rel_path):
+    for folder, category in CATEGORY_MAP.items():
+        if rel_path.startswith(folder):
+            return category
+    return 'memory'
+
+
+def detect_tags(content):
+    lower = content.lower()
+    return [tag for tag, keywords in TAG_KEYWORDS.items() if any(kw in lower for kw in keywords)]
+
+
+def detect_priority(content, category):
+    lower = content.lower()
+    if 'critical' in lower or 'hard rule' in lower or 'must' in lower or 'mandatory' in lower:
+        return 'critical'
+    if 'important' in lower or 'required' in lower or 'should' in lower:
+        return 'high'
+    if category == 'template':
+        return 'medium'
+    return 'normal'
+
+
+def split_by_section(content, file_path):
+    """Split markdown by ## headers, prefixing each chunk with its # title and section"""
+    lines = content.split('\n')
+    chunks = []
+    current_h1 = Path(file_path).stem
+    current_section = 'Introduction'
+    current_lines = []
+    line_start = 1
+
+    def push():
+        text = '\n'.join(current_lines).strip()
+        if js_len(text) > 30:  # Skip tiny fragments
+            chunks.append({
+                'section': current_section,
+                'content': f"# {current_h1}\n## {current_section}\n{text}",
+                'line_start': line_start,
+            })
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        # Skip YAML frontmatter
+        if i == 0 and line.strip() == '---' and '---' in lines[1:]:
+            i = lines.index('---', 1) + 1
+            continue
+        if line.startswith('# '):
+            current_h1 = line[2:].strip()
+        elif line.startswith('## '):
+            if current_lines:
+                push()
+            current_section = line[3:].strip()
+            current_lines = []
+            line_start = i + 1
+        else:
+            current_lines.append(line)
+        i += 1
+
+    if current_lines:
+        push()
+
+    # If no sections found, return entire file as one chunk
+    if not chunks and js_len(content.strip()) > 30:
+        chunks.append({'section': 'Full Document', 'content': content.strip(), 'line_start': 1})
+    return chunks
+
+
+def _iso_mtime(mtime):
+    """Date.prototype.toISOString() format: 2024-01-02T03:04:05.678Z"""
+    dt = datetime.fromtimestamp(mtime, tz=timezone.utc)
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + f"{dt.microsecond // 1000:03d}Z"
+
+
+def point_id(source_file, section, ordinal=0):
+    """Stable Qdrant point ID, identical to pointId() in src/chunker.mjs"""
+    digest = hashlib.sha256(f"{source_file}#{section}#{ordinal}".encode('utf-8')).hexdigest()
+    return int(digest[:13], 16)
+
+
+def split_long(section, max_chars):
+    """
+    Split one section chunk at blank lines into parts of at most `max_chars`
+    (a single longer paragraph stays whole). Every part keeps the # title /
+    ## section header, so parts of a section still carry its label.
+    """
+    if not max_chars or js_len(section['content']) <= max_chars:
+        return [section]
+    header_lines = section['content'].split('\n', 2)
+    header, body = '\n'.join(header_lines[:2]), (header_lines[2] if len(header_lines) > 2 else '')
+    parts, current = [], ''
+    for paragraph in (p.strip() for p in body.split('\n\n')):
+        if not paragraph:
+            continue
+        candidate = f"{current}\n\n{paragraph}" if current else paragraph
+        if current and js_len(header) + 1 + js_len(candidate) > max_chars:
+            parts.append(current)
+            current = paragraph
+        else:
+            current = candidate
+    if current:
+        parts.append(current)
+    return [{**section, 'content': f"{header}\n{part}"} for part in parts]
+
+
+def chunk_file(path, base_path, max_chars=None):
+    """
+    Chunks of one markdown file with the same metadata as chunker.mjs.
+    `max_chars` additionally splits long sections (see split_long); the
+    Node chunker has no such limit, so it is only used by evaluations.
+    """
+    path = Path(path)
+    rel_path = path.relative_to(base_path).as_posix()
+    content = path.read_text(encoding='utf-8')
+    category = detect_category(rel_path)
+    stat = path.stat()
+    chunks = []
+    seen = {}
+    sections = [part for section in split_by_section(content, path) for part in split_long(section, max_chars)]
+    for section in sections:
+        ordinal = seen.get(section['section'], 0)
+        seen[section['section']] = ordinal + 1
+        chunks.append({
+            'id': point_id(rel_path, section['section'], ordinal),
+            'content': section['content'],
+            'metadata': {
+                'source_file': rel_path,
+                'section': section['section'],
+                'category': category,
+                'tags': detect_tags(section['content']),
+                'priority': detect_priority(section['content'], category),
+                'line_start': section['line_start'],
+                'file_size': stat.st_size,
+                'last_modified': _iso_mtime(stat.st_mtime),
+                'char_count': js_len(section['content']),
+            },
+        })
+    return chunks
+
+
+def chunk_knowledge_base(base_path, max_chars=None):
+    base_path = Path(base_path)
+    files = sorted(glob.glob(str(base_path / '**' / '*.md'), recursive=True))
+    chunks = []
+    for file_path in files:
+        if os.path.isfile(file_path):
+            chunks.extend(chunk_file(file_path, base_path, max_chars))
+    return files, chunks
+
+
+# ─── Embedding ───────────────────────────────────────────
+
+class EmbedError(RuntimeError):
+    pass
+
+
+class AdaptiveBatch:
+    """
+    Batch size controller: doubles while requests finish well under the
+    target latency, halves when they are slow or fail.
+    """
+
+    def __init__(self, size=16, min_size=1, max_size=128, target_seconds=2.0):
+        self.size = size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self._lock = threading.Lock()
+
+    def observe(self, count, seconds):
+        with self._lock:
+            if seconds > self.target_seconds:
+                self.size = max(self.min_size, self.size // 2)
+            elif seconds < self.target_seconds / 2 and count >= self.size:
+                self.size = min(self.max_size, self.size * 2)
+
+    def shrink(self):
+        with self._lock:
+            self.size = max(self.min_size, self.size // 2)
+
+
+class OllamaEmbedder:
+    """Multi-input /api/embed; one kept-alive connection per worker thread"""
+
+    def __init__(self, url, model, timeout=120):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self._local = threading.local()
+        self._clients = []
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = HttpClient.from_url(self.url, timeout=self.timeout)
+            self._local.client = client
+            self._clients.append(client)
+        return client
+
+    def embed_many(self, texts):
+        try:
+            status, data = self._client().post_json('/api/embed', {'model': self.model, 'input': texts})
+        except (OSError, ValueError) as e:
+            raise EmbedError(f"Ollama embed request failed: {e}") from e
+        if status != 200:
+            raise EmbedError(f"Ollama embed failed ({status}): {data}")
+        embeddings = (data or {}).get('embeddings') or []
+        if len(embeddings) != len(texts):
+            raise EmbedError(f"Ollama returned {len(embeddings)} embeddings for {len(texts)} inputs")
+        return embeddings
+
+    def close(self):
+        for client in self._clients:
+            client.close()
+
+
+# ─── Qdrant ──────────────────────────────────────────────
+
+INDEXED_FIELDS = ('category', 'tags', 'priority', 'source_file')
+
+
+class QdrantWriter:
+    """The slice of the Qdrant REST API ingestion needs"""
+
+    def __init__(self, url, collection, api_key='', timeout=60):
+        headers = {'api-key': api_key} if api_key else None
+        self.client = HttpClient.from_url(url, timeout=timeout, headers=headers)
+        self.collection = collection
+        self.base = f"/collections/{urllib.parse.quote(collection)}"
+
+    def _call(self, method, path, payload=None):
+        if method == 'GET':
+            status, data = self.client.get_json(path)
+        else:
+            status, data = self.client.post_json(path, payload or {}, method=method)
+        return status, (data or {})
+
+    def info(self):
+        status, data = self._call('GET', self.base)
+        return data.get('result') if status == 200 else None
+
+    def ensure_collection(self, vector_size, recreate=False, log=print):
+        """Same behaviour as ensureCollection() in src/qdrant.mjs"""
+        info = self.info()
+        if info is not None:
+            existing = (((info.get('config') or {}).get('params') or {}).get('vectors') or {}).get('size')
+            if recreate or existing != vector_size:
+                log(f"⚠️  Recreating collection \"{self.collection}\" "
+                    f"(vector size {existing}, expected {vector_size})")
+                self._call('DELETE', self.base)
+            else:
+                log(f"✅ Collection \"{self.collection}\" exists "
+                    f"({info.get('points_count')} points, {vector_size}-dim)")
+                return info
+
+        log(f"🏗️  Creating collection \"{self.collection}\" ({vector_size}-dim, cosine)...")
+        status, data = self._call('PUT', self.base, {
+            'vectors': {'size': vector_size, 'distance': 'Cosine'},
+            'on_disk_payload': True,
+        })
+        if status != 200:
+            raise RuntimeError(f"Create collection failed ({status}): {data}")
+        for field in INDEXED_FIELDS:
+            self._call('PUT', f"{self.base}/index?wait=true",
+                       {'field_name': field, 'field_schema': 'keyword'})
+        log(f"✅ Collection \"{self.collection}\" created with indexes")
+        return self.info()
+
+    def upsert(self, points):
+        status, data = self._call('PUT', f"{self.base}/points?wait=true", {'points': points})
+        if status != 200:
+            raise RuntimeError(f"Upsert failed ({status}): {data}")
+
+    def delete_except(self, keep_ids):
+        """Delete every point not in `keep_ids`, except memory.mjs auto-generated summaries"""
+        status, data = self._call('POST', f"{self.base}/points/delete?wait=true", {
+            'filter': {'must_not': [
+                {'has_id': list(keep_ids)},
+                {'key': 'auto_generated', 'match': {'value': True}},
+            ]},
+        })
+        if status != 200:
+            raise RuntimeError(f"Delete failed ({status}): {data}")
+
+    def drop(self):
+        """Delete the whole collection (scratch collections of evaluations)"""
+        self._call('DELETE', self.base)
+
+    def close(self):
+        self.client.close()
+
+
+# ─── Pipeline ────────────────────────────────────────────
+
+def ingest(config=None, workers=4, batch_size=16, max_batch=128, page_size=64,
+           recreate=False, max_chunk_chars=None, log=print):
+    """Chunk → embed (cached, batched, concurrent) → paged upserts. Returns a stats dict."""
+    config = config or load_config()
+    start = time.perf_counter()
+    model_id = f"ollama/{config['embed_model']}"
+    dim = config['vector_size']
+
+    qdrant = QdrantWriter(config['qdrant_url'], config['collection'], config['qdrant_api_key'])
+    embedder = OllamaEmbedder(config['ollama_url'], config['embed_model'])
+    batch = AdaptiveBatch(size=batch_size, max_size=max_batch)
+    cache = None
+    if config.get('embed_cache_path'):
+        try:
+            cache = EmbeddingCache(config['embed_cache_path'],
+                                   config['embed_cache_max_mb'] * 1024 * 1024).open()
+        except OSError as e:
+            log(f"⚠️  Embedding cache disabled: {e}")
+    try:
+        qdrant.ensure_collection(dim, recreate=recreate, log=log)
+
+        files, chunks = chunk_knowledge_base(config['knowledge_base_path'], max_chunk_chars)
+        log(f"✂️  Chunked into {len(chunks)} sections across {len(files)} files")
+        chunked_at = time.perf_counter()
+        texts = [chunk['content'] for chunk in chunks]
+
+        failed = []
+        page = []
+        upserted = 0
+        upserts = []
+        retry = deque()
+        inflight = {}
+        embedded = 0
+        requests = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as pool, ThreadPoolExecutor(max_workers=1) as writer:
+            def add_point(i, vector):
+                nonlocal page
+                if len(vector) != dim:
+                    raise RuntimeError(f"Embedding has {len(vector)} dims, collection expects {dim}")
+                page.append({
+                    'id': chunks[i]['id'],  # Stable per file + section (same as ingest.mjs)
+                    'vector': vector,
+                    'payload': {'content': chunks[i]['content'], **chunks[i]['metadata']},
+                })
+                while len(page) >= page_size:
+                    upserts.append(writer.submit(qdrant.upsert, page[:page_size]))
+                    page = page[page_size:]
+
+            # Unchanged text never reaches Ollama
+            todo = []
+            for i, text in enumerate(texts):
+                vector = cache.get(model_id, dim, text) if cache else None
+                if vector is None:
+                    todo.append(i)
+                else:
+                    add_point(i, vector)
+            cached = len(texts) - len(todo)
+            embedded = cached
+            cursor = 0
+
+            while cursor < len(todo) or retry or inflight:
+                while len(inflight) < workers and (retry or cursor < len(todo)):
+                    if retry:
+                        indices = retry.popleft()
+                    else:
+                        indices = todo[cursor:cursor + batch.size]
+                        cursor += len(indices)
+                    future = pool.submit(embedder.embed_many, [texts[i] for i in indices])
+                    inflight[future] = (indices, time.perf_counter())
+
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    indices, sent_at = inflight.pop(future)
+                    requests += 1
+                    try:
+                        vectors = future.result()
+                    except EmbedError as e:
+                        batch.shrink()
+                        if len(indices) == 1:
+                            meta = chunks[indices[0]]['metadata']
+                            log(f"\n   ❌ Failed to embed chunk \"{meta['section']}\" from {meta['source_file']}: {e}")
+                            failed.append(indices[0])
+                        else:
+                            half = len(indices) // 2
+                            retry.append(indices[:half])
+                            retry.append(indices[half:])
+                        continue
+
+                    batch.observe(len(indices), time.perf_counter() - sent_at)
+                    for i, vector in zip(indices, vectors):
+                        add_point(i, vector)
+                        if cache:
+                            cache.put(model_id, dim, texts[i], vector)
+                    embedded += len(indices)
+                    print(f"\r   Embedding {embedded}/{len(texts)} (batch {batch.size})...", end='', flush=True)
+
+                # Surface upsert failures early instead of after embedding everything
+                for future in [f for f in upserts if f.done()]:
+                    future.result()
+            if page:
+                upserts.append(writer.submit(qdrant.upsert, page))
+            for future in upserts:
+                future.result()
+                upserted += 1
+        print()
+        # Sections that no longer exist (and sequential IDs from older ingests)
+        qdrant.delete_except(chunk['id'] for chunk in chunks)
+    finally:
+        embedder.close()
+        qdrant.close()
+        if config.get('collection_version_path'):
+            bump_collection_version(config['collection_version_path'], config['collection'])
+        if cache:
+            cache.close()
+
+    elapsed = time.perf_counter() - start
+    embed_seconds = time.perf_counter() - chunked_at
+    stats = {
+        'files': len(files),
+        'chunks': len(chunks),
+        'embedded': embedded,
+        'cached': cached,
+        'failed': len(failed),
+        'embed_requests': requests,
+        'upsert_pages': upserted,
+        'final_batch_size': batch.size,
+        'seconds': round(elapsed, 3),
+        'chunks_per_s': round(embedded / embed_seconds, 1) if embed_seconds > 0 else 0.0,
+    }
+    log(f"   ✅ Embedded: {embedded} ({cached} from cache) | ❌ Failed: {len(failed)} | "
+        f"📤 {upserted} page(s) upserted | ⚡ {stats['chunks_per_s']} chunks/s")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the Qdrant collection from the knowledge base")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent /api/embed requests")
+    parser.add_argument("--batch", type=int, default=16, help="Initial texts per /api/embed request")
+    parser.add_argument("--max-batch", type=int, default=128)
+    parser.add_argument("--page", type=int, default=64, help="Points per Qdrant upsert")
+    parser.add_argument("--recreate", action="store_true", help="Drop and recreate the collection first")
+    parser.add_argument("--offline", action="store_true",
+                        help="Run against in-process Ollama/Qdrant stand-ins (akrizu_stack.standin)")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="Stand-in latency per /api/embed")
+    parser.add_argument("--embed-per-item-ms", type=float, default=0.0, help="Stand-in latency per embedded text")
+    args = parser.parse_args(argv)
+
+    standins = ()
+    if args.offline:
+        from akrizu_stack.standin import Faults, offline_env, start_standins
+        standins = start_standins(ollama_faults=Faults(args.embed_latency_ms, args.embed_per_item_ms))
+        os.environ.update(offline_env(standins[0].url, standins[1].url))
+
+    config = load_config()
+    print(f"📋 Qdrant:   {config['qdrant_url']} ({config['collection']})")
+    print(f"📋 Ollama:   {config['ollama_url']} ({config['embed_model']})")
+    print(f"📋 Source:   {config['knowledge_base_path']}")
+    try:
+        stats = ingest(config, workers=args.workers, batch_size=args.batch, max_batch=args.max_batch,
+                       page_size=args.page, recreate=args.recreate)
+    finally:
+        for server in standins:
+            server.stop()
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
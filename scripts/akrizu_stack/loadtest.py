@@ -0,0 +1,437 @@
+"""
+Akrizu Stack — RAG Server Load Test
+Drives the RAG server HTTP API (port 6444) from a pool of kept-alive asyncio
+connections with a weighted request mix, and records per-endpoint latency
+percentiles, throughput and error rates to JSON. Compared against a stored
+baseline, regressions in the retrieval hot path exit non-zero.
+
+Usage:
+  python -m akrizu_stack.loadtest --concurrency 16 --duration 30
+  python -m akrizu_stack.loadtest --mix search_text=3,context=1 --requests 2000
+  python -m akrizu_stack.loadtest --baseline loadtest-baseline.json   # exit 1 on regression
+  python -m akrizu_stack.loadtest --offline      # stand-ins + a throwaway node src/server.mjs
+
+Mix presets: retrieval (default), chat, full. `memory_save` writes to the
+knowledge base, so it is only in `full` and explicit mixes.
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import urllib.parse
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from akrizu_stack.probe import AsyncHttpClient, HttpProbe, backoff_delays
+
+TASKS = [
+    "Create a REST endpoint for bookings",
+    "How should I structure a new feature?",
+    "Debug a 401 on the booking dates API",
+    "Add form validation to the admin panel",
+    "Write unit tests for the auth service",
+    "Set up Redux state for the booking flow",
+    "Database migration for user roles",
+    "Improve page load performance",
+    "Scaffold an npm package for the admin UI",
+    "Review security of the login endpoint",
+    "Refactor the MVVM view model for payments",
+    "Paginate the bookings list API",
+]
+
+# name → (method, path); bodies/queries are built per request
+ENDPOINTS = {
+    "context": ("GET", "/context"),
+    "context_post": ("POST", "/context"),
+    "context_smart": ("GET", "/context/smart"),
+    "context_compressed": ("GET", "/context/compressed"),
+    "search": ("POST", "/search"),
+    "search_text": ("POST", "/search/text"),
+    "memory_save": ("POST", "/memory/save"),
+    "chat": ("POST", "/v1/chat/completions"),
+}
+
+MIXES = {
+    "retrieval": {"context": 3, "context_post": 1, "context_smart": 2, "context_compressed": 1,
+                  "search": 2, "search_text": 3},
+    "chat": {"chat": 1},
+    "full": {"context": 3, "context_post": 1, "context_smart": 2, "context_compressed": 1,
+             "search": 2, "search_text": 3, "chat": 1, "memory_save": 1},
+}
+
+# Metrics compared against a baseline: (name, higher_is_worse)
+COMPARED = (("p50_ms", True), ("p95_ms", True), ("rps", False))
+
+
+def parse_mix(spec):
+    """'retrieval' or 'search_text=3,context=1' → {endpoint: weight}"""
+    if spec in MIXES:
+        return dict(MIXES[spec])
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_request(name, rng, vector_size=768, chat_model="llama3.2:3b"):
+    """(method, path, json body or None) for one request to `name`"""
+    method, path = ENDPOINTS[name]
+    task = rng.choice(TASKS)
+    if name in ("context", "context_smart", "context_compressed"):
+        return method, f"{path}?{urllib.parse.urlencode({'task': task, 'limit': 5})}", None
+    if name == "context_post":
+        return method, path, {"task": task, "limit": 3}
+    if name == "search_text":
+        return method, path, {"query": task, "limit": 5}
+    if name == "search":
+        vector = [rng.uniform(-1, 1) for _ in range(vector_size)]
+        return method, path, {"vector": vector, "limit": 5}
+    if name == "memory_save":
+        return method, path, {"task": f"[loadtest] {task}", "summary": ["Load test entry"], "tags": ["loadtest"]}
+    return method, path, {"model": chat_model, "stream": False,
+                          "messages": [{"role": "user", "content": task}]}
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, min(len(sorted_values), int(round(p / 100 * len(sorted_values)))))
+    return sorted_values[rank - 1]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []       # seconds, successful and failed requests alike
+        self.statuses = Counter()
+        self.errors = 0
+
+    def record(self, seconds, status, ok):
+        self.latencies.append(seconds)
+        self.statuses[str(status)] += 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, elapsed):
+        ms = sorted(s * 1000 for s in self.latencies)
+        n = len(ms)
+
+        def rounded(value):
+            return round(value, 2) if value is not None else None
+
+        return {
+            "requests": n,
+            "errors": self.errors,
+            "error_rate": round(self.errors / n, 4) if n else 0.0,
+            "rps": round(n / elapsed, 2) if elapsed > 0 else 0.0,
+            "mean_ms": rounded(sum(ms) / n) if n else None,
+            "p50_ms": rounded(percentile(ms, 50)),
+            "p95_ms": rounded(percentile(ms, 95)),
+            "p99_ms": rounded(percentile(ms, 99)),
+            "max_ms": rounded(ms[-1]) if ms else None,
+            "statuses": dict(self.statuses),
+        }
+
+
+async def _run_phase(host, port, mix, concurrency, requests, duration, timeout, rng, vector_size,
+                     chat_model, stats=None):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_request():
+        nonlocal issued
+        if requests is not None and issued >= requests:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        issued += 1
+        name = rng.choices(names, weights)[0]
+        return (name,) + build_request(name, rng, vector_size, chat_model)
+
+    async def worker():
+        client = AsyncHttpClient(host, port, timeout=timeout)
+        try:
+            while True:
+                job = next_request()
+                if job is None:
+                    return
+                name, method, path, body = job
+                data = json.dumps(body).encode("utf-8") if body is not None else None
+                headers = {"Content-Type": "application/json"} if body is not None else None
+                start = time.perf_counter()
+                try:
+                    status, _ = await client.request(method, path, data, headers)
+                except (OSError, http.client.HTTPException, asyncio.TimeoutError) as e:
+                    status = e.__class__.__name__
+                ok = isinstance(status, int) and status < 400
+                if stats is not None:
+                    stats.setdefault(name, EndpointStats()).record(time.perf_counter() - start, status, ok)
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run_load(host="127.0.0.1", port=6444, mix=None, concurrency=8, requests=None, duration=None,
+                   warmup=20, timeout=30.0, seed=0, vector_size=768, chat_model="llama3.2:3b"):
+    """Warm up, then run the measured phase; returns the report dict"""
+    mix = mix or dict(MIXES["retrieval"])
+    if requests is None and duration is None:
+        requests = 500
+    rng = random.Random(seed)
+    if warmup:
+        await _run_phase(host, port, mix, min(concurrency, warmup), warmup, None, timeout, rng,
+                         vector_size, chat_model)
+
+    stats = {}
+    elapsed = await _run_phase(host, port, mix, concurrency, requests, duration, timeout, rng,
+                               vector_size, chat_model, stats)
+    total = EndpointStats()
+    for endpoint in stats.values():
+        total.latencies.extend(endpoint.latencies)
+        total.statuses.update(endpoint.statuses)
+        total.errors += endpoint.errors
+    return {
+        "target": f"http://{host}:{port}",
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "concurrency": concurrency,
+        "mix": mix,
+        "seed": seed,
+        "elapsed_s": round(elapsed, 3),
+        "total": total.summary(elapsed),
+        "endpoints": {name: stats[name].summary(elapsed) for name in sorted(stats)},
+    }
+
+
+def same_workload(report, baseline):
+    return report["mix"] == baseline.get("mix") and report["concurrency"] == baseline.get("concurrency")
+
+
+def compare(report, baseline, tolerance=0.25, min_delta_ms=1.0, error_tolerance=0.01):
+    """
+    List of regressions against a previous report: p50/p95 latency up or
+    throughput down by more than `tolerance` (fractional), or error rate up
+    by more than `error_tolerance` (absolute). Latency moves under
+    `min_delta_ms` are treated as noise. Throughput and totals are only
+    compared when the baseline used the same mix and concurrency.
+    """
+    regressions = []
+    comparable = same_workload(report, baseline)
+    sections = [("total", report["total"], baseline.get("total", {}))] if comparable else []
+    sections += [(name, stats, baseline.get("endpoints", {}).get(name))
+                 for name, stats in report["endpoints"].items()]
+    for name, stats, base in sections:
+        if not base:
+            continue
+        for metric, higher_is_worse in COMPARED:
+            if metric == "rps" and not comparable:
+                continue
+            value, ref = stats.get(metric), base.get(metric)
+            if not value or not ref:
+                continue
+            change = (value - ref) / ref
+            if higher_is_worse:
+                worse = change > tolerance and value - ref >= min_delta_ms
+            else:
+                worse = change < -tolerance
+            if worse:
+                regressions.append(f"{name}.{metric}: {ref} → {value} ({change * 100:+.1f}%)")
+        if stats["error_rate"] - base.get("error_rate", 0.0) > error_tolerance:
+            regressions.append(f"{name}.error_rate: {base.get('error_rate', 0.0)} → {stats['error_rate']}")
+    return regressions
+
+
+def print_summary(report):
+    print(f"🎯 {report['target']} — {report['concurrency']} connections, {report['elapsed_s']}s")
+    print(f"   {'endpoint':<20} {'reqs':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for name, s in rows:
+        def ms(value):
+            return f"{value:.1f}" if value is not None else "-"
+        print(f"   {name:<20} {s['requests']:>6} {s['rps']:>8.1f} {ms(s['p50_ms']):>8} "
+              f"{ms(s['p95_ms']):>8} {ms(s['p99_ms']):>8} {s['error_rate'] * 100:>6.1f}%")
+
+
+# ─── Offline target ──────────────────────────────────────
+
+class RagServerProcess:
+    """`node src/server.mjs` on `port` with `env`, started healthy or not at all"""
+
+    def __init__(self, port, env, logdir, log=print):
+        self.port = port
+        self.env = env
+        self.server_log = Path(logdir) / f"server-{port}.log"
+        self.log = log
+        self.process = None
+
+    def start(self, deadline=30):
+        from akrizu_stack.ingest import AKRIZU_DIR
+
+        env = {**os.environ, **self.env, "RAG_SERVER_PORT": str(self.port), "NODE_NO_WARNINGS": "1"}
+        # A file, not a pipe: a chatty server must never block on a full pipe
+        with open(self.server_log, "wb") as log_file:
+            self.process = subprocess.Popen(["node", "src/server.mjs"], cwd=str(AKRIZU_DIR), env=env,
+                                            stdout=subprocess.DEVNULL, stderr=log_file)
+        try:
+            self._wait_healthy(deadline)
+        except RuntimeError:
+            self.stop()
+            raise
+        return self
+
+    def _wait_healthy(self, deadline):
+        probe = HttpProbe("127.0.0.1", self.port, "/health", timeout=2)
+        end = time.monotonic() + deadline
+        delays = backoff_delays(base=0.05, max_delay=0.5)
+        try:
+            while True:
+                if self.process.poll() is not None:
+                    tail = self.server_log.read_text(encoding="utf-8", errors="replace")[-2000:]
+                    raise RuntimeError(f"RAG server exited with code {self.process.returncode}:\n{tail}")
+                result = probe.check()
+                if result.ok:
+                    return
+                if time.monotonic() >= end:
+                    raise RuntimeError(f"RAG server did not become healthy on port {self.port}: "
+                                       f"{result.error or result.status}")
+                time.sleep(next(delays))
+        finally:
+            probe.close()
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+
+class OfflineServer:
+    """
+    Stand-in Ollama/Qdrant, a scratch copy of the knowledge base ingested into
+    them, and `node src/server.mjs` pointed at all three on `port`.
+    """
+
+    def __init__(self, port=6444, embed_per_item_ms=0.0, log=print):
+        self.port = port
+        self.embed_per_item_ms = embed_per_item_ms
+        self.log = log
+        self.standins = ()
+        self.server = None
+        self.workdir = None
+
+    def __enter__(self):
+        from akrizu_stack.ingest import ingest, load_config
+        from akrizu_stack.standin import Faults, offline_env, start_standins
+
+        config = load_config()
+        self.workdir = tempfile.mkdtemp(prefix="akrizu-loadtest-")
+        kb = Path(self.workdir) / "knowledge"
+        shutil.copytree(config["knowledge_base_path"], kb)
+
+        self.standins = start_standins(ollama_faults=Faults(per_item_ms=self.embed_per_item_ms))
+        env = {**offline_env(self.standins[0].url, self.standins[1].url), "KNOWLEDGE_BASE_PATH": str(kb)}
+        config.update(ollama_url=self.standins[0].url, qdrant_url=self.standins[1].url, qdrant_api_key="",
+                      knowledge_base_path=kb, embed_cache_path=None, collection_version_path=None)
+        ingest(config, log=lambda message: None)
+
+        self.log(f"🧪 Stand-ins: {self.standins[0].url} (Ollama), {self.standins[1].url} (Qdrant)")
+        try:
+            self.server = RagServerProcess(self.port, env, self.workdir, self.log).start()
+        except RuntimeError:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
+        for server in self.standins:
+            server.stop()
+        self.standins = ()
+        if self.workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+            self.workdir = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the RAG server HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6444)
+    parser.add_argument("--mix", default="retrieval",
+                        help=f"Preset ({', '.join(MIXES)}) or weights like 'search_text=3,context=1'")
+    parser.add_argument("--concurrency", type=int, default=8, help="Kept-alive connections")
+    parser.add_argument("--requests", type=int, default=None, help="Measured requests (default 500)")
+    parser.add_argument("--duration", type=float, default=None, help="Measure for this many seconds instead")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests first")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vector-size", type=int, default=768, help="Dimension of /search query vectors")
+    parser.add_argument("--chat-model", default="llama3.2:3b")
+    parser.add_argument("--offline", action="store_true",
+                        help="Start stand-ins and a local RAG server on --port, then test that")
+    parser.add_argument("--embed-per-item-ms", type=float, default=0.0, help="Stand-in embed latency (--offline)")
+    parser.add_argument("--out", default="loadtest-report.json")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if "memory_save" in mix and not args.offline:
+        print("⚠️  memory_save appends load-test entries to the knowledge base memory file")
+
+    def run():
+        return asyncio.run(run_load(args.host, args.port, mix, args.concurrency, args.requests, args.duration,
+                                    args.warmup, args.timeout, args.seed, args.vector_size, args.chat_model))
+
+    if args.offline:
+        with OfflineServer(args.port, args.embed_per_item_ms):
+            report = run()
+        report["offline"] = True
+    else:
+        report = run()
+
+    print_summary(report)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"📝 Report written to {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if not same_workload(report, baseline):
+            print("⚠️  Baseline used a different mix or concurrency — comparing per-endpoint latency only")
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"❌ Regression {line}")
+        if regressions:
+            return 1
+        print("✅ No regressions against baseline")
+    return 1 if report["total"]["errors"] == report["total"]["requests"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
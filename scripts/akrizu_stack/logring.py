@@ -0,0 +1,160 @@
+"""
+Akrizu Stack — Log Ring Buffer
+Fixed-capacity, structured log capture for supervised services.
+Records are __slots__ objects whose timestamp is formatted lazily; console or
+file output is batched and written from one background flusher thread.
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+TYPE_PREFIX = {
+    'info': '[INFO]',
+    'success': '[SUCCESS]',
+    'error': '[ERROR]',
+    'stdout': '[STDOUT]',
+    'stderr': '[STDERR]',
+}
+
+
+class LogRecord:
+    """One captured log line; `timestamp` is only formatted when read"""
+
+    __slots__ = ('seq', 'ts', 'service', 'level', 'message')
+
+    def __init__(self, seq, ts, service, level, message):
+        self.seq = seq
+        self.ts = ts
+        self.service = service
+        self.level = level
+        self.message = message
+
+    @property
+    def timestamp(self):
+        return datetime.fromtimestamp(self.ts).strftime('%I:%M:%S %p')
+
+    def format(self):
+        prefix = TYPE_PREFIX.get(self.level, '[INFO]')
+        return f"[{self.timestamp}] [{self.service.upper()}] {prefix} {self.message}"
+
+    def as_dict(self):
+        return {'timestamp': self.timestamp, 'service': self.service,
+                'message': self.message, 'type': self.level}
+
+
+class LogRing:
+    """Bounded ring of LogRecords; the oldest entries are overwritten when full"""
+
+    def __init__(self, capacity=5000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def append(self, service, message, level='info'):
+        with self._lock:
+            record = LogRecord(self._seq, time.time(), service, level, message)
+            self._slots[self._seq % self.capacity] = record
+            self._seq += 1
+        return record
+
+    def __len__(self):
+        return min(self._seq, self.capacity)
+
+    @property
+    def dropped(self):
+        """Records overwritten since creation"""
+        return max(0, self._seq - self.capacity)
+
+    def _range(self):
+        end = self._seq
+        return max(0, end - self.capacity), end
+
+    def query(self, service=None, level=None, since_seq=None, limit=None, newest_first=False):
+        """
+        Yield matching records without copying the buffer. `level` may be a
+        single level or a collection of levels. Records overwritten while
+        iterating are skipped.
+        """
+        start, end = self._range()
+        if since_seq is not None:
+            start = max(start, since_seq)
+        levels = {level} if isinstance(level, str) else (set(level) if level else None)
+        seqs = range(end - 1, start - 1, -1) if newest_first else range(start, end)
+        yielded = 0
+        for seq in seqs:
+            record = self._slots[seq % self.capacity]
+            if record is None or record.seq != seq:
+                continue
+            if service is not None and record.service != service:
+                continue
+            if levels is not None and record.level not in levels:
+                continue
+            yield record
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                return
+
+    def tail(self, n=50, **filters):
+        """Last n matching records, oldest first"""
+        return list(self.query(limit=n, newest_first=True, **filters))[::-1]
+
+    def __iter__(self):
+        return self.query()
+
+
+class LogFlusher:
+    """
+    Writes submitted records in batches from a background thread. At most
+    `max_pending` lines wait for output; older ones are dropped from the
+    console (they stay queryable in the LogRing).
+    """
+
+    def __init__(self, stream=None, path=None, interval=0.1, max_batch=512, max_pending=10000):
+        self._owns_stream = path is not None
+        self.stream = open(path, 'a', encoding='utf-8') if path else (stream or sys.stdout)
+        self.interval = interval
+        self.max_batch = max_batch
+        self._queue = deque(maxlen=max_pending)
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='log-flusher', daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        self._queue.append(record)
+        if len(self._queue) >= self.max_batch:
+            self._wake.set()
+
+    def flush(self):
+        """Drain the queue synchronously (call before printing directly to the same stream)"""
+        with self._write_lock:
+            lines = []
+            while self._queue:
+                lines.append(self._queue.popleft().format())
+            if lines:
+                self.stream.write('\n'.join(lines) + '\n')
+                self.stream.flush()
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except (OSError, ValueError):
+                pass
+
+    def close(self):
+        self._closed.set()
+        self._wake.set()
+        self._thread.join(timeout=1)
+        self.flush()
+        if self._owns_stream:
+            self.stream.close()
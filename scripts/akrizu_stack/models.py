@@ -0,0 +1,130 @@
+"""
+Akrizu Stack — Ollama Model Manifest
+Warm-start cache of installed models and digests, kept in
+scripts/.ollama-models.json. The manifest is trusted while fresh and only
+refreshed from Ollama's /api/tags when stale or when a model is missing.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from akrizu_stack.probe import HttpClient
+
+MANIFEST_PATH = Path(__file__).resolve().parent.parent / ".ollama-models.json"
+DEFAULT_TTL = 24 * 3600
+
+
+def normalize_model(name):
+    """'nomic-embed-text' → 'nomic-embed-text:latest' (Ollama's implicit tag)"""
+    return name if ":" in name else f"{name}:latest"
+
+
+class ModelManifest:
+    """On-disk snapshot of Ollama's /api/tags (name → digest, size, modified_at)"""
+
+    def __init__(self, path=MANIFEST_PATH, ttl=DEFAULT_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.fetched_at = 0.0
+        self.models = {}
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.fetched_at = float(data.get("fetched_at", 0))
+            self.models = data.get("models", {})
+        except (OSError, ValueError):
+            self.fetched_at = 0.0
+            self.models = {}
+        return self
+
+    def save(self):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"fetched_at": self.fetched_at, "models": self.models},
+                                  indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    @property
+    def stale(self):
+        return time.time() - self.fetched_at > self.ttl
+
+    def has(self, model):
+        return normalize_model(model) in self.models
+
+    def digest(self, model):
+        entry = self.models.get(normalize_model(model))
+        return entry.get("digest") if entry else None
+
+    def invalidate(self):
+        self.fetched_at = 0.0
+        self.save()
+
+    def refresh(self, client):
+        """Reload from GET /api/tags and persist"""
+        status, data = client.get_json("/api/tags")
+        if status != 200 or data is None:
+            raise RuntimeError(f"/api/tags returned HTTP {status}")
+        self.models = {
+            normalize_model(m["name"]): {
+                "digest": m.get("digest"),
+                "size": m.get("size"),
+                "modified_at": m.get("modified_at"),
+            }
+            for m in data.get("models", [])
+        }
+        self.fetched_at = time.time()
+        self.save()
+        return self
+
+
+def ensure_model(model, client=None, manifest=None, pull=True, pull_timeout=1800):
+    """
+    Make sure `model` is installed. Returns (present, source) where source is
+    'cache' (fresh manifest), 'api' (refreshed from /api/tags) or 'pulled'.
+    """
+    client = client or HttpClient("127.0.0.1", 11434, timeout=5)
+    manifest = manifest or ModelManifest()
+
+    if not manifest.stale and manifest.has(model):
+        return True, "cache"
+
+    manifest.refresh(client)
+    if manifest.has(model):
+        return True, "api"
+    if not pull:
+        return False, "api"
+
+    # Non-streaming pull blocks until the download completes
+    pull_client = HttpClient(client.host, client.port, timeout=pull_timeout)
+    try:
+        status, data = pull_client.post_json("/api/pull", {"model": model, "stream": False})
+    finally:
+        pull_client.close()
+    if status != 200 or (data or {}).get("status") != "success":
+        raise RuntimeError(f"Pull of {model} failed (HTTP {status}): {data}")
+    manifest.refresh(client)
+    return manifest.has(model), "pulled"
+
+
+def prewarm(model, host="127.0.0.1", port=11434, keep_alive="30m", manifest=None, timeout=120):
+    """
+    Load the model into memory with a tiny embed request so the RAG server's
+    first /api/embed does not pay the load latency. Returns seconds taken.
+    A 404 (model gone) invalidates the manifest so the next launch re-checks.
+    """
+    client = HttpClient(host, port, timeout=timeout)
+    start = time.perf_counter()
+    try:
+        status, _ = client.post_json("/api/embed", {"model": model, "input": "warmup",
+                                                    "keep_alive": keep_alive})
+    finally:
+        client.close()
+    if status == 404 and manifest is not None:
+        manifest.invalidate()
+    if status != 200:
+        raise RuntimeError(f"Pre-warm embed for {model} returned HTTP {status}")
+    return time.perf_counter() - start
+
@@ -0,0 +1,385 @@
+"""
+Akrizu Stack — Readiness Probes
+In-process socket/HTTP probes over kept-alive connections, with exponential
+backoff + jitter and an overall deadline. Replaces spawning `wsl curl`.
+
+Usage (CLI):
+  python -m akrizu_stack.probe 127.0.0.1:11434/api/tags 127.0.0.1:6444/health --deadline 30
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import random
+import socket
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+# Errors that mean "the kept-alive socket went stale" — safe to reconnect once
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                 BrokenPipeError, ConnectionResetError, ConnectionAbortedError)
+
+
+def port_open(host, port, timeout=0.5):
+    """Plain TCP connect check (no HTTP request)"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def backoff_delays(base=0.05, max_delay=1.0, jitter=0.5, rng=random):
+    """Infinite exponential backoff sequence; each delay is shrunk by up to `jitter` (0..1)"""
+    delay = base
+    while True:
+        yield delay * (1 - jitter * rng.random())
+        delay = min(delay * 2, max_delay)
+
+
+class HttpClient:
+    """Keep-alive HTTP/1.1 client for a single host:port; reconnects transparently"""
+
+    def __init__(self, host, port, timeout=2.0, headers=None, https=False):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.https = https
+        self._conn = None
+        self._reused = False
+
+    @classmethod
+    def from_url(cls, url, timeout=2.0, headers=None):
+        """Client for the host of a base URL such as 'http://localhost:6333'"""
+        parts = urllib.parse.urlsplit(url)
+        https = parts.scheme == "https"
+        return cls(parts.hostname or "localhost", parts.port or (443 if https else 80),
+                   timeout=timeout, headers=headers, https=https)
+
+    def _connection(self):
+        if self._conn is None:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._conn = factory(self.host, self.port, timeout=self.timeout)
+            self._reused = False
+        return self._conn
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request and return (status, body_bytes). Raises OSError/HTTPException on failure."""
+        headers = {**self.headers, **(headers or {})}
+        for attempt in (0, 1):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                res = conn.getresponse()
+                data = res.read()  # drain so the socket can be reused
+                if res.will_close:
+                    self.close()
+                else:
+                    self._reused = True
+                return res.status, data
+            except _STALE_ERRORS:
+                was_reused = self._reused
+                self.close()
+                if attempt == 0 and was_reused:
+                    continue
+                raise
+            except (OSError, http.client.HTTPException):
+                self.close()
+                raise
+
+    def get_json(self, path):
+        status, data = self.request("GET", path)
+        return status, (json.loads(data) if data else None)
+
+    def post_json(self, path, payload, method="POST"):
+        body = json.dumps(payload).encode("utf-8")
+        status, data = self.request(method, path, body=body,
+                                    headers={"Content-Type": "application/json"})
+        return status, (json.loads(data) if data else None)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._reused = False
+
+
+class LatencyHistogram:
+    """Log2-bucketed latency histogram (milliseconds) with approximate percentiles"""
+
+    BOUNDS_MS = tuple(2 ** i / 4 for i in range(17))  # 0.25ms .. 16.4s
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        idx = 0
+        while idx < len(self.BOUNDS_MS) and ms > self.BOUNDS_MS[idx]:
+            idx += 1
+        self.buckets[idx] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = ms if self.max_ms is None else max(self.max_ms, ms)
+
+    def percentile(self, p):
+        """Upper bound (ms) of the bucket holding the p-th percentile (capped at max)"""
+        if not self.count:
+            return None
+        rank = max(1, int(round(p / 100 * self.count)))
+        seen = 0
+        for idx, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                bound = self.BOUNDS_MS[idx] if idx < len(self.BOUNDS_MS) else self.max_ms
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "minMs": self.min_ms,
+            "meanMs": self.total_ms / self.count if self.count else None,
+            "p50Ms": self.percentile(50),
+            "p95Ms": self.percentile(95),
+            "p99Ms": self.percentile(99),
+            "maxMs": self.max_ms,
+            "buckets": {f"<={b:g}ms": n for b, n in zip(self.BOUNDS_MS, self.buckets) if n}
+                       | ({"overflow": self.buckets[-1]} if self.buckets[-1] else {}),
+        }
+
+    def format(self):
+        if not self.count:
+            return "no samples"
+        return (f"n={self.count} min={self.min_ms:.1f}ms p50<={self.percentile(50):.1f}ms "
+                f"p95<={self.percentile(95):.1f}ms max={self.max_ms:.1f}ms")
+
+
+class ProbeResult:
+    """Outcome of a single probe (latency in seconds)"""
+
+    __slots__ = ("name", "ok", "status", "latency", "error", "body", "attempts")
+
+    def __init__(self, name, ok, status=0, latency=0.0, error=None, body=b"", attempts=1):
+        self.name = name
+        self.ok = ok
+        self.status = status
+        self.latency = latency
+        self.error = error
+        self.body = body
+        self.attempts = attempts
+
+    @property
+    def reachable(self):
+        """True if the server answered at all (port open), regardless of status"""
+        return self.status > 0
+
+    def as_dict(self):
+        result = {"ok": self.ok, "status": self.status}
+        if self.error:
+            result["error"] = self.error
+        else:
+            result["body"] = self.body.decode("utf-8", "replace")
+        return result
+
+
+class HttpProbe:
+    """Repeatable GET probe against one endpoint over a persistent connection"""
+
+    def __init__(self, host, port, path="/", timeout=1.0, expect=None, name=None):
+        self.client = HttpClient(host, port, timeout=timeout)
+        self.path = path
+        self.expect = expect or (lambda status: 200 <= status < 300)
+        self.name = name or f"{host}:{port}{path}"
+
+    def check(self):
+        start = time.perf_counter()
+        try:
+            status, body = self.client.request("GET", self.path)
+            return ProbeResult(self.name, self.expect(status), status,
+                               time.perf_counter() - start, body=body)
+        except (OSError, http.client.HTTPException) as e:
+            return ProbeResult(self.name, False, 0, time.perf_counter() - start,
+                               error=str(e) or e.__class__.__name__)
+
+    def wait(self, deadline=30.0, base_delay=0.05, max_delay=1.0, jitter=0.5, rng=random):
+        """Retry check() with backoff until it succeeds or the deadline (seconds) passes"""
+        end = time.monotonic() + deadline
+        delays = backoff_delays(base_delay, max_delay, jitter, rng)
+        attempts = 0
+        while True:
+            attempts += 1
+            result = self.check()
+            result.attempts = attempts
+            remaining = end - time.monotonic()
+            if result.ok or remaining <= 0:
+                return result
+            time.sleep(min(next(delays), remaining))
+
+    def close(self):
+        self.client.close()
+
+
+class AsyncHttpClient:
+    """
+    Minimal keep-alive HTTP/1.1 client on asyncio streams (Content-Length and
+    chunked bodies). One request at a time per client; pool clients for concurrency.
+    """
+
+    def __init__(self, host, port, timeout=2.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._reused = False
+
+    async def _connect(self):
+        if self._writer is None or self._writer.is_closing():
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+            self._reused = False
+
+    async def _read_response(self):
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed before response")
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise http.client.BadStatusLine(status_line.decode("latin-1", "replace"))
+        status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readline()
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await self._reader.read()
+            headers["connection"] = "close"
+        return status, headers, body
+
+    async def request(self, method, path, body=None, headers=None):
+        """Send a request and return (status, body_bytes). Raises OSError/HTTPException on failure."""
+        body = body or b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(body)}"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        raw = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+        for attempt in (0, 1):
+            await self._connect()
+            try:
+                self._writer.write(raw)
+                await self._writer.drain()
+                status, res_headers, data = await asyncio.wait_for(self._read_response(), self.timeout)
+                if res_headers.get("connection", "").lower() == "close":
+                    await self.close()
+                else:
+                    self._reused = True
+                return status, data
+            except (_STALE_ERRORS + (asyncio.IncompleteReadError,)):
+                was_reused = self._reused
+                await self.close()
+                if attempt == 0 and was_reused:
+                    continue
+                raise
+            except (OSError, http.client.HTTPException, asyncio.TimeoutError):
+                await self.close()
+                raise
+
+    async def post_json(self, path, payload):
+        status, data = await self.request("POST", path, json.dumps(payload).encode("utf-8"),
+                                          {"Content-Type": "application/json"})
+        return status, (json.loads(data) if data else None)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+        self._reader = self._writer = None
+        self._reused = False
+
+
+class AsyncHttpProbe:
+    """asyncio counterpart of HttpProbe"""
+
+    def __init__(self, host, port, path="/", timeout=1.0, expect=None, name=None):
+        self.client = AsyncHttpClient(host, port, timeout=timeout)
+        self.path = path
+        self.expect = expect or (lambda status: 200 <= status < 300)
+        self.name = name or f"{host}:{port}{path}"
+
+    async def check(self):
+        start = time.perf_counter()
+        try:
+            status, body = await self.client.request("GET", self.path)
+            return ProbeResult(self.name, self.expect(status), status,
+                               time.perf_counter() - start, body=body)
+        except (OSError, http.client.HTTPException, asyncio.TimeoutError,
+                asyncio.IncompleteReadError) as e:
+            return ProbeResult(self.name, False, 0, time.perf_counter() - start,
+                               error=str(e) or e.__class__.__name__)
+
+    async def close(self):
+        await self.client.close()
+
+
+def wait_all(probes, deadline=30.0, **backoff):
+    """Wait on many probes concurrently; returns {probe.name: ProbeResult}"""
+    probes = list(probes)
+    if not probes:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+        futures = [pool.submit(p.wait, deadline, **backoff) for p in probes]
+        return {p.name: f.result() for p, f in zip(probes, futures)}
+
+
+def parse_target(target):
+    """'host:port/path' → HttpProbe"""
+    hostport, _, path = target.partition("/")
+    host, _, port = hostport.rpartition(":")
+    return HttpProbe(host or "127.0.0.1", int(port), "/" + path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probe HTTP endpoints until ready")
+    parser.add_argument("targets", nargs="+", help="host:port/path")
+    parser.add_argument("--deadline", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    results = wait_all([parse_target(t) for t in args.targets], deadline=args.deadline)
+    for name, r in results.items():
+        state = "ready" if r.ok else f"not ready ({r.error or r.status})"
+        print(f"{name}: {state} after {r.attempts} attempt(s), last probe {r.latency * 1000:.1f}ms")
+    return 0 if all(r.ok for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
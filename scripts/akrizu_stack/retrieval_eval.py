@@ -0,0 +1,491 @@
+"""
+Akrizu Stack — Retrieval Quality vs Latency Evaluation
+Builds a labeled query set from the .agent knowledge base and
+src/rules_dump.json (one question per section, expected hit = its
+source_file + section), runs it against /search/text and /context/smart and
+reports recall@k, MRR and per-query latency for every configuration of a
+sweep over chunk size, result limit and embedding model.
+
+Limits are a query-time knob. Chunk size and embedding model need their own
+index: each (chunk size, model) pair is ingested into a scratch collection
+and served by a throwaway `node src/server.mjs` with its query cache off.
+
+The JSON report keeps per-query ranks in a stable order, so reports from two
+commits diff cleanly; --baseline exits non-zero when recall/MRR drops or
+latency grows.
+
+Usage:
+  python -m akrizu_stack.retrieval_eval --limits 3 5 10                 # running server, current index
+  python -m akrizu_stack.retrieval_eval --chunk-chars 0 800 1500 --models nomic-embed-text mxbai-embed-large
+  python -m akrizu_stack.retrieval_eval --offline --chunk-chars 0 600    # stand-ins, no Ollama/Qdrant needed
+  python -m akrizu_stack.retrieval_eval --write-queries queries.json     # dump the query set for curation
+  python -m akrizu_stack.retrieval_eval --queries queries.json --baseline retrieval-baseline.json
+
+--chunk-chars 0 is one chunk per ## section, exactly like src/chunker.mjs.
+Offline embeddings are hashed bags of words (akrizu_stack.standin), so the
+numbers track chunking and ranking changes, not embedding model quality.
+"""
+
+import argparse
+import hashlib
+import http.client
+import itertools
+import json
+import re
+import shutil
+import tempfile
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from pathlib import Path
+
+from akrizu_stack.ingest import (AKRIZU_DIR, OllamaEmbedder, QdrantWriter, chunk_knowledge_base, ingest,
+                                 load_config)
+from akrizu_stack.loadtest import RagServerProcess, percentile
+from akrizu_stack.probe import HttpClient
+
+RULES_DUMP = AKRIZU_DIR / "src" / "rules_dump.json"
+ENDPOINTS = ("search_text", "context_smart")
+K_VALUES = (1, 3, 5, 10)
+# Sections whose name says nothing about the content: ask about the document title instead
+GENERIC_SECTIONS = {"Introduction", "Full Document", "Overview"}
+QUERY_WORDS = 14
+
+
+# ─── Query set ───────────────────────────────────────────
+
+def _plain_lines(body):
+    """Prose lines of a markdown body: no code blocks, tables, rules or markup"""
+    in_code = False
+    for line in body.split("\n"):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            in_code = not in_code
+            continue
+        if in_code or not stripped or stripped.startswith(("|", "---", "#", "<")):
+            continue
+        stripped = re.sub(r"^([-*+>]|\d+\.)\s+", "", stripped)
+        stripped = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", stripped)
+        stripped = re.sub(r"[*_`]+", "", stripped).strip()
+        if len(stripped.split()) >= 3:
+            yield stripped
+
+
+def question_for(content, section):
+    """
+    A search query for one chunk: the section (or document title for generic
+    sections) plus the start of its first prose sentence.
+    """
+    lines = content.split("\n")
+    title = lines[0][2:].strip() if lines and lines[0].startswith("# ") else ""
+    body = "\n".join(lines[2:]) if len(lines) > 1 and lines[1].startswith("## ") else content
+    topic = title if section in GENERIC_SECTIONS and title else section
+    sentence = next(_plain_lines(body), "")
+    sentence = re.split(r"(?<=[.!?])\s", sentence, maxsplit=1)[0]
+    words = sentence.split()[:QUERY_WORDS]
+    return f"{topic}: {' '.join(words)}" if words else topic
+
+
+def label_id(source_file, section):
+    return f"{source_file}#{section}"
+
+
+def build_query_set(kb_path, rules_dump=RULES_DUMP, max_queries=None):
+    """
+    One query per distinct (source_file, section) of the knowledge base,
+    tagged with the rules_dump.json entry for the same section when there is
+    one. Dump entries for sections that no longer exist are counted as stale.
+    Queries shared by two sections are dropped as unanswerable. Ordered by a
+    hash of their id, so a --max-queries subset stays stable.
+    """
+    _, chunks = chunk_knowledge_base(kb_path)
+    queries = {}
+    for chunk in chunks:
+        meta = chunk["metadata"]
+        qid = label_id(meta["source_file"], meta["section"])
+        if qid in queries:
+            continue
+        queries[qid] = {
+            "id": qid,
+            "query": question_for(chunk["content"], meta["section"]),
+            "expected": {"source_file": meta["source_file"], "section": meta["section"]},
+            "category": meta["category"],
+            "priority": meta["priority"],
+            "origin": ["kb"],
+        }
+
+    stale = 0
+    try:
+        rules = json.loads(Path(rules_dump).read_text(encoding="utf-8")).get("rules", [])
+    except (OSError, ValueError):
+        rules = []
+    for rule in rules:
+        entry = queries.get(label_id(rule.get("source_file"), rule.get("section")))
+        if entry is None:
+            stale += 1
+        elif "rules_dump" not in entry["origin"]:
+            entry["origin"].append("rules_dump")
+
+    by_text = {}
+    for entry in queries.values():
+        by_text.setdefault(entry["query"].lower(), []).append(entry["id"])
+    ambiguous = {qid for ids in by_text.values() if len(ids) > 1 for qid in ids}
+    selected = sorted((q for q in queries.values() if q["id"] not in ambiguous),
+                      key=lambda q: hashlib.sha256(q["id"].encode("utf-8")).hexdigest())
+    if max_queries:
+        selected = selected[:max_queries]
+    return {
+        "knowledge_base": str(kb_path),
+        "sections": len(queries),
+        "ambiguous_dropped": len(ambiguous),
+        "stale_dump_rules": stale,
+        "queries": selected,
+    }
+
+
+def load_query_set(path):
+    """A set written by --write-queries (possibly hand-edited)"""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    for q in data["queries"]:
+        q.setdefault("id", label_id(q["expected"]["source_file"], q["expected"]["section"]))
+        q.setdefault("origin", ["manual"])
+    return data
+
+
+# ─── Running queries ─────────────────────────────────────
+
+def run_query(client, endpoint, query, limit):
+    """
+    (ranked labels, labels anywhere in the context, seconds). /context/smart
+    ranks its task-specific results; the always-loaded standard rules only
+    count towards the context.
+    """
+    start = time.perf_counter()
+    if endpoint == "search_text":
+        status, data = client.post_json("/search/text", {"query": query, "limit": limit})
+    else:
+        params = urllib.parse.urlencode({"task": query, "limit": limit})
+        status, data = client.get_json(f"/context/smart?{params}")
+    seconds = time.perf_counter() - start
+    if status != 200:
+        raise RuntimeError(f"{endpoint} returned {status}: {data}")
+    if endpoint == "search_text":
+        ranked = [label_id(r.get("source_file"), r.get("section")) for r in data.get("results", [])]
+        return ranked, set(ranked), seconds
+    sources = data.get("sources", {})
+    ranked = [label_id(r.get("file"), r.get("section")) for r in sources.get("taskSpecific", [])]
+    context = {label_id(r.get("file"), r.get("section")) for rules in sources.values() for r in rules}
+    return ranked, context, seconds
+
+
+def summarize(records, limit):
+    """recall@k, MRR, file-level recall and latency percentiles over one endpoint's records"""
+    answered = [r for r in records if "error" not in r]
+    n = len(answered)
+    ms = sorted(r["ms"] for r in answered)
+
+    def rate(hits):
+        return round(hits / n, 4) if n else 0.0
+
+    summary = {"queries": len(records), "errors": len(records) - n}
+    for k in K_VALUES:
+        if k <= limit:
+            summary[f"recall@{k}"] = rate(sum(1 for r in answered if r["rank"] and r["rank"] <= k))
+    summary[f"recall@{limit}"] = rate(sum(1 for r in answered if r["rank"]))
+    summary["mrr"] = round(sum(1 / r["rank"] for r in answered if r["rank"]) / n, 4) if n else 0.0
+    summary["file_recall"] = rate(sum(1 for r in answered if r["file_hit"]))
+    if any("in_context" in r for r in answered):
+        summary["context_recall"] = rate(sum(1 for r in answered if r["in_context"]))
+    summary.update({
+        "mean_ms": round(sum(ms) / n, 2) if n else None,
+        "p50_ms": round(percentile(ms, 50), 2) if ms else None,
+        "p95_ms": round(percentile(ms, 95), 2) if ms else None,
+        "max_ms": round(ms[-1], 2) if ms else None,
+    })
+    return summary
+
+
+def evaluate(host, port, queries, limit, endpoints=ENDPOINTS, timeout=30.0):
+    """Every query once per endpoint, sequentially; returns {endpoint: {summary, subsets, per_query}}"""
+    client = HttpClient(host, port, timeout=timeout)
+    results = {}
+    try:
+        for endpoint in endpoints:
+            records = {}
+            for q in queries:
+                expected = q["expected"]
+                target = label_id(expected["source_file"], expected["section"])
+                try:
+                    ranked, context, seconds = run_query(client, endpoint, q["query"], limit)
+                except (OSError, ValueError, RuntimeError, http.client.HTTPException) as e:
+                    records[q["id"]] = {"error": str(e)}
+                    continue
+                record = {
+                    "rank": ranked.index(target) + 1 if target in ranked else None,
+                    "file_hit": any(r.split("#", 1)[0] == expected["source_file"] for r in ranked),
+                    "ms": round(seconds * 1000, 2),
+                }
+                if endpoint == "context_smart":
+                    record["in_context"] = target in context
+                records[q["id"]] = record
+            subsets = {}
+            for origin in sorted({o for q in queries for o in q["origin"]}):
+                subset = [records[q["id"]] for q in queries if origin in q["origin"]]
+                subsets[origin] = summarize(subset, limit)
+            results[endpoint] = {
+                "summary": summarize(list(records.values()), limit),
+                "subsets": subsets,
+                "per_query": dict(sorted(records.items())),
+            }
+    finally:
+        client.close()
+    return results
+
+
+# ─── Indexes ─────────────────────────────────────────────
+
+def config_key(chunk_chars, model, limit):
+    return f"chunk={chunk_chars or 'section'},model={model or 'server'},limit={limit}"
+
+
+class EvalIndex:
+    """
+    The knowledge base ingested with one chunk size and embedding model into
+    a scratch collection (recreated, dropped afterwards), served by a node
+    server on `port`. `standins` (Ollama, Qdrant) replace the configured
+    services when given.
+    """
+
+    def __init__(self, config, chunk_chars, model, port, workdir, standins=(), log=print):
+        self.config = dict(config)
+        self.chunk_chars = chunk_chars
+        self.model = model
+        self.port = port
+        self.workdir = workdir
+        self.standins = standins
+        self.log = log
+        self.server = None
+        self.stats = None
+
+    def _dimension(self):
+        if self.standins:
+            from akrizu_stack.models import normalize_model
+            # The stand-in hashes text the same way for every model name
+            self.standins[0].models.setdefault(normalize_model(self.model), self.config["vector_size"])
+            return self.config["vector_size"]
+        embedder = OllamaEmbedder(self.config["ollama_url"], self.model)
+        try:
+            return len(embedder.embed_many(["dimension probe"])[0])
+        finally:
+            embedder.close()
+
+    def __enter__(self):
+        config = self.config
+        config.update(collection=f"{config['collection']}_eval", embed_model=self.model,
+                      collection_version_path=None)
+        if self.standins:
+            config.update(ollama_url=self.standins[0].url, qdrant_url=self.standins[1].url, qdrant_api_key="",
+                          embed_cache_path=None)
+        config["vector_size"] = self._dimension()
+        self.log(f"🏗️  Indexing: chunk={self.chunk_chars or 'section'}, model={self.model} "
+                 f"({config['vector_size']}-dim) into \"{config['collection']}\"")
+        self.stats = ingest(config, recreate=True, max_chunk_chars=self.chunk_chars or None,
+                            log=lambda message: None)
+        env = {
+            "QDRANT_URL": config["qdrant_url"],
+            "QDRANT_API_KEY": config["qdrant_api_key"],
+            "QDRANT_COLLECTION": config["collection"],
+            "OLLAMA_URL": config["ollama_url"],
+            "OLLAMA_EMBED_MODEL": self.model,
+            "EMBEDDING_PROVIDER": "ollama",
+            "VECTOR_SIZE": str(config["vector_size"]),
+            "KNOWLEDGE_BASE_PATH": str(config["knowledge_base_path"]),
+            # Cold retrieval path: every query embeds and searches
+            "QUERY_CACHE_SIZE": "0",
+            "EMBED_CACHE_PATH": "off",
+            "COLLECTION_VERSION_PATH": str(Path(self.workdir) / "collection-version.json"),
+            "GROQ_API_KEY": "",
+            "GEMINI_API_KEY": "",
+        }
+        try:
+            self.server = RagServerProcess(self.port, env, self.workdir, self.log).start()
+        except RuntimeError:
+            self._drop()
+            raise
+        return self
+
+    def _drop(self):
+        writer = QdrantWriter(self.config["qdrant_url"], self.config["collection"], self.config["qdrant_api_key"])
+        try:
+            writer.drop()
+        except OSError:
+            pass
+        finally:
+            writer.close()
+
+    def __exit__(self, *exc):
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
+        self._drop()
+
+
+# ─── Sweep ───────────────────────────────────────────────
+
+def run_sweep(args, query_set):
+    queries = query_set["queries"]
+    endpoints = tuple(args.endpoints)
+    limits = sorted(set(args.limits))
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "query_set": {key: value for key, value in query_set.items() if key != "queries"},
+        "queries": len(queries),
+        "endpoints": list(endpoints),
+        "offline": args.offline,
+        "configs": {},
+    }
+
+    def record(host, port, chunk_chars, model, index_stats=None):
+        for limit in limits:
+            key = config_key(chunk_chars, model, limit)
+            print(f"🔎 {key}: {len(queries)} queries × {len(endpoints)} endpoint(s)", flush=True)
+            entry = {"chunk_chars": chunk_chars, "model": model, "limit": limit}
+            if index_stats:
+                entry["index"] = {"chunks": index_stats["chunks"], "seconds": index_stats["seconds"]}
+            entry.update(evaluate(host, port, queries, limit, endpoints, args.timeout))
+            report["configs"][key] = entry
+
+    if not (args.chunk_chars or args.models or args.offline):
+        report["target"] = f"http://{args.host}:{args.port}"
+        record(args.host, args.port, None, None)
+        return report
+
+    config = load_config()
+    standins = ()
+    workdir = tempfile.mkdtemp(prefix="akrizu-eval-")
+    if args.offline:
+        from akrizu_stack.standin import start_standins
+        standins = start_standins()
+        print(f"🧪 Stand-ins: {standins[0].url} (Ollama), {standins[1].url} (Qdrant)")
+    try:
+        for chunk_chars, model in itertools.product(args.chunk_chars or [0], args.models or [config["embed_model"]]):
+            with EvalIndex(config, chunk_chars, model, args.eval_port, workdir, standins) as index:
+                record("127.0.0.1", args.eval_port, chunk_chars, model, index.stats)
+    finally:
+        for server in standins:
+            server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def compare(report, baseline, quality_tolerance=0.02, latency_tolerance=0.25, min_delta_ms=1.0):
+    """
+    Regressions against a previous report, per shared config and endpoint:
+    recall or MRR down by more than `quality_tolerance` (absolute), p95
+    latency up by more than `latency_tolerance` (fractional, ignoring moves
+    under `min_delta_ms`), and the queries that lost their hit.
+    """
+    regressions = []
+    for key, entry in report["configs"].items():
+        base_entry = baseline.get("configs", {}).get(key)
+        if not base_entry:
+            continue
+        for endpoint in report["endpoints"]:
+            current, base = entry.get(endpoint), base_entry.get(endpoint)
+            if not current or not base:
+                continue
+            now, ref = current["summary"], base["summary"]
+            for metric, value in now.items():
+                if (metric.startswith("recall@") or metric in ("mrr", "context_recall")) and metric in ref:
+                    if ref[metric] - value > quality_tolerance:
+                        regressions.append(f"{key} {endpoint}.{metric}: {ref[metric]} → {value}")
+            if now.get("p95_ms") and ref.get("p95_ms"):
+                change = (now["p95_ms"] - ref["p95_ms"]) / ref["p95_ms"]
+                if change > latency_tolerance and now["p95_ms"] - ref["p95_ms"] >= min_delta_ms:
+                    regressions.append(f"{key} {endpoint}.p95_ms: {ref['p95_ms']} → {now['p95_ms']} "
+                                       f"({change * 100:+.1f}%)")
+            lost = [qid for qid, r in current["per_query"].items()
+                    if not r.get("rank") and (base["per_query"].get(qid) or {}).get("rank")]
+            if lost:
+                regressions.append(f"{key} {endpoint}: lost hits for {len(lost)} queries: {', '.join(lost[:5])}"
+                                   + (" …" if len(lost) > 5 else ""))
+    return regressions
+
+
+def print_summary(report):
+    print(f"   {'config':<48} {'endpoint':<14} {'R@1':>6} {'R@lim':>6} {'MRR':>6} {'p50':>8} {'p95':>8} {'err':>4}")
+    for key, entry in report["configs"].items():
+        for endpoint in report["endpoints"]:
+            s = entry[endpoint]["summary"]
+            at_limit = s[f"recall@{entry['limit']}"]
+
+            def ms(value):
+                return f"{value:.1f}" if value is not None else "-"
+            print(f"   {key:<48} {endpoint:<14} {s['recall@1']:>6.3f} {at_limit:>6.3f} "
+                  f"{s['mrr']:>6.3f} {ms(s['p50_ms']):>8} {ms(s['p95_ms']):>8} {s['errors']:>4}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrieval quality (recall@k, MRR) vs latency over a config sweep")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6444, help="Running RAG server (no index sweep)")
+    parser.add_argument("--limits", type=int, nargs="+", default=[5], help="Result limits to sweep")
+    parser.add_argument("--chunk-chars", type=int, nargs="+", default=None,
+                        help="Max chunk sizes to sweep (0 = one chunk per ## section)")
+    parser.add_argument("--models", nargs="+", default=None, help="Ollama embedding models to sweep")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=ENDPOINTS)
+    parser.add_argument("--offline", action="store_true", help="Index into stand-ins instead of Ollama/Qdrant")
+    parser.add_argument("--eval-port", type=int, default=6450, help="Port of the throwaway server per index")
+    parser.add_argument("--max-queries", type=int, default=None)
+    parser.add_argument("--queries", default=None, help="Query set file instead of generating one")
+    parser.add_argument("--write-queries", default=None, help="Write the query set here and exit")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--out", default="retrieval-eval.json")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against")
+    parser.add_argument("--quality-tolerance", type=float, default=0.02, help="Allowed absolute recall/MRR drop")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25, help="Allowed fractional p95 increase")
+    args = parser.parse_args(argv)
+    if any(limit < 1 for limit in args.limits):
+        parser.error("--limits must be positive")
+
+    if args.queries:
+        query_set = load_query_set(args.queries)
+        if args.max_queries:
+            query_set["queries"] = query_set["queries"][:args.max_queries]
+    else:
+        query_set = build_query_set(load_config()["knowledge_base_path"], max_queries=args.max_queries)
+    print(f"📋 {len(query_set['queries'])} labeled queries"
+          + (f" ({query_set['ambiguous_dropped']} ambiguous dropped, "
+             f"{query_set['stale_dump_rules']} stale rules_dump entries)" if "sections" in query_set else ""))
+    if args.write_queries:
+        Path(args.write_queries).write_text(json.dumps(query_set, indent=2), encoding="utf-8")
+        print(f"📝 Query set written to {args.write_queries}")
+        return 0
+    if not query_set["queries"]:
+        print("❌ No queries: the knowledge base is empty")
+        return 1
+
+    report = run_sweep(args, query_set)
+    print_summary(report)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"📝 Report written to {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        shared = set(report["configs"]) & set(baseline.get("configs", {}))
+        if not shared:
+            print("⚠️  Baseline has none of these configs — nothing compared")
+        regressions = compare(report, baseline, args.quality_tolerance, args.latency_tolerance)
+        for line in regressions:
+            print(f"❌ Regression {line}")
+        if regressions:
+            return 1
+        if shared:
+            print(f"✅ No regressions against baseline ({len(shared)} config(s))")
+    failed = all(entry[e]["summary"]["errors"] == entry[e]["summary"]["queries"]
+                 for entry in report["configs"].values() for e in report["endpoints"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,51 @@
+"""
+Akrizu Stack — Offline Stand-ins
+Local Ollama and Qdrant look-alikes with deterministic embeddings and
+configurable latency/failure injection, so the launcher, the Electron
+simulation and the benchmarks can run without WSL, a model or a database.
+
+Usage (CLI):
+  python -m akrizu_stack.standin [--ollama-port 11434] [--qdrant-port 6333] \
+      [--embed-latency-ms 5 --embed-per-item-ms 1] [--error-rate 0.05 --fail-routes embed]
+"""
+
+from akrizu_stack.standin.common import Faults, StandinServer
+from akrizu_stack.standin.ollama import OllamaStandin, hash_embedding
+from akrizu_stack.standin.qdrant import QdrantStandin
+
+# Relative to akrizu-knowledge/, like the defaults in src/config.mjs. Stand-in
+# vectors must never land in the real embedding cache or sync manifest.
+STANDIN_STATE_DIR = ".cache/standin"
+
+
+def offline_env(ollama_url, qdrant_url):
+    """Environment overrides pointing the Node and Python stack at the stand-ins"""
+    return {
+        "OLLAMA_URL": ollama_url,
+        "QDRANT_URL": qdrant_url,
+        "QDRANT_API_KEY": "",
+        "EMBEDDING_PROVIDER": "ollama",
+        # No cloud fallbacks offline
+        "GROQ_API_KEY": "",
+        "GEMINI_API_KEY": "",
+        "EMBED_CACHE_PATH": f"{STANDIN_STATE_DIR}/embeddings.bin",
+        "SYNC_MANIFEST_PATH": f"{STANDIN_STATE_DIR}/sync-manifest.json",
+        "COLLECTION_VERSION_PATH": f"{STANDIN_STATE_DIR}/collection-version.json",
+    }
+
+
+def start_standins(host="127.0.0.1", ollama_port=0, qdrant_port=0, ollama_faults=None, qdrant_faults=None):
+    """Start both stand-ins on background threads; returns (ollama, qdrant)"""
+    ollama = OllamaStandin(host, ollama_port, faults=ollama_faults).start()
+    try:
+        qdrant = QdrantStandin(host, qdrant_port, faults=qdrant_faults).start()
+    except OSError:
+        ollama.stop()
+        raise
+    return ollama, qdrant
+
+
+__all__ = [
+    "Faults", "StandinServer", "OllamaStandin", "QdrantStandin", "hash_embedding",
+    "STANDIN_STATE_DIR", "offline_env", "start_standins",
+]
@@ -0,0 +1,66 @@
+"""
+Akrizu Stack — Stand-in CLI
+Runs the Ollama and/or Qdrant stand-ins until interrupted.
+"""
+
+import argparse
+import signal
+import threading
+
+from akrizu_stack.standin import Faults, OllamaStandin, QdrantStandin
+
+
+def faults_from(args, prefix):
+    return Faults(
+        latency_ms=getattr(args, f"{prefix}_latency_ms"),
+        per_item_ms=getattr(args, f"{prefix}_per_item_ms"),
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        routes=args.fail_routes.split(",") if args.fail_routes else None,
+        seed=args.seed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve offline Ollama/Qdrant stand-ins")
+    parser.add_argument("services", nargs="*", help="ollama and/or qdrant (default: both)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--ollama-port", type=int, default=11434)
+    parser.add_argument("--qdrant-port", type=int, default=6333)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="Fixed latency per Ollama request")
+    parser.add_argument("--embed-per-item-ms", type=float, default=0.0, help="Extra latency per /api/embed input")
+    parser.add_argument("--qdrant-latency-ms", type=float, default=0.0, help="Fixed latency per Qdrant request")
+    parser.add_argument("--qdrant-per-item-ms", type=float, default=0.0, help="Extra latency per upserted point")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--fail-routes", default="", help="Comma-separated routes to inject into, e.g. embed,search")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    services = args.services or ["ollama", "qdrant"]
+    unknown = set(services) - {"ollama", "qdrant"}
+    if unknown:
+        parser.error(f"unknown service(s): {', '.join(sorted(unknown))}")
+    servers = []
+    if "ollama" in services:
+        servers.append(OllamaStandin(args.host, args.ollama_port, faults=faults_from(args, "embed")).start())
+    if "qdrant" in services:
+        servers.append(QdrantStandin(args.host, args.qdrant_port, faults=faults_from(args, "qdrant")).start())
+    for server in servers:
+        print(f"🧪 {server.name} listening on {server.url}", flush=True)
+    print("Stand-ins ready (Ctrl+C to stop)", flush=True)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    for server in servers:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
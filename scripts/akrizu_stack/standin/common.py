@@ -0,0 +1,244 @@
+"""
+Akrizu Stack — Stand-in Server Plumbing
+Threaded keep-alive JSON server with latency/failure injection and request
+counters, shared by the Ollama and Qdrant stand-ins.
+
+Control endpoints (every stand-in):
+  GET  /_standin/stats    request counts per route, injected failures
+  GET  /_standin/faults   current fault settings
+  POST /_standin/faults   update them, e.g. {"latency_ms": 20, "error_rate": 0.1}
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Faults:
+    """
+    Injected latency and failures. Each request sleeps
+    latency_ms + per_item_ms × items (± jitter_ms) and fails with HTTP 500
+    at error_rate. `routes` limits injection to the named routes (None = all).
+    """
+
+    FIELDS = ("latency_ms", "per_item_ms", "jitter_ms", "error_rate")
+
+    def __init__(self, latency_ms=0.0, per_item_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 routes=None, seed=0):
+        self.latency_ms = latency_ms
+        self.per_item_ms = per_item_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.routes = set(routes) if routes else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def applies(self, route):
+        return self.routes is None or route in self.routes
+
+    def delay(self, items=1):
+        seconds = (self.latency_ms + self.per_item_ms * items) / 1000
+        if self.jitter_ms:
+            with self._lock:
+                seconds += self._rng.uniform(-self.jitter_ms, self.jitter_ms) / 1000
+        return max(0.0, seconds)
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def update(self, values):
+        for field in self.FIELDS:
+            if field in values:
+                setattr(self, field, float(values[field]))
+        if "routes" in values:
+            self.routes = set(values["routes"]) if values["routes"] else None
+        if "seed" in values:
+            with self._lock:
+                self._rng.seed(values["seed"])
+        return self
+
+    def as_dict(self):
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        data["routes"] = sorted(self.routes) if self.routes else None
+        return data
+
+
+class Route:
+    def __init__(self, method, pattern, name, handler):
+        self.method = method
+        self.regex = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", pattern) + "$")
+        self.name = name
+        self.handler = handler
+
+
+class HttpError(Exception):
+    def __init__(self, status, body):
+        super().__init__(status)
+        self.status = status
+        self.body = body
+
+
+class StandinServer:
+    """
+    Base class: subclasses register routes with `self.route(...)` and return
+    (status, body) from handlers; `body` is JSON-encoded unless it is bytes,
+    and a generator body is streamed as NDJSON (chunked).
+    """
+
+    name = "standin"
+
+    def __init__(self, host="127.0.0.1", port=0, faults=None):
+        self.host = host
+        self.port = port
+        self.faults = faults or Faults()
+        self.routes = []
+        self.counts = {}
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+        self.route("GET", "/_standin/stats", "_stats", lambda req: (200, self.stats()))
+        self.route("GET", "/_standin/faults", "_faults", lambda req: (200, self.faults.as_dict()))
+        self.route("POST", "/_standin/faults", "_faults",
+                   lambda req: (200, self.faults.update(req.json()).as_dict()))
+
+    def route(self, method, pattern, name, handler):
+        self.routes.append(Route(method, pattern, name, handler))
+
+    # ─── Lifecycle ───────────────────────────────────────
+
+    def start(self):
+        """Serve on a background thread; returns self (port resolved if it was 0)"""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=f"{self.name}:{self.port}",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {"requests": dict(self.counts), "failures": self.failures}
+
+    # ─── Dispatch ────────────────────────────────────────
+
+    def error_body(self, message):
+        return {"error": message}
+
+    def items(self, route_name, request):
+        """How many items a request carries (for per_item_ms); overridden per server"""
+        return 1
+
+    def dispatch(self, request):
+        path = request.path.split("?", 1)[0]
+        allowed = False
+        for route in self.routes:
+            match = route.regex.match(path)
+            if not match:
+                continue
+            allowed = True
+            if route.method != request.command:
+                continue
+            request.params = match.groupdict()
+            with self._lock:
+                self.counts[route.name] = self.counts.get(route.name, 0) + 1
+            if not route.name.startswith("_") and self.faults.applies(route.name):
+                delay = self.faults.delay(self.items(route.name, request))
+                if delay:
+                    time.sleep(delay)
+                if self.faults.should_fail():
+                    with self._lock:
+                        self.failures += 1
+                    return 500, self.error_body("injected failure")
+            try:
+                return route.handler(request)
+            except HttpError as e:
+                return e.status, e.body
+            # Clients always get a response: a malformed body is their error, anything else ours
+            except (KeyError, TypeError, ValueError) as e:
+                return 400, self.error_body(f"malformed request: {type(e).__name__}: {e}")
+            except Exception as e:
+                return 500, self.error_body(f"{type(e).__name__}: {e}")
+        if allowed:
+            return 405, self.error_body(f"method {request.command} not allowed")
+        return 404, self.error_body(f"no route for {request.command} {path}")
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def json(self):
+                if not hasattr(self, "_json"):
+                    length = int(self.headers.get("Content-Length") or 0)
+                    raw = self.rfile.read(length) if length else b""
+                    try:
+                        self._json = json.loads(raw) if raw else {}
+                    except ValueError:
+                        self._json = {}
+                        raise HttpError(400, server.error_body("request body is not valid JSON"))
+                return self._json
+
+            def _handle(self):
+                # One handler instance serves every request on a kept-alive connection
+                self.__dict__.pop("_json", None)
+                try:
+                    self.json()  # drain the body so the connection can be reused
+                    status, body = server.dispatch(self)
+                except HttpError as e:
+                    status, body = e.status, e.body
+                if hasattr(body, "__next__"):
+                    return self._stream(status, body)
+                if isinstance(body, bytes):
+                    payload, content_type = body, "text/plain; charset=utf-8"
+                else:
+                    payload, content_type = json.dumps(body).encode("utf-8"), "application/json"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(payload)
+
+            def _stream(self, status, lines):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for item in lines:
+                    data = json.dumps(item).encode("utf-8") + b"\n"
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_PATCH = _handle
+
+        return Handler
@@ -0,0 +1,164 @@
+"""
+Akrizu Stack — Ollama Stand-in
+Serves the parts of the Ollama API the stack uses (/api/tags, /api/pull,
+/api/embed, /api/embeddings, /api/chat, /api/generate) without a model.
+
+Embeddings are deterministic feature-hashed bags of words, L2-normalized,
+so identical text always gets the identical vector and texts sharing words
+score higher under cosine similarity. Chat replies are canned but stable.
+"""
+
+import hashlib
+import math
+import re
+import time
+from datetime import datetime, timezone
+
+from akrizu_stack.models import normalize_model
+from akrizu_stack.standin.common import HttpError, StandinServer
+
+DEFAULT_MODELS = {"nomic-embed-text:latest": 768, "llama3.2:3b": 0}
+VERSION = "0.5.7-standin"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def hash_embedding(text, dim=768):
+    """Deterministic unit vector: signed feature hashing of words and word bigrams"""
+    vector = [0.0] * dim
+    words = _TOKEN.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for feature in features or [""]:
+        digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        vector[digest % dim] += 1.0 if digest >> 63 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _digest(name):
+    return hashlib.sha256(name.encode("utf-8")).hexdigest()
+
+
+class OllamaStandin(StandinServer):
+    """
+    `models` maps installed model names to their embedding dimension
+    (0 = chat-only). `pullable` models can be added with /api/pull.
+    """
+
+    name = "ollama-standin"
+
+    def __init__(self, host="127.0.0.1", port=0, models=None, pullable=None, faults=None):
+        super().__init__(host, port, faults)
+        self.models = {normalize_model(k): v for k, v in (models or DEFAULT_MODELS).items()}
+        self.pullable = {normalize_model(k): v for k, v in (pullable or {}).items()}
+        self.modified_at = datetime.now(timezone.utc).isoformat()
+        self.route("GET", "/", "root", lambda req: (200, b"Ollama is running"))
+        self.route("HEAD", "/", "root", lambda req: (200, b"Ollama is running"))
+        self.route("GET", "/api/version", "version", lambda req: (200, {"version": VERSION}))
+        self.route("GET", "/api/tags", "tags", self.tags)
+        self.route("GET", "/api/ps", "ps", self.ps)
+        self.route("POST", "/api/pull", "pull", self.pull)
+        self.route("POST", "/api/embed", "embed", self.embed)
+        self.route("POST", "/api/embeddings", "embeddings", self.embeddings)
+        self.route("POST", "/api/chat", "chat", self.chat)
+        self.route("POST", "/api/generate", "generate", self.generate)
+
+    def items(self, route_name, request):
+        if route_name == "embed":
+            inputs = request.json().get("input", "")
+            return len(inputs) if isinstance(inputs, list) else 1
+        return 1
+
+    def _model(self, request, embedding=False):
+        name = normalize_model(request.json().get("model") or "")
+        if name not in self.models:
+            raise HttpError(404, {"error": f"model \"{name}\" not found, try pulling it first"})
+        if embedding and not self.models[name]:
+            raise HttpError(400, {"error": f"\"{name}\" does not support embeddings"})
+        return name
+
+    # ─── Models ──────────────────────────────────────────
+
+    def _describe(self, name):
+        return {
+            "name": name,
+            "model": name,
+            "modified_at": self.modified_at,
+            "size": 274302450 if self.models[name] else 2019393189,
+            "digest": _digest(name),
+            "details": {"format": "gguf", "family": "standin"},
+        }
+
+    def tags(self, request):
+        return 200, {"models": [self._describe(name) for name in sorted(self.models)]}
+
+    def ps(self, request):
+        return 200, {"models": [self._describe(name) for name in sorted(self.models)]}
+
+    def pull(self, request):
+        body = request.json()
+        name = normalize_model(body.get("model") or body.get("name") or "")
+        if name not in self.models:
+            if name not in self.pullable:
+                raise HttpError(500, {"error": "pull model manifest: file does not exist"})
+            self.models[name] = self.pullable[name]
+        if body.get("stream", True):
+            return 200, iter([{"status": "pulling manifest"}, {"status": "verifying sha256 digest"},
+                              {"status": "success"}])
+        return 200, {"status": "success"}
+
+    # ─── Embeddings ──────────────────────────────────────
+
+    def embed(self, request):
+        start = time.perf_counter()
+        name = self._model(request, embedding=True)
+        inputs = request.json().get("input", "")
+        texts = inputs if isinstance(inputs, list) else [inputs]
+        dim = self.models[name]
+        return 200, {
+            "model": name,
+            "embeddings": [hash_embedding(str(text), dim) for text in texts],
+            "total_duration": int((time.perf_counter() - start) * 1e9),
+            "prompt_eval_count": sum(len(_TOKEN.findall(str(text))) for text in texts),
+        }
+
+    def embeddings(self, request):
+        """Legacy single-prompt endpoint"""
+        name = self._model(request, embedding=True)
+        return 200, {"embedding": hash_embedding(str(request.json().get("prompt", "")), self.models[name])}
+
+    # ─── Generation ──────────────────────────────────────
+
+    def _reply(self, name, prompt):
+        words = _TOKEN.findall(prompt)
+        topic = " ".join(words[-8:]) or "your request"
+        return f"[{name}] Stand-in answer about: {topic}."
+
+    def _generate(self, name, prompt, stream, wrap):
+        text = self._reply(name, prompt)
+        tokens = re.findall(r"\S+\s*", text)
+        base = {"model": name, "created_at": datetime.now(timezone.utc).isoformat()}
+        final = {**base, "done": True, "done_reason": "stop", "eval_count": len(tokens),
+                 "prompt_eval_count": len(_TOKEN.findall(prompt)), "total_duration": 0}
+        if not stream:
+            return 200, {**base, **wrap(text), **final}
+
+        def lines():
+            for token in tokens:
+                yield {**base, **wrap(token), "done": False}
+            yield {**final, **wrap("")}
+        return 200, lines()
+
+    def chat(self, request):
+        name = self._model(request)
+        body = request.json()
+        messages = body.get("messages") or []
+        prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        return self._generate(name, prompt, body.get("stream", True),
+                              lambda text: {"message": {"role": "assistant", "content": text}})
+
+    def generate(self, request):
+        name = self._model(request)
+        body = request.json()
+        return self._generate(name, body.get("prompt", ""), body.get("stream", True),
+                              lambda text: {"response": text})
@@ -0,0 +1,449 @@
+"""
+Akrizu Stack — Qdrant Stand-in
+In-memory Qdrant REST server covering what src/qdrant.mjs and the Python
+ingester call: collections (create/get/delete/exists, payload indexes),
+points (upsert, retrieve, delete, set/overwrite payload, batch update,
+count, scroll) and search with filters (match value/any/except/text,
+range, has_id, is_empty, is_null, nested must/should/must_not).
+
+Cosine search uses numpy when it is installed, plain Python otherwise.
+"""
+
+import math
+import threading
+import time
+
+from akrizu_stack.standin.common import HttpError, StandinServer
+
+VERSION = "1.12.4-standin"
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _lookup(payload, key):
+    """Payload values for a dotted key ('a.b'), descending into lists of objects"""
+    values = [payload]
+    for part in key.split("."):
+        found = []
+        for value in values:
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, dict) and part in item:
+                    found.append(item[part])
+        values = found
+    return values
+
+
+def _flat(values):
+    out = []
+    for value in values:
+        out.extend(value if isinstance(value, list) else [value])
+    return out
+
+
+def _condition(point, cond):
+    if "has_id" in cond:
+        return point["id"] in set(cond["has_id"])
+    if any(k in cond for k in ("must", "should", "must_not")):
+        return matches(point, cond)
+    if "filter" in cond:
+        return matches(point, cond["filter"])
+    if "is_empty" in cond:
+        return not [v for v in _flat(_lookup(point["payload"], cond["is_empty"]["key"])) if v is not None]
+    if "is_null" in cond:
+        return any(v is None for v in _lookup(point["payload"], cond["is_null"]["key"]))
+
+    values = [v for v in _flat(_lookup(point["payload"], cond["key"])) if v is not None]
+    if "match" in cond:
+        match = cond["match"]
+        if "value" in match:
+            return match["value"] in values
+        if "any" in match:
+            return bool(set(map(str, match["any"])) & set(map(str, values)))
+        if "except" in match:
+            return not set(map(str, match["except"])) & set(map(str, values))
+        if "text" in match:
+            return any(match["text"] in str(v) for v in values)
+    if "range" in cond:
+        bounds = cond["range"]
+        checks = {"gt": lambda v, b: v > b, "gte": lambda v, b: v >= b,
+                  "lt": lambda v, b: v < b, "lte": lambda v, b: v <= b}
+        return any(isinstance(v, (int, float)) and all(checks[op](v, b) for op, b in bounds.items()
+                                                         if b is not None and op in checks)
+                   for v in values)
+    raise HttpError(400, {"status": {"error": f"Unsupported filter condition: {cond}"}})
+
+
+def matches(point, flt):
+    """Qdrant filter semantics: all of must, none of must_not, at least one of should"""
+    if not flt:
+        return True
+
+    def as_list(value):
+        return value if isinstance(value, list) else [value] if value else []
+
+    must = as_list(flt.get("must"))
+    must_not = as_list(flt.get("must_not"))
+    should = as_list(flt.get("should"))
+    return (all(_condition(point, c) for c in must)
+            and not any(_condition(point, c) for c in must_not)
+            and (not should or any(_condition(point, c) for c in should)))
+
+
+def _scroll_key(pid):
+    return isinstance(pid, str), pid
+
+
+class Collection:
+    """Points held as dicts; the interface QdrantStandin needs from a collection backend"""
+
+    def __init__(self, name, size, distance="Cosine", on_disk_payload=False):
+        self.name = name
+        self.size = size
+        self.distance = distance
+        self.on_disk_payload = on_disk_payload
+        self.points = {}          # id → {"id", "vector", "payload"}
+        self.indexes = {}         # field → schema
+        self.lock = threading.RLock()
+        self._matrix = None       # (points, numpy matrix) cache, rebuilt after writes
+
+    def info(self):
+        with self.lock:
+            count = len(self.points)
+            schema = {field: {"data_type": kind, "points": sum(1 for p in self.points.values()
+                                                               if field in p["payload"])}
+                      for field, kind in self.indexes.items()}
+        return {
+            "status": "green",
+            "optimizer_status": "ok",
+            "vectors_count": count,
+            "indexed_vectors_count": count,
+            "points_count": count,
+            "segments_count": 1,
+            "config": {
+                "params": {"vectors": {"size": self.size, "distance": self.distance},
+                           "shard_number": 1, "replication_factor": 1,
+                           "on_disk_payload": self.on_disk_payload},
+                "hnsw_config": {"m": 16, "ef_construct": 100, "full_scan_threshold": 10000},
+                "optimizer_config": {}, "wal_config": {},
+            },
+            "payload_schema": schema,
+        }
+
+    def _vector(self, vector):
+        if isinstance(vector, dict):
+            vector = vector.get("vector", vector.get("", []))
+        if len(vector) != self.size:
+            raise HttpError(400, {"status": {"error": f"Wrong input: Vector dimension error: "
+                                                      f"expected dim: {self.size}, got {len(vector)}"}})
+        return _normalize(vector) if self.distance == "Cosine" else list(vector)
+
+    def upsert(self, points):
+        prepared = [{"id": p["id"], "vector": self._vector(p["vector"]), "payload": dict(p.get("payload") or {})}
+                    for p in points]
+        with self.lock:
+            for point in prepared:
+                self.points[point["id"]] = point
+            self._matrix = None
+
+    def select(self, body):
+        """Ids targeted by a {points: [...]} or {filter: {...}} selector"""
+        with self.lock:
+            if "points" in body:
+                return [pid for pid in dict.fromkeys(body["points"]) if pid in self.points]
+            flt = body.get("filter")
+            return [pid for pid, p in self.points.items() if matches(p, flt)]
+
+    def delete(self, body):
+        with self.lock:
+            for pid in self.select(body):
+                del self.points[pid]
+            self._matrix = None
+
+    def set_payload(self, body, overwrite=False):
+        with self.lock:
+            for pid in self.select(body):
+                point = self.points[pid]
+                point["payload"] = dict(body["payload"]) if overwrite else {**point["payload"], **body["payload"]}
+
+    def delete_payload(self, body):
+        with self.lock:
+            for pid in self.select(body):
+                for key in body.get("keys", []):
+                    self.points[pid]["payload"].pop(key, None)
+
+    def create_index(self, field, schema):
+        with self.lock:
+            self.indexes[field] = schema
+
+    def get(self, pid):
+        with self.lock:
+            return self.points.get(pid)
+
+    def retrieve(self, ids):
+        with self.lock:
+            return [self.points[pid] for pid in ids if pid in self.points]
+
+    def count(self, flt=None):
+        with self.lock:
+            return sum(1 for p in self.points.values() if matches(p, flt))
+
+    def scroll(self, flt=None, offset=None, limit=10):
+        """(page, next_page_offset) in id order"""
+        with self.lock:
+            points = sorted((p for p in self.points.values() if matches(p, flt)),
+                            key=lambda p: _scroll_key(p["id"]))
+        if offset is not None:
+            points = [p for p in points if _scroll_key(p["id"]) >= _scroll_key(offset)]
+        return points[:limit], points[limit]["id"] if len(points) > limit else None
+
+    def search(self, vector, flt=None, limit=10, offset=0, score_threshold=None):
+        """[(score, point)] best first"""
+        scored = [(s, p) for s, p in self.scores(vector)
+                  if (score_threshold is None or s >= score_threshold) and matches(p, flt)]
+        scored.sort(key=lambda item: -item[0])
+        return scored[offset:offset + limit]
+
+    def scores(self, query):
+        """[(score, point)] for every point"""
+        query = self._vector(query)
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        with self.lock:
+            if np is None:
+                return [(sum(a * b for a, b in zip(query, p["vector"])), p) for p in self.points.values()]
+            if self._matrix is None:
+                points = list(self.points.values())
+                vectors = [p["vector"] for p in points]
+                self._matrix = (points, np.asarray(vectors, dtype=np.float32).reshape(len(points), self.size))
+            points, matrix = self._matrix
+            sims = matrix @ np.asarray(query, dtype=np.float32)
+        return list(zip(sims.tolist(), points))
+
+
+def _render(point, with_payload=True, with_vector=False, score=None):
+    out = {"id": point["id"], "version": 0}
+    if score is not None:
+        out["score"] = score
+    if with_payload:
+        payload = point["payload"]
+        if isinstance(with_payload, list):
+            payload = {k: v for k, v in payload.items() if k in with_payload}
+        elif isinstance(with_payload, dict):
+            include = with_payload.get("include")
+            exclude = set(with_payload.get("exclude") or ())
+            payload = {k: v for k, v in payload.items()
+                       if (include is None or k in include) and k not in exclude}
+        out["payload"] = payload
+    else:
+        out["payload"] = None
+    out["vector"] = [float(v) for v in point["vector"]] if with_vector else None
+    return out
+
+
+class QdrantStandin(StandinServer):
+    name = "qdrant-standin"
+
+    def __init__(self, host="127.0.0.1", port=0, faults=None, api_key=None):
+        super().__init__(host, port, faults)
+        self.api_key = api_key
+        self.collections = {}
+        self._collections_lock = threading.Lock()
+        self.route("GET", "/", "root", lambda req: (200, {"title": "qdrant - vector search engine",
+                                                          "version": VERSION}))
+        for path in ("/healthz", "/readyz", "/livez"):
+            self.route("GET", path, "health", lambda req: (200, b"healthz check passed"))
+        self.route("GET", "/collections", "collections", self.list_collections)
+        self.route("GET", "/collections/{name}", "collection", self.get_collection)
+        self.route("PUT", "/collections/{name}", "create", self.create_collection)
+        self.route("DELETE", "/collections/{name}", "drop", self.delete_collection)
+        self.route("GET", "/collections/{name}/exists", "exists", self.collection_exists)
+        self.route("PUT", "/collections/{name}/index", "index", self.create_index)
+        self.route("PUT", "/collections/{name}/points", "upsert", self.upsert)
+        self.route("POST", "/collections/{name}/points", "retrieve", self.retrieve)
+        self.route("GET", "/collections/{name}/points/{id}", "retrieve", self.retrieve_one)
+        self.route("POST", "/collections/{name}/points/delete", "delete", self.delete_points)
+        self.route("POST", "/collections/{name}/points/payload", "set_payload", self.set_payload)
+        self.route("PUT", "/collections/{name}/points/payload", "set_payload", self.overwrite_payload)
+        self.route("POST", "/collections/{name}/points/payload/delete", "set_payload", self.delete_payload)
+        self.route("POST", "/collections/{name}/points/batch", "batch", self.batch)
+        self.route("POST", "/collections/{name}/points/search", "search", self.search)
+        self.route("POST", "/collections/{name}/points/search/batch", "search", self.search_batch)
+        self.route("POST", "/collections/{name}/points/scroll", "scroll", self.scroll)
+        self.route("POST", "/collections/{name}/points/count", "count", self.count)
+
+    def error_body(self, message):
+        return {"status": {"error": message}, "time": 0.0}
+
+    def items(self, route_name, request):
+        if route_name == "upsert":
+            return len(request.json().get("points") or [])
+        return 1
+
+    def dispatch(self, request):
+        if self.api_key and request.headers.get("api-key") != self.api_key:
+            return 401, self.error_body("Must provide an API key or an Authorization bearer token")
+        started = time.perf_counter()
+        status, body = super().dispatch(request)
+        if isinstance(body, dict) and "status" in body and "time" in body:
+            body["time"] = time.perf_counter() - started
+        return status, body
+
+    @staticmethod
+    def ok(result):
+        return 200, {"result": result, "status": "ok", "time": 0.0}
+
+    def _collection(self, request):
+        name = request.params["name"]
+        with self._collections_lock:
+            collection = self.collections.get(name)
+        if collection is None:
+            raise HttpError(404, self.error_body(f"Not found: Collection `{name}` doesn't exist!"))
+        return collection
+
+    @staticmethod
+    def _update_result():
+        return {"operation_id": 0, "status": "completed"}
+
+    # ─── Collections ─────────────────────────────────────
+
+    def list_collections(self, request):
+        with self._collections_lock:
+            names = sorted(self.collections)
+        return self.ok({"collections": [{"name": name} for name in names]})
+
+    def get_collection(self, request):
+        return self.ok(self._collection(request).info())
+
+    def collection_exists(self, request):
+        with self._collections_lock:
+            return self.ok({"exists": request.params["name"] in self.collections})
+
+    def create_collection(self, request):
+        body = request.json()
+        vectors = body.get("vectors") or {}
+        if "size" not in vectors:
+            raise HttpError(400, self.error_body("Wrong input: only unnamed vectors are supported by the stand-in"))
+        name = request.params["name"]
+        with self._collections_lock:
+            if name in self.collections:
+                raise HttpError(409, self.error_body(f"Wrong input: Collection `{name}` already exists!"))
+            self.collections[name] = self.new_collection(name, int(vectors["size"]),
+                                                         vectors.get("distance", "Cosine"),
+                                                         bool(body.get("on_disk_payload")))
+        return self.ok(True)
+
+    def new_collection(self, name, size, distance, on_disk_payload):
+        """Collection backend factory; anything with Collection's interface works"""
+        return Collection(name, size, distance, on_disk_payload)
+
+    def delete_collection(self, request):
+        with self._collections_lock:
+            collection = self.collections.pop(request.params["name"], None)
+        self.dropped(collection)
+        return self.ok(collection is not None)
+
+    def dropped(self, collection):
+        """Hook for backends that keep state outside the process"""
+
+    def create_index(self, request):
+        body = request.json()
+        schema = body.get("field_schema") or "keyword"
+        self._collection(request).create_index(
+            body["field_name"], schema if isinstance(schema, str) else schema.get("type", "keyword"))
+        return self.ok(self._update_result())
+
+    # ─── Points ──────────────────────────────────────────
+
+    def upsert(self, request):
+        body = request.json()
+        points = body.get("points")
+        if points is None and "batch" in body:
+            batch = body["batch"]
+            payloads = batch.get("payloads") or [None] * len(batch["ids"])
+            points = [{"id": i, "vector": v, "payload": p}
+                      for i, v, p in zip(batch["ids"], batch["vectors"], payloads)]
+        self._collection(request).upsert(points or [])
+        return self.ok(self._update_result())
+
+    def retrieve(self, request):
+        body = request.json()
+        points = self._collection(request).retrieve(body.get("ids", []))
+        return self.ok([_render(p, body.get("with_payload", True), body.get("with_vector", False))
+                        for p in points])
+
+    def retrieve_one(self, request):
+        collection = self._collection(request)
+        raw = request.params["id"]
+        pid = int(raw) if raw.isdigit() else raw
+        point = collection.get(pid)
+        if point is None:
+            raise HttpError(404, self.error_body(f"Not found: Point with id {raw} does not exists!"))
+        return self.ok(_render(point, True, True))
+
+    def delete_points(self, request):
+        self._collection(request).delete(request.json())
+        return self.ok(self._update_result())
+
+    def set_payload(self, request):
+        self._collection(request).set_payload(request.json())
+        return self.ok(self._update_result())
+
+    def overwrite_payload(self, request):
+        self._collection(request).set_payload(request.json(), overwrite=True)
+        return self.ok(self._update_result())
+
+    def delete_payload(self, request):
+        self._collection(request).delete_payload(request.json())
+        return self.ok(self._update_result())
+
+    def batch(self, request):
+        collection = self._collection(request)
+        results = []
+        with collection.lock:
+            for operation in request.json().get("operations", []):
+                (kind, body), = operation.items()
+                if kind == "upsert":
+                    collection.upsert(body.get("points") or [])
+                elif kind == "delete":
+                    collection.delete(body)
+                elif kind == "set_payload":
+                    collection.set_payload(body)
+                elif kind == "overwrite_payload":
+                    collection.set_payload(body, overwrite=True)
+                elif kind == "delete_payload":
+                    collection.delete_payload(body)
+                else:
+                    raise HttpError(400, self.error_body(f"Unsupported batch operation: {kind}"))
+                results.append(self._update_result())
+        return self.ok(results)
+
+    def _search(self, collection, body):
+        scored = collection.search(body["vector"], body.get("filter"), limit=int(body.get("limit") or 10),
+                                   offset=int(body.get("offset") or 0),
+                                   score_threshold=body.get("score_threshold"))
+        return [_render(p, body.get("with_payload", False), body.get("with_vector", False), score=s)
+                for s, p in scored]
+
+    def search(self, request):
+        return self.ok(self._search(self._collection(request), request.json()))
+
+    def search_batch(self, request):
+        collection = self._collection(request)
+        return self.ok([self._search(collection, body) for body in request.json().get("searches", [])])
+
+    def scroll(self, request):
+        body = request.json()
+        page, next_offset = self._collection(request).scroll(body.get("filter"), body.get("offset"),
+                                                             int(body.get("limit") or 10))
+        return self.ok({
+            "points": [_render(p, body.get("with_payload", True), body.get("with_vector", False)) for p in page],
+            "next_page_offset": next_offset,
+        })
+
+    def count(self, request):
+        return self.ok({"count": self._collection(request).count(request.json().get("filter"))})
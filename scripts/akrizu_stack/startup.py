@@ -0,0 +1,167 @@
+"""
+Akrizu Stack — Startup Graph
+Runs launcher stages concurrently as soon as their dependencies are ready.
+Each stage is gated on a readiness probe instead of a fixed sleep, and
+wall-clock timings are recorded per stage.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class Stage:
+    """A single startup step: run an action, then poll until it reports ready"""
+
+    def __init__(self, name, action, deps=(), ready=None, timeout=30.0,
+                 interval=0.1, max_interval=1.0, required=True):
+        self.name = name
+        self.action = action
+        self.deps = tuple(deps)
+        self.ready = ready
+        self.timeout = timeout
+        self.interval = interval
+        self.max_interval = max_interval
+        self.required = required
+
+
+class StageResult:
+    """Outcome and timings (seconds since launch) of a stage"""
+
+    def __init__(self, name, ok, started=None, finished=None, ready_at=None,
+                 error=None, skipped=False, required=True):
+        self.name = name
+        self.ok = ok
+        self.started = started
+        self.finished = finished
+        self.ready_at = ready_at
+        self.error = error
+        self.skipped = skipped
+        self.required = required
+
+    @property
+    def duration(self):
+        if self.started is None or self.ready_at is None:
+            return None
+        return self.ready_at - self.started
+
+
+def wait_until(check, timeout, interval=0.1, max_interval=1.0, clock=time.perf_counter):
+    """Poll check() until it returns truthy or timeout elapses (doubling interval)"""
+    deadline = clock() + timeout
+    while True:
+        if check():
+            return True
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+
+def _validate(stages):
+    names = {s.name for s in stages}
+    if len(names) != len(stages):
+        raise ValueError("Duplicate stage names")
+    for stage in stages:
+        missing = [d for d in stage.deps if d not in names]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {', '.join(missing)}")
+
+    # Kahn's algorithm — anything left over is part of a cycle
+    indegree = {s.name: len(s.deps) for s in stages}
+    dependents = {s.name: [] for s in stages}
+    for stage in stages:
+        for dep in stage.deps:
+            dependents[dep].append(stage.name)
+    queue = [name for name, n in indegree.items() if n == 0]
+    seen = 0
+    while queue:
+        name = queue.pop()
+        seen += 1
+        for child in dependents[name]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                queue.append(child)
+    if seen != len(stages):
+        cyclic = sorted(name for name, n in indegree.items() if n > 0)
+        raise ValueError(f"Dependency cycle between stages: {', '.join(cyclic)}")
+
+
+def _run_stage(stage, t0, clock):
+    started = clock() - t0
+    try:
+        if not stage.action():
+            return StageResult(stage.name, False, started, clock() - t0,
+                               error="action failed", required=stage.required)
+        finished = clock() - t0
+        if stage.ready is not None:
+            if not wait_until(stage.ready, stage.timeout, stage.interval, stage.max_interval, clock):
+                return StageResult(stage.name, False, started, finished,
+                                   error=f"not ready after {stage.timeout:.0f}s",
+                                   required=stage.required)
+        return StageResult(stage.name, True, started, finished, clock() - t0,
+                           required=stage.required)
+    except Exception as e:
+        return StageResult(stage.name, False, started, clock() - t0, error=str(e),
+                           required=stage.required)
+
+
+def run_stages(stages, max_workers=None, on_done=None, clock=time.perf_counter):
+    """
+    Run stages as a dependency graph. A stage starts as soon as all of its
+    dependencies are ready; stages whose dependencies failed are skipped.
+    Returns {name: StageResult} in completion order.
+    """
+    stages = list(stages)
+    _validate(stages)
+
+    t0 = clock()
+    pending = {s.name: s for s in stages}
+    results = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1) as pool:
+        while pending or running:
+            for name in list(pending):
+                stage = pending[name]
+                if not all(d in results for d in stage.deps):
+                    continue
+                del pending[name]
+                failed = [d for d in stage.deps if not results[d].ok]
+                if failed:
+                    result = StageResult(name, False, error=f"skipped, dependency failed: {', '.join(failed)}",
+                                         skipped=True, required=stage.required)
+                    results[name] = result
+                    if on_done:
+                        on_done(result)
+                    continue
+                running[pool.submit(_run_stage, stage, t0, clock)] = stage
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                result = future.result()
+                results[stage.name] = result
+                if on_done:
+                    on_done(result)
+
+    return results
+
+
+def format_timings(results):
+    """Render a per-stage timing table (seconds since launch)"""
+    rows = [f"  {'Stage':<16}{'Start':>8}{'Ready':>8}{'Took':>8}  Status"]
+    ordered = sorted(results.values(), key=lambda r: (r.started is None, r.started or 0))
+    for r in ordered:
+        start = f"{r.started:.2f}s" if r.started is not None else "-"
+        ready = f"{r.ready_at:.2f}s" if r.ready_at is not None else "-"
+        took = f"{r.duration:.2f}s" if r.duration is not None else "-"
+        status = "ok" if r.ok else ("skipped" if r.skipped else f"failed ({r.error})")
+        rows.append(f"  {r.name:<16}{start:>8}{ready:>8}{took:>8}  {status}")
+    ready_times = [r.ready_at for r in results.values() if r.ready_at is not None]
+    if ready_times:
+        rows.append(f"  Time-to-ready: {max(ready_times):.2f}s")
+    return "\n".join(rows)
@@ -0,0 +1,245 @@
+"""
+Akrizu Stack — asyncio Process Supervisor
+Runs Ollama, the RAG server and the sync watcher from one event loop with
+zero threads per service: stdout/stderr are read as non-blocking byte
+streams and split into lines incrementally, and crashed services are
+restarted with exponential backoff.
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import time
+
+READ_CHUNK = 64 * 1024
+
+
+class ServiceSpec:
+    """How to launch and restart one supervised service"""
+
+    def __init__(self, name, argv, cwd=None, env=None, restart=True, max_restarts=5,
+                 backoff=0.5, max_backoff=30.0, stable_after=30.0, ready_line=None):
+        self.name = name
+        self.argv = list(argv)
+        self.cwd = cwd
+        self.env = env
+        self.restart = restart
+        self.max_restarts = max_restarts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # A run longer than this resets the restart counter/backoff
+        self.stable_after = stable_after
+        # Optional substring in the output that marks the service as ready
+        self.ready_line = ready_line
+
+
+class ServiceState:
+    """Runtime state of a supervised service"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.proc = None
+        self.status = 'stopped'
+        self.restarts = 0
+        self.exit_code = None
+        self.started_at = None
+        self.stopping = False
+        self.task = None
+        self.ready = asyncio.Event()
+        self._exit_future = None
+
+    @property
+    def pid(self):
+        return self.proc.pid if self.proc else None
+
+    @property
+    def running(self):
+        return self.proc is not None and self.proc.returncode is None
+
+    def exited(self):
+        """Future resolved with the exit code of the current process"""
+        return self._exit_future
+
+    def as_dict(self):
+        return {
+            'name': self.spec.name,
+            'status': self.status,
+            'pid': self.pid,
+            'restarts': self.restarts,
+            'exitCode': self.exit_code,
+            'uptime': round(time.monotonic() - self.started_at, 1) if self.running else 0,
+        }
+
+
+class Supervisor:
+    """
+    Spawns services with asyncio.create_subprocess_exec and keeps them alive.
+    Callbacks: on_line(name, line, level) for output, on_event(name, message, level)
+    for lifecycle changes.
+    """
+
+    def __init__(self, on_line=None, on_event=None):
+        self.on_line = on_line or (lambda name, line, level: None)
+        self.on_event = on_event or (lambda name, message, level: None)
+        self.services = {}
+
+    def get(self, name):
+        return self.services.get(name)
+
+    async def start(self, spec):
+        """Spawn a service and supervise it in the background; returns its ServiceState"""
+        state = self.services.get(spec.name)
+        if state and state.task and not state.task.done():
+            return state
+        state = ServiceState(spec)
+        self.services[spec.name] = state
+        await self._spawn(state)
+        state.task = asyncio.ensure_future(self._supervise(state))
+        return state
+
+    async def _spawn(self, state):
+        spec = state.spec
+        kwargs = {}
+        if sys.platform == 'win32':
+            kwargs['creationflags'] = 0x00000200  # CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs['start_new_session'] = True  # own process group → stop the whole tree
+        state.status = 'starting'
+        state.ready.clear()
+        state.proc = await asyncio.create_subprocess_exec(
+            *spec.argv,
+            cwd=spec.cwd,
+            env=spec.env,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **kwargs,
+        )
+        state.started_at = time.monotonic()
+        state.exit_code = None
+        state._exit_future = asyncio.get_running_loop().create_future()
+        if spec.ready_line is None:
+            state.status = 'running'
+        self.on_event(spec.name, f"Process spawned with PID: {state.proc.pid}", 'info')
+
+    async def _pump(self, state, stream, level):
+        """Read raw bytes and emit complete lines as they arrive"""
+        name = state.spec.name
+        marker = state.spec.ready_line
+        buffer = bytearray()
+
+        def emit(raw):
+            line = raw.decode('utf-8', 'replace').rstrip('\r')
+            if not line.strip():
+                return
+            if marker and not state.ready.is_set() and marker in line:
+                state.status = 'running'
+                state.ready.set()
+            self.on_line(name, line, level)
+
+        while True:
+            chunk = await stream.read(READ_CHUNK)
+            if not chunk:
+                break
+            buffer += chunk
+            start = 0
+            while True:
+                nl = buffer.find(b'\n', start)
+                if nl < 0:
+                    break
+                emit(bytes(buffer[start:nl]))
+                start = nl + 1
+            if start:
+                del buffer[:start]
+        if buffer:
+            emit(bytes(buffer))
+
+    async def _supervise(self, state):
+        spec = state.spec
+        delay = spec.backoff
+        while True:
+            proc = state.proc
+            pumps = asyncio.gather(self._pump(state, proc.stdout, 'stdout'),
+                                   self._pump(state, proc.stderr, 'stderr'))
+            code = await proc.wait()
+            try:
+                # A grandchild can keep the pipes open after the child exits
+                await asyncio.wait_for(pumps, 2.0)
+            except asyncio.TimeoutError:
+                pass
+            state.exit_code = code
+            if not state._exit_future.done():
+                state._exit_future.set_result(code)
+
+            if state.stopping:
+                state.status = 'stopped'
+                self.on_event(spec.name, f"Process exited with code {code}", 'info')
+                return
+            state.status = 'crashed'
+            self.on_event(spec.name, f"Process exited with code {code}", 'error')
+
+            if time.monotonic() - state.started_at >= spec.stable_after:
+                state.restarts = 0
+                delay = spec.backoff
+            if not spec.restart or state.restarts >= spec.max_restarts:
+                state.status = 'failed' if spec.restart else 'stopped'
+                if spec.restart:
+                    self.on_event(spec.name, f"Giving up after {state.restarts} restart(s)", 'error')
+                return
+
+            state.restarts += 1
+            self.on_event(spec.name, f"Restarting in {delay:.1f}s (attempt {state.restarts}/{spec.max_restarts})", 'info')
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, spec.max_backoff)
+            if state.stopping:
+                state.status = 'stopped'
+                return
+            try:
+                await self._spawn(state)
+            except OSError as e:
+                state.status = 'failed'
+                self.on_event(spec.name, f"Restart failed: {e}", 'error')
+                return
+
+    def _signal(self, state, sig):
+        proc = state.proc
+        if proc is None or proc.returncode is not None:
+            return
+        try:
+            if sys.platform == 'win32':
+                proc.kill() if sig == 'kill' else proc.terminate()
+            else:
+                os.killpg(proc.pid, signal.SIGKILL if sig == 'kill' else signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def stop(self, name, timeout=5.0):
+        """Terminate a service's process group (SIGKILL after timeout) and stop restarting it"""
+        state = self.services.get(name)
+        if not state:
+            return None
+        state.stopping = True
+        if state.running:
+            state.status = 'stopping'
+            self._signal(state, 'term')
+            try:
+                await asyncio.wait_for(state.proc.wait(), timeout)
+            except asyncio.TimeoutError:
+                self._signal(state, 'kill')
+                await state.proc.wait()
+        if state.task and not state.task.done():
+            # Either draining the last output or sleeping in restart backoff
+            try:
+                await asyncio.wait_for(state.task, 1.0)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+        state.status = 'stopped'
+        return state.exit_code
+
+    async def stop_all(self, timeout=5.0):
+        """Stop every service in parallel"""
+        await asyncio.gather(*(self.stop(name, timeout) for name in list(self.services)))
+
+    def status(self):
+        return {name: state.as_dict() for name, state in self.services.items()}
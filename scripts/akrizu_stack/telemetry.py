@@ -0,0 +1,437 @@
+"""
+Akrizu Stack — Process Telemetry
+Samples CPU, memory and disk I/O of each supervised process tree from
+/proc/<pid>/stat, status and io on one background thread, keeps a bounded
+time series per service and serves it as JSON or Prometheus text. Linux
+only; elsewhere the sampler reports itself unavailable and records nothing.
+
+Usage (CLI):
+  python -m akrizu_stack.telemetry ollama=1234 ragServer=5678 [--interval 1] [--port 9464]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+from akrizu_stack.standin.common import StandinServer
+
+PROC = "/proc"
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# /proc/<pid>/status fields kept (kB)
+STATUS_FIELDS = {"VmHWM": "hwm", "VmSwap": "swap"}
+
+
+# ─── /proc readers ───────────────────────────────────────
+
+def read_stat(pid):
+    """(ppid, cpu_ticks, threads, rss_bytes) from /proc/<pid>/stat, or None if it is gone"""
+    try:
+        with open(f"{PROC}/{pid}/stat", "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    # comm may contain spaces and parentheses; fields resume after the last ')'
+    fields = raw[raw.rindex(b")") + 2:].split()
+    return (int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[17]),
+            int(fields[21]) * PAGE_SIZE)
+
+
+def read_status(pid):
+    """{'hwm': bytes, 'swap': bytes} from /proc/<pid>/status (missing fields are 0)"""
+    values = {"hwm": 0, "swap": 0}
+    try:
+        with open(f"{PROC}/{pid}/status", "rb") as f:
+            for line in f:
+                key, _, rest = line.partition(b":")
+                name = STATUS_FIELDS.get(key.decode("ascii", "replace"))
+                if name:
+                    values[name] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return values
+
+
+def read_io(pid):
+    """(read_bytes, write_bytes) from /proc/<pid>/io; (0, 0) when not permitted"""
+    read_bytes = write_bytes = 0
+    try:
+        with open(f"{PROC}/{pid}/io", "rb") as f:
+            for line in f:
+                if line.startswith(b"read_bytes:"):
+                    read_bytes = int(line.split()[1])
+                elif line.startswith(b"write_bytes:"):
+                    write_bytes = int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return read_bytes, write_bytes
+
+
+def _children_files_supported():
+    return os.path.exists(f"{PROC}/self/task/{os.getpid()}/children")
+
+
+def descendants(roots, children_files=None):
+    """
+    {root: [root, *descendant pids]} for live roots. Uses the kernel's
+    per-thread `children` lists when available, otherwise one ppid scan of /proc.
+    """
+    if children_files is None:
+        children_files = _children_files_supported()
+    trees = {}
+    if children_files:
+        for root in roots:
+            pids, stack = [], [root]
+            while stack:
+                pid = stack.pop()
+                pids.append(pid)
+                try:
+                    for tid in os.listdir(f"{PROC}/{pid}/task"):
+                        with open(f"{PROC}/{pid}/task/{tid}/children", "rb") as f:
+                            stack.extend(int(c) for c in f.read().split())
+                except OSError:
+                    continue
+            trees[root] = pids
+        return trees
+
+    kids = {}
+    for entry in os.listdir(PROC):
+        if entry.isdigit():
+            stat = read_stat(entry)
+            if stat is not None:
+                kids.setdefault(stat[0], []).append(int(entry))
+    for root in roots:
+        pids, stack = [], [root]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            stack.extend(kids.get(pid, ()))
+        trees[root] = pids
+    return trees
+
+
+# ─── Samples ─────────────────────────────────────────────
+
+class Sample:
+    """One reading of a process tree; rates are over the interval since the previous one"""
+
+    __slots__ = ("ts", "pid", "procs", "threads", "cpu", "rss", "hwm", "swap", "read_rate", "write_rate")
+
+    def __init__(self, ts, pid, procs, threads, cpu, rss, hwm, swap, read_rate, write_rate):
+        self.ts = ts
+        self.pid = pid
+        self.procs = procs
+        self.threads = threads
+        self.cpu = cpu  # percent of one core
+        self.rss = rss
+        self.hwm = hwm
+        self.swap = swap
+        self.read_rate = read_rate
+        self.write_rate = write_rate
+
+    def as_dict(self):
+        return {
+            "ts": round(self.ts, 3), "pid": self.pid, "procs": self.procs, "threads": self.threads,
+            "cpuPercent": round(self.cpu, 1), "rssBytes": self.rss, "peakRssBytes": self.hwm,
+            "swapBytes": self.swap, "readBytesPerSec": round(self.read_rate),
+            "writeBytesPerSec": round(self.write_rate),
+        }
+
+
+class ServiceSeries:
+    """Bounded time series of one service plus running totals (Prometheus counters)"""
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.samples = deque(maxlen=capacity)
+        self.cpu_seconds = 0.0
+        self.read_bytes = 0
+        self.write_bytes = 0
+        self.root = None
+        self._last = None  # (ts, {pid: (cpu_ticks, read_bytes, write_bytes)})
+
+    def record(self, ts, root, pids):
+        """Read every pid of the tree and append a Sample; returns it (None on the first reading)"""
+        if root != self.root:
+            # Restarted (or first seen): rates restart from this reading
+            self.root = root
+            self._last = None
+
+        counters = {}
+        threads = rss = hwm = swap = 0
+        for pid in pids:
+            stat = read_stat(pid)
+            if stat is None:
+                continue
+            _, ticks, nthreads, pid_rss = stat
+            status = read_status(pid)
+            counters[pid] = (ticks,) + read_io(pid)
+            threads += nthreads
+            rss += pid_rss
+            hwm += status["hwm"]
+            swap += status["swap"]
+
+        last = self._last
+        self._last = (ts, counters)
+        if last is None:
+            return None
+
+        last_ts, last_counters = last
+        elapsed = max(ts - last_ts, 1e-6)
+        deltas = [0, 0, 0]
+        for pid, values in counters.items():
+            # A child born during the interval counts from zero
+            before = last_counters.get(pid, (0, 0, 0))
+            for i in range(3):
+                deltas[i] += max(0, values[i] - before[i])
+
+        cpu_seconds = deltas[0] / CLK_TCK
+        self.cpu_seconds += cpu_seconds
+        self.read_bytes += deltas[1]
+        self.write_bytes += deltas[2]
+        sample = Sample(ts, root, len(counters), threads, 100.0 * cpu_seconds / elapsed, rss, hwm, swap,
+                        deltas[1] / elapsed, deltas[2] / elapsed)
+        self.samples.append(sample)
+        return sample
+
+    def summary(self):
+        samples = list(self.samples)
+        if not samples:
+            return {"samples": 0}
+        cpu = sorted(s.cpu for s in samples)
+        return {
+            "samples": len(samples),
+            "seconds": round(samples[-1].ts - samples[0].ts, 1),
+            "cpuPercent": {
+                "mean": round(sum(cpu) / len(cpu), 1),
+                "p95": round(cpu[min(len(cpu) - 1, int(len(cpu) * 0.95))], 1),
+                "max": round(cpu[-1], 1),
+            },
+            "rssBytes": {
+                "first": samples[0].rss,
+                "last": samples[-1].rss,
+                "max": max(s.rss for s in samples),
+                "growth": samples[-1].rss - samples[0].rss,
+            },
+            "cpuSecondsTotal": round(self.cpu_seconds, 2),
+            "readBytesTotal": self.read_bytes,
+            "writeBytesTotal": self.write_bytes,
+        }
+
+
+# ─── Sampler ─────────────────────────────────────────────
+
+class TelemetrySampler:
+    """
+    Samples the process trees named by `source()` — a callable returning
+    {service: root pid or None} — every `interval` seconds on a daemon thread.
+    Each service keeps its last `capacity` samples.
+    """
+
+    def __init__(self, source, interval=1.0, capacity=900):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.source = source
+        self.interval = interval
+        self.capacity = capacity
+        self.available = os.path.isdir(f"{PROC}/self")
+        self.series = {}
+        self._children_files = _children_files_supported() if self.available else False
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """Take one reading of every live service now"""
+        if not self.available:
+            return {}
+        roots = {name: pid for name, pid in self.source().items() if pid}
+        trees = descendants(set(roots.values()), self._children_files)
+        ts = time.time()
+        taken = {}
+        with self._lock:
+            for name, root in roots.items():
+                series = self.series.get(name)
+                if series is None:
+                    series = self.series[name] = ServiceSeries(name, self.capacity)
+                sample = series.record(ts, root, trees.get(root, [root]))
+                if sample is not None:
+                    taken[name] = sample
+        return taken
+
+    def start(self):
+        if self.available and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._closed.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                # A vanished process mid-read must never stop the sampler
+                continue
+
+    def stop(self):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ─── Reports ─────────────────────────────────────────
+
+    def snapshot(self, since=None, limit=None):
+        """{service: {latest, summary, samples}}; `since` is a unix timestamp"""
+        with self._lock:
+            report = {}
+            for name, series in self.series.items():
+                samples = [s for s in series.samples if since is None or s.ts > since]
+                if limit is not None:
+                    samples = samples[-limit:]
+                report[name] = {
+                    "latest": series.samples[-1].as_dict() if series.samples else None,
+                    "summary": series.summary(),
+                    "samples": [s.as_dict() for s in samples],
+                }
+            return report
+
+    def summary(self):
+        with self._lock:
+            return {name: series.summary() for name, series in self.series.items()}
+
+    def prometheus(self):
+        """Latest readings and running totals in the Prometheus text exposition format"""
+        metrics = [
+            ("akrizu_process_cpu_percent", "gauge", "CPU use of the process tree (percent of one core)",
+             lambda series, s: s.cpu),
+            ("akrizu_process_resident_memory_bytes", "gauge", "Resident memory of the process tree",
+             lambda series, s: s.rss),
+            ("akrizu_process_peak_resident_memory_bytes", "gauge", "Sum of peak resident memory (VmHWM)",
+             lambda series, s: s.hwm),
+            ("akrizu_process_swap_bytes", "gauge", "Swapped-out memory of the process tree",
+             lambda series, s: s.swap),
+            ("akrizu_process_threads", "gauge", "Threads in the process tree", lambda series, s: s.threads),
+            ("akrizu_process_count", "gauge", "Processes in the process tree", lambda series, s: s.procs),
+            ("akrizu_process_cpu_seconds_total", "counter", "CPU time used since sampling started",
+             lambda series, s: series.cpu_seconds),
+            ("akrizu_process_read_bytes_total", "counter", "Bytes read from storage since sampling started",
+             lambda series, s: series.read_bytes),
+            ("akrizu_process_write_bytes_total", "counter", "Bytes written to storage since sampling started",
+             lambda series, s: series.write_bytes),
+        ]
+        with self._lock:
+            latest = [(name, series, series.samples[-1]) for name, series in sorted(self.series.items())
+                      if series.samples]
+            lines = []
+            for metric, kind, help_text, value in metrics:
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} {kind}")
+                for name, series, sample in latest:
+                    lines.append(f'{metric}{{service="{name}"}} {_prom_value(value(series, sample))}')
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self):
+        """Human-readable per-service summary (printed at shutdown)"""
+        lines = []
+        for name, s in sorted(self.summary().items()):
+            if not s["samples"]:
+                lines.append(f"  {name:<14} no samples")
+                continue
+            mb = 1024 * 1024
+            lines.append(
+                f"  {name:<14} cpu mean {s['cpuPercent']['mean']:5.1f}% p95 {s['cpuPercent']['p95']:5.1f}% "
+                f"max {s['cpuPercent']['max']:5.1f}%  rss {s['rssBytes']['last'] / mb:7.1f} MB "
+                f"(max {s['rssBytes']['max'] / mb:.1f}, {s['rssBytes']['growth'] / mb:+.1f})  "
+                f"io r {s['readBytesTotal'] / mb:.1f} MB w {s['writeBytesTotal'] / mb:.1f} MB  "
+                f"[{s['samples']} samples / {s['seconds']:.0f}s]")
+        return "\n".join(lines)
+
+
+def _prom_value(value):
+    return str(value) if isinstance(value, int) else f"{value:.3f}"
+
+
+def supervisor_pids(supervisor):
+    """Sampler source for an akrizu_stack.supervisor.Supervisor"""
+    return lambda: {name: state.pid for name, state in list(supervisor.services.items()) if state.running}
+
+
+# ─── HTTP endpoint ───────────────────────────────────────
+
+class TelemetryServer(StandinServer):
+    """
+    GET /metrics            Prometheus text
+    GET /telemetry          JSON series (?since=<unix ts>&limit=<n>)
+    GET /telemetry/summary  JSON per-service summary
+    """
+
+    name = "telemetry"
+
+    def __init__(self, sampler, host="127.0.0.1", port=9464):
+        super().__init__(host, port)
+        self.sampler = sampler
+        self.route("GET", "/metrics", "metrics", lambda req: (200, sampler.prometheus().encode("utf-8")))
+        self.route("GET", "/telemetry", "telemetry", self._telemetry)
+        self.route("GET", "/telemetry/summary", "summary", lambda req: (200, sampler.summary()))
+
+    def _telemetry(self, request):
+        query = parse_qs(urlsplit(request.path).query)
+        since = float(query["since"][0]) if "since" in query else None
+        limit = int(query["limit"][0]) if "limit" in query else None
+        return 200, {"interval": self.sampler.interval, "services": self.sampler.snapshot(since, limit)}
+
+
+# ─── CLI ─────────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sample CPU, memory and I/O of process trees")
+    parser.add_argument("targets", nargs="+", help="[name=]pid of each process tree root")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between samples")
+    parser.add_argument("--capacity", type=int, default=900, help="Samples kept per service")
+    parser.add_argument("--port", type=int, default=None, help="Serve /metrics and /telemetry on this port")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    pids = {}
+    for target in args.targets:
+        name, _, pid = target.rpartition("=")
+        pids[name or pid] = int(pid)
+
+    sampler = TelemetrySampler(lambda: pids, interval=args.interval, capacity=args.capacity)
+    if not sampler.available:
+        print("✗ /proc is not available on this platform")
+        return 1
+    server = TelemetryServer(sampler, port=args.port).start() if args.port is not None else None
+    if server:
+        print(f"📈 Telemetry on {server.url}/metrics and {server.url}/telemetry")
+    sampler.start()
+    try:
+        if args.duration is not None:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
+        if server:
+            server.stop()
+    print(json.dumps(sampler.summary(), indent=2) if args.json else sampler.format_summary())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
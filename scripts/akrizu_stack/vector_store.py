@@ -0,0 +1,467 @@
+"""
+Akrizu Stack — Embedded Vector Store
+Qdrant-free vector index for a knowledge base of a few hundred chunks.
+Vectors live in one contiguous float32 matrix (memory-mapped from the
+snapshot file), payloads in per-field columns, and a filtered top-k cosine
+query is one matrix-vector product, a boolean mask and an argpartition.
+
+`VectorStore` can be used in-process (it has the collection interface of
+the Qdrant stand-in); `python -m akrizu_stack.vector_store` serves it on the
+Qdrant REST API, so src/qdrant.mjs and the ingester work unchanged when
+VECTOR_STORE=embedded.
+
+Snapshot format (little-endian), one file per collection:
+  header  b"AKVEC001" | dim u32 | rows u32 | meta_len u64, padded to 32 bytes
+  matrix  float32[rows × dim] (rows L2-normalized for Cosine)
+  meta    JSON: ids, payload columns, distance, payload indexes
+
+Usage:
+  python -m akrizu_stack.vector_store [--port 6333] [--path .cache/vector-store] [--snapshot-every 2]
+"""
+
+import argparse
+import json
+import os
+import signal
+import struct
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+
+from akrizu_stack.standin.qdrant import QdrantStandin, matches
+from akrizu_stack.standin.common import HttpError
+
+MAGIC = b"AKVEC001"
+HEADER_SIZE = 32
+SNAPSHOT_SUFFIX = ".akvec"
+# Distinct filters whose row masks are kept between writes
+MASK_CACHE_SIZE = 256
+
+_HEADER = struct.Struct("<8sIIQ")
+_MISSING = object()  # payload field absent on a row (None is a valid value)
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value] if value else []
+
+
+class VectorStore:
+    """One collection: float32 matrix + id list + payload columns"""
+
+    def __init__(self, name, size, distance="Cosine", on_disk_payload=False, path=None):
+        self.name = name
+        self.size = size
+        self.distance = distance
+        self.on_disk_payload = on_disk_payload
+        self.path = Path(path) if path else None
+        self.indexes = {}         # field → schema
+        self.lock = threading.RLock()
+        self.dirty = False
+        self._matrix = np.empty((0, size), dtype=np.float32)
+        self._n = 0
+        self._ids = []
+        self._rows = {}           # id → row
+        self._columns = {}        # field → [value | _MISSING] per row
+        self._masks = {}          # filter JSON → bool[n]
+
+    # ─── Snapshots ───────────────────────────────────────
+
+    @classmethod
+    def load(cls, path):
+        """Open a snapshot; the matrix stays memory-mapped (copy-on-write) until it grows"""
+        path = Path(path)
+        with open(path, "rb") as f:
+            magic, dim, rows, meta_len = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a vector store snapshot")
+            f.seek(HEADER_SIZE + rows * dim * 4)
+            meta = json.loads(f.read(meta_len))
+        store = cls(meta["name"], dim, meta.get("distance", "Cosine"), meta.get("on_disk_payload", False), path)
+        store.indexes = meta.get("indexes", {})
+        store._map(rows)
+        store._ids = meta["ids"]
+        store._rows = {pid: row for row, pid in enumerate(store._ids)}
+        for field, column in meta["columns"].items():
+            values = column["values"]
+            for row in column["missing"]:
+                values[row] = _MISSING
+            store._columns[field] = values
+        return store
+
+    def _map(self, rows):
+        if rows:
+            self._matrix = np.memmap(self.path, dtype="<f4", mode="c", offset=HEADER_SIZE, shape=(rows, self.size))
+        else:
+            self._matrix = np.empty((0, self.size), dtype=np.float32)
+        self._n = rows
+
+    def save(self, path=None):
+        """Write a snapshot atomically (tmp file + rename) and re-map the matrix from it"""
+        with self.lock:
+            self.path = Path(path) if path else self.path
+            columns = {}
+            for field, values in self._columns.items():
+                column = values[:self._n]
+                columns[field] = {
+                    "values": [None if v is _MISSING else v for v in column],
+                    "missing": [row for row, v in enumerate(column) if v is _MISSING],
+                }
+            meta = json.dumps({
+                "name": self.name, "distance": self.distance, "on_disk_payload": self.on_disk_payload,
+                "indexes": self.indexes, "ids": self._ids, "columns": columns,
+            }).encode("utf-8")
+            # A mapped file cannot be replaced on Windows — read it into memory first
+            self._matrix = np.array(self._matrix[:self._n], dtype=np.float32)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, self.size, self._n, len(meta)).ljust(HEADER_SIZE, b"\0"))
+                f.write(self._matrix.astype("<f4", copy=False).tobytes())
+                f.write(meta)
+            os.replace(tmp, self.path)
+            self._map(self._n)
+            self.dirty = False
+        return self.path
+
+    # ─── Writes ──────────────────────────────────────────
+
+    def _prepare(self, vectors):
+        vectors = [v.get("vector", v.get("", [])) if isinstance(v, dict) else v for v in vectors]
+        for v in vectors:
+            if len(v) != self.size:
+                raise HttpError(400, {"status": {"error": f"Wrong input: Vector dimension error: "
+                                                          f"expected dim: {self.size}, got {len(v)}"}})
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.size)
+        if self.distance == "Cosine":
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1.0, norms)
+        return matrix
+
+    def _changed(self):
+        self.dirty = True
+        self._masks.clear()
+
+    def _reserve(self, rows):
+        """Room for `rows` more rows; a full (or still mapped) matrix moves to a larger in-memory one"""
+        needed = self._n + rows
+        if needed <= len(self._matrix):
+            return
+        grown = np.empty((max(needed, 2 * len(self._matrix), 16), self.size), dtype=np.float32)
+        grown[:self._n] = self._matrix[:self._n]
+        self._matrix = grown
+
+    def _set_payload(self, row, payload, overwrite=True):
+        for field, column in self._columns.items():
+            if field in payload:
+                column[row] = payload[field]
+            elif overwrite:
+                column[row] = _MISSING
+        for field, value in payload.items():
+            if field not in self._columns:
+                column = self._columns[field] = [_MISSING] * len(self._ids)
+                column[row] = value
+
+    def upsert(self, points):
+        if not points:
+            return
+        vectors = self._prepare([p["vector"] for p in points])
+        with self.lock:
+            new = sum(1 for pid in {p["id"] for p in points} if pid not in self._rows)
+            self._reserve(new)
+            for point, vector in zip(points, vectors):
+                row = self._rows.get(point["id"])
+                if row is None:
+                    row = self._n
+                    self._n += 1
+                    self._rows[point["id"]] = row
+                    self._ids.append(point["id"])
+                    for column in self._columns.values():
+                        column.append(_MISSING)
+                self._matrix[row] = vector
+                self._set_payload(row, point.get("payload") or {})
+            self._changed()
+
+    def select(self, body):
+        """Rows targeted by a {points: [...]} or {filter: {...}} selector"""
+        with self.lock:
+            if "points" in body:
+                # A repeated id would otherwise swap-remove an unrelated row on delete
+                return [self._rows[pid] for pid in dict.fromkeys(body["points"]) if pid in self._rows]
+            return np.flatnonzero(self._mask(body.get("filter"))).tolist()
+
+    def delete(self, body):
+        with self.lock:
+            # Swap-remove from the end so the matrix stays contiguous
+            for row in sorted(self.select(body), reverse=True):
+                last = self._n - 1
+                del self._rows[self._ids[row]]
+                if row != last:
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = self._ids[last]
+                    self._rows[self._ids[row]] = row
+                    for column in self._columns.values():
+                        column[row] = column[last]
+                self._ids.pop()
+                for column in self._columns.values():
+                    column.pop()
+                self._n = last
+            self._changed()
+
+    def set_payload(self, body, overwrite=False):
+        with self.lock:
+            for row in self.select(body):
+                self._set_payload(row, body["payload"], overwrite)
+            self._changed()
+
+    def delete_payload(self, body):
+        with self.lock:
+            for row in self.select(body):
+                for key in body.get("keys", []):
+                    if key in self._columns:
+                        self._columns[key][row] = _MISSING
+            self._changed()
+
+    def create_index(self, field, schema):
+        with self.lock:
+            self.indexes[field] = schema
+            self.dirty = True
+
+    # ─── Filters ─────────────────────────────────────────
+
+    def _mask(self, flt):
+        """bool[n] of rows matching a Qdrant filter, cached until the next write"""
+        if not flt:
+            return np.ones(self._n, dtype=bool)
+        key = json.dumps(flt, sort_keys=True)
+        mask = self._masks.get(key)
+        if mask is None:
+            if len(self._masks) >= MASK_CACHE_SIZE:
+                self._masks.clear()
+            mask = self._masks[key] = self._filter_mask(flt)
+        return mask
+
+    def _filter_mask(self, flt):
+        mask = np.ones(self._n, dtype=bool)
+        for cond in _as_list(flt.get("must")):
+            mask &= self._condition_mask(cond)
+        for cond in _as_list(flt.get("must_not")):
+            mask &= ~self._condition_mask(cond)
+        should = _as_list(flt.get("should"))
+        if should:
+            mask &= np.logical_or.reduce([self._condition_mask(cond) for cond in should])
+        return mask
+
+    def _condition_mask(self, cond):
+        if "has_id" in cond:
+            mask = np.zeros(self._n, dtype=bool)
+            mask[[self._rows[pid] for pid in cond["has_id"] if pid in self._rows]] = True
+            return mask
+        if any(k in cond for k in ("must", "should", "must_not")):
+            return self._filter_mask(cond)
+        if "filter" in cond:
+            return self._filter_mask(cond["filter"])
+        # Field condition: evaluated over that one payload column
+        key = cond.get("key") or (cond.get("is_empty") or cond.get("is_null") or {}).get("key", "")
+        field = key.split(".", 1)[0]
+        single = {"must": [cond]}
+        column = self._columns.get(field)
+        if column is None:
+            return np.full(self._n, matches({"id": None, "payload": {}}, single), dtype=bool)
+        return np.fromiter((matches({"id": None, "payload": {} if v is _MISSING else {field: v}}, single)
+                            for v in column[:self._n]), dtype=bool, count=self._n)
+
+    # ─── Reads ───────────────────────────────────────────
+
+    def _point(self, row):
+        payload = {field: column[row] for field, column in self._columns.items() if column[row] is not _MISSING}
+        return {"id": self._ids[row], "vector": self._matrix[row].copy(), "payload": payload}
+
+    def __len__(self):
+        return self._n
+
+    def get(self, pid):
+        with self.lock:
+            row = self._rows.get(pid)
+            return None if row is None else self._point(row)
+
+    def retrieve(self, ids):
+        with self.lock:
+            return [self._point(self._rows[pid]) for pid in ids if pid in self._rows]
+
+    def count(self, flt=None):
+        with self.lock:
+            return int(self._mask(flt).sum())
+
+    def scroll(self, flt=None, offset=None, limit=10):
+        """(page, next_page_offset) in id order"""
+        def order(pid):
+            return isinstance(pid, str), pid
+
+        with self.lock:
+            rows = sorted(np.flatnonzero(self._mask(flt)).tolist(), key=lambda row: order(self._ids[row]))
+            if offset is not None:
+                rows = [row for row in rows if order(self._ids[row]) >= order(offset)]
+            page = [self._point(row) for row in rows[:limit]]
+            return page, self._ids[rows[limit]] if len(rows) > limit else None
+
+    def search(self, vector, flt=None, limit=10, offset=0, score_threshold=None):
+        """[(score, point)] best first"""
+        query = self._prepare([vector])[0]
+        with self.lock:
+            if self._n == 0:
+                return []
+            sims = self._matrix[:self._n] @ query
+            mask = self._mask(flt)
+            if score_threshold is not None:
+                mask = mask & (sims >= score_threshold)
+            rows = np.flatnonzero(mask)
+            k = offset + limit
+            if len(rows) > k:
+                rows = rows[np.argpartition(-sims[rows], k - 1)[:k]]
+            rows = rows[np.argsort(-sims[rows], kind="stable")][offset:k]
+            return [(float(sims[row]), self._point(row)) for row in rows]
+
+    def info(self):
+        with self.lock:
+            count = self._n
+            schema = {field: {"data_type": kind,
+                              "points": sum(1 for v in self._columns.get(field, ()) if v is not _MISSING)}
+                      for field, kind in self.indexes.items()}
+        return {
+            "status": "green",
+            "optimizer_status": "ok",
+            "vectors_count": count,
+            "indexed_vectors_count": count,
+            "points_count": count,
+            "segments_count": 1,
+            "config": {
+                "params": {"vectors": {"size": self.size, "distance": self.distance},
+                           "shard_number": 1, "replication_factor": 1,
+                           "on_disk_payload": self.on_disk_payload},
+                "hnsw_config": {"m": 0, "ef_construct": 0, "full_scan_threshold": 0},
+                "optimizer_config": {}, "wal_config": {},
+            },
+            "payload_schema": schema,
+        }
+
+
+class VectorStoreServer(QdrantStandin):
+    """
+    Qdrant REST API over VectorStore collections persisted under `path`.
+    Changed collections are snapshotted every `snapshot_every` seconds, on
+    POST /collections/{name}/snapshots and on stop.
+    """
+
+    name = "vector-store"
+
+    def __init__(self, host="127.0.0.1", port=6333, path=".cache/vector-store", snapshot_every=2.0,
+                 api_key=None):
+        super().__init__(host, port, api_key=api_key)
+        self.path = Path(path)
+        self.snapshot_every = snapshot_every
+        self._stop = threading.Event()
+        self._saver = None
+        for file in sorted(self.path.glob(f"*{SNAPSHOT_SUFFIX}")):
+            store = VectorStore.load(file)
+            self.collections[store.name] = store
+        self.route("POST", "/collections/{name}/snapshots", "snapshot", self.snapshot)
+
+    def _file(self, name):
+        return self.path / f"{name}{SNAPSHOT_SUFFIX}"
+
+    def new_collection(self, name, size, distance, on_disk_payload):
+        store = VectorStore(name, size, distance, on_disk_payload, path=self._file(name))
+        store.dirty = True
+        return store
+
+    def dropped(self, collection):
+        if collection is None or collection.path is None:
+            return
+        with collection.lock:
+            # A mapped file cannot be deleted on Windows — release the mapping first
+            collection._matrix = np.empty((0, collection.size), dtype=np.float32)
+            collection._n = 0
+            try:
+                collection.path.unlink(missing_ok=True)
+            except OSError as e:
+                raise HttpError(500, self.error_body(f"Could not delete snapshot {collection.path.name}: {e}"))
+
+    def _save_live(self, store, force=False):
+        """Save `store` unless it was dropped meanwhile (which would bring its file back)"""
+        with store.lock:
+            with self._collections_lock:
+                live = self.collections.get(store.name) is store
+            if live and (force or store.dirty):
+                return store.save()
+        return None
+
+    def snapshot(self, request):
+        path = self._save_live(self._collection(request), force=True)
+        if path is None:
+            raise HttpError(404, self.error_body(f"Not found: Collection `{request.params['name']}` doesn't exist!"))
+        return self.ok({"name": path.name, "size": path.stat().st_size})
+
+    def save_all(self):
+        with self._collections_lock:
+            stores = list(self.collections.values())
+        for store in stores:
+            self._save_live(store)
+
+    def _save_loop(self):
+        while not self._stop.wait(self.snapshot_every):
+            try:
+                self.save_all()
+            except OSError as e:
+                print(f"⚠️  Snapshot failed: {e}", flush=True)
+
+    def start(self):
+        super().start()
+        self._stop.clear()
+        self._saver = threading.Thread(target=self._save_loop, name="vector-store-snapshots", daemon=True)
+        self._saver.start()
+        return self
+
+    def stop(self):
+        super().stop()
+        self._stop.set()
+        if self._saver is not None:
+            self._saver.join()
+            self._saver = None
+        self.save_all()
+
+
+def main(argv=None):
+    from akrizu_stack.ingest import AKRIZU_DIR, load_config
+
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Serve the embedded vector store on the Qdrant REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=urlparse(config["qdrant_url"]).port or 6333)
+    parser.add_argument("--path", default=str(config["vector_store_path"]),
+                        help=f"Snapshot directory (relative paths resolve against {AKRIZU_DIR.name}/)")
+    parser.add_argument("--snapshot-every", type=float, default=2.0, help="Seconds between snapshots of changes")
+    args = parser.parse_args(argv)
+
+    path = Path(args.path)
+    server = VectorStoreServer(args.host, args.port, path if path.is_absolute() else AKRIZU_DIR / path,
+                               args.snapshot_every, api_key=config["qdrant_api_key"] or None).start()
+    for name, store in sorted(server.collections.items()):
+        print(f"📦 {name}: {len(store)} points ({store.size}-dim)", flush=True)
+    print(f"🧠 Vector store listening on {server.url} ({server.path})", flush=True)
+    print("Vector store ready (Ctrl+C to stop)", flush=True)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
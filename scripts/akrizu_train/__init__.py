@@ -0,0 +1,4 @@
+"""
+Akrizu Train — data preparation and benchmarking for scripts/colab-train.py
+Upload this folder next to colab-train.py when running on Colab.
+"""
@@ -0,0 +1,265 @@
+"""
+Akrizu Train — Offline Throughput Benchmark
+Runs the colab-train.py data path (streaming → token cache → plain/bucket/pack
+batching → collator) on CPU and trains a tiny stand-in Llama for a few steps,
+so regressions in formatting, packing or collation show up on a plain Linux
+box before any Colab time is spent.
+
+Measures tokenization throughput, collation time per batch, optimizer step
+time, real tokens per second and peak RSS, and writes a JSON report.
+
+Usage:
+  python -m akrizu_train.bench                        # byte-level tokenizer, all modes
+  python -m akrizu_train.bench --tokenizer unsloth/llama-3-8b-bnb-4bit --mode pack
+  python -m akrizu_train.bench --baseline bench-report.json   # exit 1 on regression
+
+Requires torch (CPU build) and transformers.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from akrizu_train.dataset import build_token_cache
+from akrizu_train.packing import (IGNORE_INDEX, batch_report, bucket_batches, packed_rows, pack_lengths,
+                                  random_batches)
+
+AGENT_DIR = Path(__file__).resolve().parents[2] / ".agent"
+DEFAULT_DATA = [AGENT_DIR / "fine-tuning-file.json", AGENT_DIR / "finetune-draft.jsonl"]
+MODES = ("plain", "bucket", "pack")
+
+# Metrics where lower is better; everything else compared is higher-is-better
+LOWER_IS_BETTER = {"collate_ms_per_batch", "step_ms_p50"}
+
+
+def byte_tokenizer():
+    """Download-free byte-level tokenizer with BOS/EOS/PAD, as a real PreTrainedTokenizerFast"""
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast
+
+    alphabet = pre_tokenizers.ByteLevel.alphabet()
+    vocab = {"<pad>": 0, "<s>": 1, "</s>": 2}
+    vocab.update({ch: i + 3 for i, ch in enumerate(sorted(alphabet))})
+    tok = Tokenizer(models.BPE(vocab=vocab, merges=[]))
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False, use_regex=False)
+    tok.decoder = decoders.ByteLevel()
+    tok.post_processor = processors.TemplateProcessing(single="<s> $A", special_tokens=[("<s>", 1)])
+    fast = PreTrainedTokenizerFast(tokenizer_object=tok, bos_token="<s>", eos_token="</s>",
+                                   pad_token="<pad>")
+    fast.name_or_path = "byte-level"
+    return fast
+
+
+def load_tokenizer(name):
+    if name == "bytes":
+        return byte_tokenizer()
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    return tokenizer
+
+
+def tiny_model(vocab_size, max_seq_length, hidden=64, layers=2, heads=4):
+    """Llama-architecture stand-in small enough to step quickly on CPU"""
+    from transformers import LlamaConfig, LlamaForCausalLM
+    config = LlamaConfig(vocab_size=vocab_size, hidden_size=hidden, intermediate_size=hidden * 4,
+                         num_hidden_layers=layers, num_attention_heads=heads,
+                         num_key_value_heads=heads, max_position_embeddings=max_seq_length)
+    return LlamaForCausalLM(config)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def mode_batches(cache, mode, batch_size, max_seq_length, pad_token_id):
+    """Materialize the feature dicts each micro-batch hands to the collator"""
+    if mode == "pack":
+        rows = list(packed_rows(cache, max_seq_length, pad_token_id,
+                                pack_lengths(cache.lengths, max_seq_length)))
+        return [rows[j:j + batch_size] for j in range(0, len(rows), batch_size)]
+    picker = bucket_batches if mode == "bucket" else random_batches
+    return [[{"input_ids": cache[i].tolist()} for i in b] for b in picker(cache.lengths, batch_size)]
+
+
+def real_tokens(features):
+    """Non-padding tokens of one micro-batch; packed rows have no attention_mask, so use their labels"""
+    total = 0
+    for f in features:
+        labels = f.get("labels")
+        if labels is None:
+            total += len(f["input_ids"])
+        else:
+            total += max((i + 1 for i, label in enumerate(labels) if label != IGNORE_INDEX), default=0)
+    return total
+
+
+def bench_mode(cache, tokenizer, mode, args):
+    import torch
+    from transformers import DataCollatorForLanguageModeling, default_data_collator
+
+    collator = (default_data_collator if mode == "pack"
+                else DataCollatorForLanguageModeling(tokenizer=tokenizer, mlm=False))
+    batches = mode_batches(cache, mode, args.batch_size, args.max_seq_length, tokenizer.pad_token_id)
+
+    start = time.perf_counter()
+    collated = [collator(b) for b in batches]
+    collate_s = time.perf_counter() - start
+    batch_tokens = [real_tokens(b) for b in batches]
+
+    torch.manual_seed(3407)
+    model = tiny_model(len(tokenizer), args.max_seq_length)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=2e-4)
+    model.train()
+
+    step_times, tokens = [], 0
+    # One extra untimed warm-up step. The CPU model runs eager/sdpa attention, so packed
+    # examples see each other here; that changes the loss, not the step cost being measured.
+    for step in range(args.steps + 1):
+        batch = collated[step % len(collated)]
+        t0 = time.perf_counter()
+        loss = model(**batch).loss
+        loss.backward()
+        optimizer.step()
+        optimizer.zero_grad(set_to_none=True)
+        if step:
+            step_times.append(time.perf_counter() - t0)
+            tokens += batch_tokens[step % len(collated)]
+
+    report = batch_report(cache.lengths, mode, args.batch_size, args.max_seq_length, args.grad_accum)
+    report.update({
+        "collate_ms_per_batch": round(collate_s * 1000 / len(batches), 3),
+        "steps_timed": len(step_times),
+        "step_ms_p50": round(statistics.median(step_times) * 1000, 2),
+        "step_ms_mean": round(statistics.fmean(step_times) * 1000, 2),
+        "tokens_per_s": round(tokens / sum(step_times), 1),
+        "final_loss": round(float(loss), 4),
+    })
+    return report
+
+
+def run(args):
+    import torch
+    torch.set_num_threads(args.threads or torch.get_num_threads())
+    tokenizer = load_tokenizer(args.tokenizer)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = args.cache_dir or tmp
+        start = time.perf_counter()
+        cache = build_token_cache(args.data, tokenizer, args.max_seq_length, cache_dir,
+                                  log=lambda message: None)
+        tokenize_s = time.perf_counter() - start
+        lengths = cache.lengths
+
+        report = {
+            "env": {
+                "python": platform.python_version(),
+                "torch": torch.__version__,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "threads": torch.get_num_threads(),
+            },
+            "config": {
+                "data": [str(p) for p in args.data],
+                "tokenizer": args.tokenizer,
+                "max_seq_length": args.max_seq_length,
+                "batch_size": args.batch_size,
+                "grad_accum": args.grad_accum,
+                "steps": args.steps,
+            },
+            "tokenization": {
+                "examples": len(cache),
+                "tokens": cache.num_tokens,
+                "seconds": round(tokenize_s, 3),
+                "examples_per_s": round(len(cache) / tokenize_s, 1),
+                "tokens_per_s": round(cache.num_tokens / tokenize_s, 1),
+                "mean_length": round(float(lengths.mean()), 1) if len(cache) else 0,
+                "max_length": int(lengths.max()) if len(cache) else 0,
+            },
+            "modes": {},
+        }
+        for mode in (MODES if args.mode == "all" else (args.mode,)):
+            report["modes"][mode] = bench_mode(cache, tokenizer, mode, args)
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """List of regressions beyond `tolerance` (fractional) against a previous report"""
+    regressions = []
+    pairs = [("tokenization.tokens_per_s", report["tokenization"]["tokens_per_s"],
+              baseline.get("tokenization", {}).get("tokens_per_s"))]
+    for mode, stats in report["modes"].items():
+        base = baseline.get("modes", {}).get(mode, {})
+        for metric in ("tokens_per_s", "collate_ms_per_batch", "step_ms_p50"):
+            pairs.append((f"{mode}.{metric}", stats[metric], base.get(metric)))
+    for name, value, base in pairs:
+        if not base:
+            continue
+        change = (value - base) / base
+        worse = change > tolerance if name.split(".")[-1] in LOWER_IS_BETTER else change < -tolerance
+        if worse:
+            regressions.append(f"{name}: {base} → {value} ({change * 100:+.1f}%)")
+    return regressions
+
+
+def print_summary(report):
+    tok = report["tokenization"]
+    print(f"🔤 Tokenization: {tok['examples']} examples, {tok['tokens']} tokens "
+          f"({tok['tokens_per_s']:.0f} tok/s)")
+    for mode, stats in report["modes"].items():
+        print(f"   {mode:>6}: collate {stats['collate_ms_per_batch']:.2f} ms/batch, "
+              f"step p50 {stats['step_ms_p50']:.1f} ms, {stats['tokens_per_s']:.0f} tok/s, "
+              f"padding {stats['padding_ratio'] * 100:.1f}%")
+    if report["peak_rss_mb"] is not None:
+        print(f"📈 Peak RSS: {report['peak_rss_mb']} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPU benchmark of the fine-tuning data path")
+    parser.add_argument("data", nargs="*", default=[str(p) for p in DEFAULT_DATA if p.exists()])
+    parser.add_argument("--tokenizer", default="bytes", help="'bytes' or a Hugging Face tokenizer name")
+    parser.add_argument("--mode", choices=MODES + ("all",), default="all")
+    parser.add_argument("--max-seq-length", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--grad-accum", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--cache-dir", default=None, help="Reuse a token cache (measures cache hits)")
+    parser.add_argument("--out", default="bench-report.json")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print_summary(report)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"📝 Report written to {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"❌ Regression {line}")
+        if regressions:
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
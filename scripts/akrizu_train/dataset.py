@@ -0,0 +1,273 @@
+"""
+Akrizu Train — Dataset Preparation
+Streams JSON/JSONL instruction pairs record by record, formats them with the
+Alpaca template, tokenizes in parallel batches and writes a memory-mapped
+token cache keyed by a content hash of (data, template, tokenizer, max length).
+Re-runs and hyperparameter sweeps load the cache and skip preprocessing.
+
+Usage (CLI, prebuild the cache):
+  python -m akrizu_train.dataset ../.agent/fine-tuning-file.json ../.agent/finetune-draft.jsonl \
+      --tokenizer unsloth/llama-3-8b-bnb-4bit --cache-dir token_cache
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Instruction Prompt Template (Standard Alpaca format)
+ALPACA_PROMPT = """Below is an instruction that describes a task, paired with an input that provides further context. Write a response that appropriately completes the request.
+
+### Instruction:
+{}
+
+### Input:
+{}
+
+### Response:
+{}"""
+
+CACHE_VERSION = 1
+READ_CHUNK = 64 * 1024
+
+
+# ─── Streaming readers ───────────────────────────────────
+
+def iter_json_records(path):
+    """Yield records from a JSON array or a JSONL file without loading it whole"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(READ_CHUNK)
+        pos = len(buf) - len(buf.lstrip())
+        if buf[pos:pos + 1] != "[":
+            # JSONL: one record per line
+            f.seek(0)
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        pos += 1
+        eof = False
+        while True:
+            # Skip separators between array items
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                more = f.read(READ_CHUNK)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+            if pos >= len(buf):
+                raise ValueError(f"{path}: unterminated JSON array")
+            if buf[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(READ_CHUNK)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield record
+            buf, pos = buf[end:], 0
+
+
+def iter_records(paths):
+    for path in paths:
+        yield from iter_json_records(path)
+
+
+def format_record(record, eos_token, template=ALPACA_PROMPT):
+    return template.format(record.get("instruction", ""), record.get("input", ""),
+                           record.get("output", "")) + eos_token
+
+
+# ─── Cache key ───────────────────────────────────────────
+
+def tokenizer_fingerprint(tokenizer):
+    """
+    Hash of the tokenizer definition (fast tokenizers) or its vocab. The
+    backend's truncation/padding state is left out: tokenizing sets it, so
+    it would change the key between two builds of the same data.
+    """
+    h = hashlib.sha256()
+    h.update(str(getattr(tokenizer, "name_or_path", "")).encode())
+    h.update(str(getattr(tokenizer, "eos_token", "")).encode())
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        definition = json.loads(backend.to_str())
+        definition.pop("truncation", None)
+        definition.pop("padding", None)
+        h.update(json.dumps(definition, sort_keys=True).encode())
+    elif hasattr(tokenizer, "get_vocab"):
+        h.update(json.dumps(sorted(tokenizer.get_vocab().items())).encode())
+    return h.hexdigest()
+
+
+def cache_key(paths, tokenizer, max_seq_length, template=ALPACA_PROMPT):
+    h = hashlib.sha256(f"v{CACHE_VERSION}|{max_seq_length}|".encode())
+    h.update(template.encode())
+    h.update(tokenizer_fingerprint(tokenizer).encode())
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()[:24]
+
+
+# ─── Token cache ─────────────────────────────────────────
+
+class TokenCache:
+    """
+    Memory-mapped token store: tokens.bin (int32, all examples back to back),
+    offsets.bin (int64, n + 1) and meta.json.
+    """
+
+    def __init__(self, path):
+        import numpy as np
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.offsets = np.fromfile(self.path / "offsets.bin", dtype=np.int64)
+        n_tokens = int(self.offsets[-1]) if len(self.offsets) else 0
+        self.tokens = (np.memmap(self.path / "tokens.bin", dtype=np.int32, mode="r", shape=(n_tokens,))
+                       if n_tokens else np.zeros(0, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def lengths(self):
+        return self.offsets[1:] - self.offsets[:-1]
+
+    @property
+    def num_tokens(self):
+        return int(self.offsets[-1])
+
+
+def _tokenize_batch(tokenizer, texts, max_seq_length):
+    # Same call SFTTrainer makes when it tokenizes dataset_text_field itself
+    return tokenizer(texts, add_special_tokens=True, truncation=True, padding=False,
+                     max_length=max_seq_length)["input_ids"]
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_token_cache(paths, tokenizer, max_seq_length=2048, cache_dir="token_cache",
+                      template=ALPACA_PROMPT, batch_size=256, num_workers=None, log=print):
+    """Return a TokenCache for `paths`, building it only if the content hash is new"""
+    paths = [str(p) for p in paths]
+    key = cache_key(paths, tokenizer, max_seq_length, template)
+    target = Path(cache_dir) / key
+    if (target / "meta.json").exists():
+        cache = TokenCache(target)
+        log(f"📦 Token cache hit {key}: {len(cache)} examples, {cache.num_tokens} tokens")
+        return cache
+
+    start = time.perf_counter()
+    tmp = Path(cache_dir) / f".{key}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    eos = tokenizer.eos_token or ""
+    texts = (format_record(r, eos, template) for r in iter_records(paths))
+    offsets = array("q", [0])
+    workers = num_workers or min(8, os.cpu_count() or 1)
+
+    with open(tmp / "tokens.bin", "wb") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        # Fast tokenizers release the GIL, so batches tokenize in parallel threads;
+        # map() keeps results in input order
+        batches = pool.map(lambda b: _tokenize_batch(tokenizer, b, max_seq_length),
+                           _batched(texts, batch_size))
+        for ids_batch in batches:
+            for ids in ids_batch:
+                array("i", ids).tofile(out)
+                offsets.append(offsets[-1] + len(ids))
+
+    with open(tmp / "offsets.bin", "wb") as f:
+        offsets.tofile(f)
+    meta = {
+        "version": CACHE_VERSION,
+        "key": key,
+        "sources": paths,
+        "examples": len(offsets) - 1,
+        "tokens": offsets[-1],
+        "max_seq_length": max_seq_length,
+        "tokenizer": str(getattr(tokenizer, "name_or_path", "")),
+        "eos_token_id": getattr(tokenizer, "eos_token_id", None),
+        "build_seconds": round(time.perf_counter() - start, 3),
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # Another run finished the same key first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    cache = TokenCache(target)
+    log(f"🔨 Built token cache {key}: {len(cache)} examples, {cache.num_tokens} tokens "
+        f"in {meta['build_seconds']}s")
+    return cache
+
+
+def to_hf_dataset(cache, with_length=False):
+    """
+    Pre-tokenized `datasets.Dataset` (input_ids + attention_mask) for SFTTrainer.
+    The Arrow file lives inside the cache directory and is memory-mapped.
+    with_length adds the "length" column read by group_by_length.
+    """
+    from datasets import Dataset
+
+    def rows(path, with_length):
+        store = TokenCache(path)
+        for i in range(len(store)):
+            ids = store[i].tolist()
+            row = {"input_ids": ids, "attention_mask": [1] * len(ids)}
+            if with_length:
+                row["length"] = len(ids)
+            yield row
+
+    return Dataset.from_generator(rows, gen_kwargs={"path": str(cache.path), "with_length": with_length},
+                                  cache_dir=str(cache.path / "arrow"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the fine-tuning token cache")
+    parser.add_argument("data", nargs="+", help="JSON array or JSONL files")
+    parser.add_argument("--tokenizer", required=True)
+    parser.add_argument("--max-seq-length", type=int, default=2048)
+    parser.add_argument("--cache-dir", default="token_cache")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+    build_token_cache(args.data, tokenizer, args.max_seq_length, args.cache_dir,
+                      batch_size=args.batch_size, num_workers=args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,248 @@
+"""
+Akrizu Train — Deduplication & Near-Duplicate Index
+Merges fine-tuning sources (JSON arrays / JSONL) into one canonical, sorted
+JSONL file, dropping exact duplicates (normalized instruction/input/output
+hash) and near duplicates (MinHash over word shingles, LSH banding, verified
+against the estimated Jaccard similarity).
+
+Runs in one streaming pass: memory holds only the per-record hash and
+signature, and the sorted output is produced with an external merge sort.
+The index is persisted, so signatures of records seen before are reused and
+incremental additions only pay for the new records.
+
+Usage:
+  python -m akrizu_train.dedup ../.agent/fine-tuning-file.json ../.agent/finetune-draft.jsonl \
+      --out ../.agent/finetune-merged.jsonl
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from akrizu_train.dataset import iter_json_records
+
+FIELDS = ("instruction", "input", "output")
+NUM_PERM = 64
+BANDS = 16            # 16 bands × 4 rows: candidate pairs from ~0.5 Jaccard upwards
+SHINGLE = 3           # word n-gram size
+THRESHOLD = 0.85      # estimated Jaccard at or above this is a near duplicate
+SEED = 3407
+INDEX_VERSION = 1
+
+_MERSENNE = (1 << 61) - 1
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(text):
+    return " ".join(str(text or "").lower().split())
+
+
+def exact_key(record):
+    """sha1 over the normalized fields; identical pairs modulo case/whitespace collide"""
+    joined = "\x1f".join(normalize(record.get(field, "")) for field in FIELDS)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+class MinHasher:
+    """MinHash signatures over word shingles of all fields"""
+
+    def __init__(self, num_perm=NUM_PERM, shingle=SHINGLE, seed=SEED):
+        import numpy as np
+        self.np = np
+        self.num_perm = num_perm
+        self.shingle = shingle
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, record):
+        words = _WORD.findall(" ".join(normalize(record.get(field, "")) for field in FIELDS))
+        if len(words) < self.shingle:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + self.shingle]) for i in range(len(words) - self.shingle + 1)}
+
+    def signature(self, record):
+        np = self.np
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+             for s in self.shingles(record)),
+            dtype=np.uint64,
+        )
+        # (a·x + b) mod p stays below 2^64: a, b < 2^31 and x < 2^32
+        permuted = (np.outer(hashes, self.a) + self.b) % _MERSENNE
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class DedupIndex:
+    """Exact-hash set plus MinHash signatures and LSH band buckets of kept records"""
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.keys = []            # exact key of each kept record, in insertion order
+        self.signatures = []      # parallel list of uint32[num_perm]
+        self.kept = {}            # exact key → position
+        self.buckets = {}         # (band, band hash) → [positions]
+        self.known = {}           # exact key → signature from a previous run
+
+    def _band_keys(self, sig):
+        for band in range(self.bands):
+            chunk = sig[band * self.rows:(band + 1) * self.rows]
+            yield band, hash(chunk.tobytes())
+
+    def near_duplicate_of(self, sig):
+        """Position of a kept record whose estimated Jaccard ≥ threshold, else None"""
+        seen = set()
+        for band_key in self._band_keys(sig):
+            for pos in self.buckets.get(band_key, ()):
+                if pos in seen:
+                    continue
+                seen.add(pos)
+                if (self.signatures[pos] == sig).mean() >= self.threshold:
+                    return pos
+        return None
+
+    def add(self, record):
+        """Classify a record: ('exact'|'near'|'new', key)"""
+        key = exact_key(record)
+        if key in self.kept:
+            return "exact", key
+        sig = self.known.get(key)
+        if sig is None:
+            sig = self.hasher.signature(record)
+        if self.near_duplicate_of(sig) is not None:
+            return "near", key
+        pos = len(self.keys)
+        self.keys.append(key)
+        self.signatures.append(sig)
+        self.kept[key] = pos
+        for band_key in self._band_keys(sig):
+            self.buckets.setdefault(band_key, []).append(pos)
+        return "new", key
+
+    def save(self, path):
+        np = self.hasher.np
+        tmp = Path(f"{path}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                version=np.array(INDEX_VERSION),
+                num_perm=np.array(self.num_perm),
+                keys=np.array(self.keys, dtype="S40"),
+                signatures=(np.stack(self.signatures) if self.signatures
+                            else np.zeros((0, self.num_perm), dtype=np.uint32)),
+            )
+        os.replace(tmp, path)
+
+    def load_known(self, path):
+        """Reuse signatures from a previous run (ignored if parameters changed)"""
+        np = self.hasher.np
+        try:
+            data = np.load(path)
+        except (OSError, ValueError):
+            return 0
+        if int(data["version"]) != INDEX_VERSION or int(data["num_perm"]) != self.num_perm:
+            return 0
+        self.known = {k.decode(): sig for k, sig in zip(data["keys"], data["signatures"])}
+        return len(self.known)
+
+
+def sort_key(record, key):
+    return [normalize(record.get("instruction", "")), key]
+
+
+def _write_run(items, directory):
+    items.sort(key=lambda item: item[0])
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    return path
+
+
+def _read_run(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def dedup_files(sources, out_path, index_path=None, threshold=THRESHOLD, run_size=10000, log=print):
+    """
+    Merge `sources` into `out_path` as sorted, deduplicated JSONL.
+    Returns a stats dict.
+    """
+    start = time.perf_counter()
+    out_path = Path(out_path)
+    index = DedupIndex(threshold=threshold)
+    reused = index.load_known(index_path) if index_path else 0
+    stats = {"sources": [str(s) for s in sources], "records": 0, "exact": 0, "near": 0, "kept": 0,
+             "signatures_reused": 0}
+
+    workdir = tempfile.mkdtemp(prefix="dedup-", dir=out_path.parent)
+    runs, pending = [], []
+    try:
+        for source in sources:
+            for record in iter_json_records(source):
+                stats["records"] += 1
+                record = {field: record.get(field, "") for field in FIELDS}
+                verdict, key = index.add(record)
+                if verdict != "new":
+                    stats[verdict] += 1
+                    continue
+                stats["kept"] += 1
+                stats["signatures_reused"] += key in index.known
+                pending.append([sort_key(record, key), record])
+                if len(pending) >= run_size:
+                    runs.append(_write_run(pending, workdir))
+                    pending = []
+        if pending:
+            runs.append(_write_run(pending, workdir))
+
+        tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as out:
+            merged = heapq.merge(*(_read_run(p) for p in runs), key=lambda item: item[0])
+            for _, record in merged:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp, out_path)
+    finally:
+        for path in runs:
+            os.remove(path)
+        os.rmdir(workdir)
+
+    if index_path:
+        index.save(index_path)
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    log(f"🧹 Dedup: {stats['records']} records → {stats['kept']} kept "
+        f"({stats['exact']} exact, {stats['near']} near duplicates, "
+        f"{reused and stats['signatures_reused']} signatures reused) in {stats['seconds']}s")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge and deduplicate fine-tuning data")
+    parser.add_argument("sources", nargs="+", help="JSON array or JSONL files, in priority order")
+    parser.add_argument("--out", required=True, help="Canonical sorted JSONL output")
+    parser.add_argument("--index", default=None, help="Index file (default: <out>.index.npz)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--run-size", type=int, default=10000, help="Records per external-sort run")
+    args = parser.parse_args(argv)
+
+    index = args.index or f"{args.out}.index.npz"
+    stats = dedup_files(args.sources, args.out, index, args.threshold, args.run_size)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
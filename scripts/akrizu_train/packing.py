@@ -0,0 +1,167 @@
+"""
+Akrizu Train — Sequence Packing & Length Bucketing
+Two ways to stop paying for padding on short instruction pairs:
+
+  pack    Concatenate EOS-terminated examples into full max_seq_length rows.
+          Rows carry no attention_mask and position_ids restart at 0 for every
+          example (and for the padding tail), the padding-free format of
+          transformers' DataCollatorWithFlattening: flash-attention-2 turns
+          the restarts into varlen boundaries, so attention stays inside each
+          example. Other attention backends (xformers, sdpa, eager) ignore
+          them and would let packed examples attend to each other, so only
+          pack when varlen_attention(model) is true. The first token of every
+          example is not a label, so nothing is learned across the boundary.
+  bucket  Keep one example per row but batch examples of similar length
+          (TrainingArguments.group_by_length), padding only to the batch max.
+
+batch_report() gives the effective tokens-per-step and padding ratio for any
+of the modes so they can be compared before spending GPU time.
+"""
+
+import bisect
+import random
+
+IGNORE_INDEX = -100
+
+
+# ─── Packing ─────────────────────────────────────────────
+
+def varlen_attention(model):
+    """True when the model runs flash-attention-2, the only backend that honours packed position_ids"""
+    config = getattr(model, "config", None)
+    return getattr(config, "_attn_implementation", None) == "flash_attention_2"
+
+
+def pack_lengths(lengths, max_seq_length):
+    """
+    Best-fit-decreasing bin packing: examples, longest first, go into the
+    open bin with the least room that still fits them. Returns a list of
+    bins, each a list of example indices whose total length fits in
+    max_seq_length. Examples longer than max_seq_length get a bin of their
+    own (they are already truncated by the tokenizer, so this only happens
+    with a smaller limit).
+    """
+    order = sorted(range(len(lengths)), key=lambda i: -int(lengths[i]))
+    bins = []
+    # Sorted (remaining capacity, bin index) pairs for O(log n) best fit
+    free = []
+    for i in order:
+        size = int(lengths[i])
+        pos = bisect.bisect_left(free, (size, -1))
+        if pos < len(free):
+            remaining, b = free.pop(pos)
+            bins[b].append(i)
+            remaining -= size
+        else:
+            b = len(bins)
+            bins.append([i])
+            remaining = max_seq_length - size
+        if remaining > 0:
+            bisect.insort(free, (remaining, b))
+    return bins
+
+
+def packed_rows(cache, max_seq_length, pad_token_id, bins=None):
+    """
+    Yield fixed-length packed rows (input_ids, position_ids, labels). There
+    is deliberately no attention_mask: with one, transformers' flash-attention
+    path unpads by the mask and drops the example boundaries.
+    """
+    bins = bins if bins is not None else pack_lengths(cache.lengths, max_seq_length)
+    for members in bins:
+        input_ids, position_ids, labels = [], [], []
+        for i in members:
+            ids = cache[i].tolist()[:max_seq_length - len(input_ids)]
+            if not ids:
+                break
+            input_ids += ids
+            position_ids += range(len(ids))
+            labels += [IGNORE_INDEX] + ids[1:]
+        pad = max_seq_length - len(input_ids)
+        yield {
+            "input_ids": input_ids + [pad_token_id] * pad,
+            "position_ids": position_ids + list(range(pad)),
+            "labels": labels + [IGNORE_INDEX] * pad,
+        }
+
+
+def packed_hf_dataset(cache, max_seq_length, pad_token_id):
+    """Packed rows as an Arrow-backed `datasets.Dataset` stored next to the token cache"""
+    from datasets import Dataset
+    from akrizu_train.dataset import TokenCache
+
+    def rows(path, max_seq_length, pad_token_id):
+        yield from packed_rows(TokenCache(path), max_seq_length, pad_token_id)
+
+    return Dataset.from_generator(
+        rows,
+        gen_kwargs={"path": str(cache.path), "max_seq_length": max_seq_length,
+                    "pad_token_id": pad_token_id},
+        cache_dir=str(cache.path / "arrow"),
+    )
+
+
+# ─── Length bucketing ────────────────────────────────────
+
+def bucket_batches(lengths, batch_size, mega_batch_mult=50, seed=3407):
+    """
+    Batches of example indices grouped by length, mirroring transformers'
+    LengthGroupedSampler: shuffle, split into mega-batches, sort each by
+    length and cut into batches. Used for reporting; training sets
+    group_by_length=True and lets the Trainer build the same sampler.
+    """
+    indices = list(range(len(lengths)))
+    random.Random(seed).shuffle(indices)
+    mega = mega_batch_mult * batch_size
+    batches = []
+    for start in range(0, len(indices), mega):
+        group = sorted(indices[start:start + mega], key=lambda i: -int(lengths[i]))
+        batches += [group[j:j + batch_size] for j in range(0, len(group), batch_size)]
+    return batches
+
+
+def random_batches(lengths, batch_size, seed=3407):
+    """Plain shuffled batches (the default sampler), for comparison"""
+    indices = list(range(len(lengths)))
+    random.Random(seed).shuffle(indices)
+    return [indices[j:j + batch_size] for j in range(0, len(indices), batch_size)]
+
+
+# ─── Reporting ───────────────────────────────────────────
+
+def batch_report(lengths, mode, batch_size, max_seq_length, grad_accum=1):
+    """
+    Effective tokens per optimizer step and padding ratio for `mode`
+    ('plain', 'bucket' or 'pack') over one epoch.
+    """
+    lengths = [int(n) for n in lengths]
+    if mode == "pack":
+        bins = pack_lengths(lengths, max_seq_length)
+        rows = [min(sum(lengths[i] for i in b), max_seq_length) for b in bins]
+        batches = [rows[j:j + batch_size] for j in range(0, len(rows), batch_size)]
+        padded = sum(len(b) * max_seq_length for b in batches)
+    else:
+        picker = bucket_batches if mode == "bucket" else random_batches
+        batches = [[lengths[i] for i in b] for b in picker(lengths, batch_size)]
+        # Dynamic padding: each batch is padded to its own longest row
+        padded = sum(len(b) * max(b) for b in batches if b)
+    real = sum(sum(b) for b in batches)
+    steps = max(1, -(-len(batches) // grad_accum))
+    return {
+        "mode": mode,
+        "examples": len(lengths),
+        "rows": sum(len(b) for b in batches),
+        "micro_batches": len(batches),
+        "optimizer_steps_per_epoch": steps,
+        "real_tokens": real,
+        "padded_tokens": padded,
+        "padding_ratio": round(1 - real / padded, 4) if padded else 0.0,
+        "tokens_per_step": round(real / steps, 1),
+    }
+
+
+def format_report(report):
+    return (f"{report['mode']:>6}: {report['rows']:>5} rows, "
+            f"{report['optimizer_steps_per_epoch']:>4} steps/epoch, "
+            f"{report['tokens_per_step']:>9.1f} real tokens/step, "
+            f"padding {report['padding_ratio'] * 100:5.1f}%")
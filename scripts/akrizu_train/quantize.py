@@ -0,0 +1,254 @@
+"""
+Akrizu Train — GGUF Quantization Matrix + CPU Inference Benchmark
+colab-train.py exports one trained model as several GGUF quantizations
+(QUANT_METHODS) in a single Unsloth call. This module then benchmarks each
+file on the CPU with llama.cpp (llama-cpp-python), one fresh process per file,
+over a fixed prompt set drawn from the fine-tuning data.
+
+Per quantization: file size, load time, prompt-eval and generation tokens/s
+and peak RSS, written as a JSON report and a markdown table, so the Modelfile
+FROM target is picked on numbers.
+
+Usage:
+  python -m akrizu_train.quantize model_gguf/                     # every *.gguf found
+  python -m akrizu_train.quantize model_gguf/ --methods q4_k_m q8_0 --prompts 8 --max-tokens 64
+
+Requires llama-cpp-python (CPU build).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from akrizu_train.bench import DEFAULT_DATA, peak_rss_mb
+from akrizu_train.dataset import ALPACA_PROMPT, iter_records
+
+# Exported by colab-train.py, smallest/fastest first
+QUANT_METHODS = ("q4_0", "q4_k_m", "q5_k_m", "q8_0")
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+
+
+# ─── Export (Colab) ──────────────────────────────────────
+
+def find_gguf(directory, method):
+    """Path of the GGUF file for `method` in `directory` (e.g. unsloth.Q4_K_M.gguf), or None"""
+    tag = method.upper()
+    for path in sorted(Path(directory).glob("*.gguf")):
+        if path.stem.upper().endswith(tag):
+            return path
+    return None
+
+
+def export_gguf_matrix(model, tokenizer, out_dir="model_gguf", methods=QUANT_METHODS, log=print):
+    """
+    Save every quantization in `methods` from one trained model. Unsloth
+    converts to f16 once and quantizes that file per method. Writes
+    out_dir/quantizations.json and returns {method: path}.
+    """
+    model.save_pretrained_gguf(out_dir, tokenizer, quantization_method=list(methods))
+    exported = {}
+    for method in methods:
+        path = find_gguf(out_dir, method)
+        if path is None:
+            log(f"⚠️  No GGUF file found for {method} in {out_dir}")
+            continue
+        exported[method] = path
+        log(f"📦 {method:<7} {path.name} ({path.stat().st_size / 1e9:.2f} GB)")
+    manifest = {method: {"file": path.name, "bytes": path.stat().st_size} for method, path in exported.items()}
+    (Path(out_dir) / "quantizations.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return exported
+
+
+# ─── Prompt set ──────────────────────────────────────────
+
+def prompt_set(paths, count=8):
+    """
+    `count` Alpaca prompts (response left empty) from the fine-tuning data.
+    Records are ordered by a hash of their instruction, so the set does not
+    depend on file order and stays fixed as long as the data does.
+    """
+    records = [r for r in iter_records(paths) if r.get("instruction")]
+    records.sort(key=lambda r: hashlib.sha256(r["instruction"].encode("utf-8")).hexdigest())
+    return [ALPACA_PROMPT.format(r.get("instruction", ""), r.get("input", ""), "") for r in records[:count]]
+
+
+# ─── Worker (one process per GGUF) ───────────────────────
+
+def bench_file(model_path, prompts, max_tokens=64, n_ctx=2048, threads=None):
+    """Load one GGUF with llama.cpp and time every prompt; runs inside the worker process"""
+    from llama_cpp import Llama
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    llm = Llama(model_path=str(model_path), n_ctx=n_ctx, n_threads=threads, n_gpu_layers=0,
+                seed=3407, verbose=False)
+    load_s = time.perf_counter() - start
+    rss_loaded = peak_rss_mb()
+
+    prompt_tps, gen_tps, prompt_tokens, gen_tokens = [], [], 0, 0
+    for prompt in prompts:
+        llm.reset()  # no prefix reuse between prompts: every prompt is evaluated in full
+        n_prompt = len(llm.tokenize(prompt.encode("utf-8")))
+        start = time.perf_counter()
+        first = None
+        generated = 0
+        for _ in llm.create_completion(prompt, max_tokens=max_tokens, temperature=0.0, stream=True):
+            generated += 1
+            if first is None:
+                first = time.perf_counter()
+        end = time.perf_counter()
+        if first is None:
+            continue
+        # Time to the first token is prompt evaluation; the rest is generation
+        prompt_tps.append(n_prompt / max(first - start, 1e-9))
+        if generated > 1:
+            gen_tps.append((generated - 1) / max(end - first, 1e-9))
+        prompt_tokens += n_prompt
+        gen_tokens += generated
+
+    return {
+        "load_s": round(load_s, 3),
+        "prompts": len(prompts),
+        "prompt_tokens": prompt_tokens,
+        "generated_tokens": gen_tokens,
+        "prompt_tokens_per_s": round(statistics.median(prompt_tps), 1) if prompt_tps else None,
+        "gen_tokens_per_s": round(statistics.median(gen_tps), 1) if gen_tps else None,
+        "rss_before_mb": rss_before,
+        "rss_loaded_mb": rss_loaded,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_worker(model_path, prompts_file, max_tokens, n_ctx, threads, timeout):
+    """Benchmark one file in a fresh interpreter so load time and RSS are its own"""
+    cmd = [sys.executable, "-m", "akrizu_train.quantize", "--worker", str(model_path),
+           "--prompts-file", str(prompts_file), "--max-tokens", str(max_tokens), "--n-ctx", str(n_ctx)]
+    if threads:
+        cmd += ["--threads", str(threads)]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SCRIPTS_DIR),
+                                                                      os.environ.get("PYTHONPATH")]))}
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=env, timeout=timeout)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else
+                           f"worker exited with code {proc.returncode}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ─── Benchmark ───────────────────────────────────────────
+
+def discover(directory, methods=None):
+    """{method: path} for the requested methods (default: QUANT_METHODS, then any other *.gguf)"""
+    found = {}
+    for method in methods or QUANT_METHODS:
+        path = find_gguf(directory, method)
+        if path is not None:
+            found[method] = path
+    if not methods:
+        for path in sorted(Path(directory).glob("*.gguf")):
+            if path not in found.values():
+                found[path.stem.rsplit(".", 1)[-1].lower()] = path
+    return found
+
+
+def run(args):
+    files = discover(args.directory, args.methods)
+    if not files:
+        raise SystemExit(f"✗ No GGUF files found in {args.directory}")
+    prompts = prompt_set(args.data, args.prompts)
+    if not prompts:
+        raise SystemExit("✗ No prompts: fine-tuning data is empty or missing")
+
+    report = {
+        "env": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "threads": args.threads,
+        },
+        "config": {
+            "data": [str(p) for p in args.data],
+            "prompts": len(prompts),
+            "max_tokens": args.max_tokens,
+            "n_ctx": args.n_ctx,
+        },
+        "quantizations": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        prompts_file = Path(tmp) / "prompts.json"
+        prompts_file.write_text(json.dumps(prompts), encoding="utf-8")
+        for method, path in files.items():
+            print(f"⏱️  {method:<7} {path.name} ...", flush=True)
+            entry = {"file": path.name, "size_gb": round(path.stat().st_size / 1e9, 3)}
+            try:
+                entry.update(run_worker(path, prompts_file, args.max_tokens, args.n_ctx, args.threads,
+                                        args.timeout))
+            except (RuntimeError, subprocess.TimeoutExpired, ValueError) as e:
+                entry["error"] = str(e)
+                print(f"   ✗ {e}")
+            report["quantizations"][method] = entry
+    return report
+
+
+def format_table(report):
+    """Markdown table of the per-quantization results"""
+    lines = [
+        "| Quantization | File | Size (GB) | Load (s) | Prompt tok/s | Gen tok/s | Peak RSS (MB) |",
+        "|---|---|---:|---:|---:|---:|---:|",
+    ]
+    for method, q in report["quantizations"].items():
+        if "error" in q:
+            lines.append(f"| {method} | {q['file']} | {q['size_gb']} | — | — | — | failed: {q['error']} |")
+            continue
+        cells = [q["load_s"], q["prompt_tokens_per_s"], q["gen_tokens_per_s"], q["peak_rss_mb"]]
+        lines.append(f"| {method} | {q['file']} | {q['size_gb']} | "
+                     + " | ".join("—" if c is None else str(c) for c in cells) + " |")
+    ok = {m: q for m, q in report["quantizations"].items() if q.get("gen_tokens_per_s")}
+    if ok:
+        fastest = max(ok, key=lambda m: ok[m]["gen_tokens_per_s"])
+        lines.append("")
+        lines.append(f"Fastest generation: **{fastest}** ({ok[fastest]['gen_tokens_per_s']} tok/s) — "
+                     f"`FROM ./{ok[fastest]['file']}` in the Modelfile")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPU llama.cpp benchmark of exported GGUF quantizations")
+    parser.add_argument("directory", nargs="?", default="model_gguf", help="Directory with the *.gguf files")
+    parser.add_argument("--methods", nargs="+", default=None, help=f"Subset of {', '.join(QUANT_METHODS)}")
+    parser.add_argument("--data", nargs="+", default=[str(p) for p in DEFAULT_DATA if p.exists()])
+    parser.add_argument("--prompts", type=int, default=8, help="Prompts drawn from the fine-tuning data")
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--n-ctx", type=int, default=2048)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds allowed per quantization")
+    parser.add_argument("--out", default="quant-bench.json")
+    parser.add_argument("--table", default="quant-bench.md")
+    # Internal: benchmark one file and print its JSON result
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--prompts-file", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        prompts = json.loads(Path(args.prompts_file).read_text(encoding="utf-8"))
+        print(json.dumps(bench_file(args.worker, prompts, args.max_tokens, args.n_ctx, args.threads)))
+        return 0
+
+    report = run(args)
+    table = format_table(report)
+    print(table)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    Path(args.table).write_text(table + "\n", encoding="utf-8")
+    print(f"📝 Report written to {args.out} and {args.table}")
+    return 0 if all("error" not in q for q in report["quantizations"].values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
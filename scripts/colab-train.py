@@ -5,17 +5,24 @@
 # !pip install "unsloth[colab-new] @ git+https://github.com/unslothai/unsloth.git"
 # !pip install --no-deps "xformers<0.0.27" "trl<0.9.0" peft accelerate bitsandbytes
 
-import json
+import os
 from unsloth import FastLanguageModel
 import torch
 from trl import SFTTrainer
-from transformers import TrainingArguments
-from datasets import Dataset
+from transformers import TrainingArguments, DataCollatorForLanguageModeling, default_data_collator
+from akrizu_train.dataset import build_token_cache, to_hf_dataset
+from akrizu_train.dedup import dedup_files
+from akrizu_train.packing import batch_report, format_report, packed_hf_dataset, varlen_attention
+from akrizu_train.quantize import QUANT_METHODS, export_gguf_matrix
 
 # --- CONFIGURATION ---
 max_seq_length = 2048 # Supports RoPE scaling automatically
 dtype = None # None for auto detection. Float16 for Tesla T4, V100, Bfloat16 for Ampere+
 load_in_4bit = True # Use 4bit quantization to reduce memory usage
+TRAIN_MODE = "pack" # "pack" = EOS-joined full-length rows, "bucket" = length-grouped batches, "plain"
+per_device_train_batch_size = 2
+gradient_accumulation_steps = 4
+num_train_epochs = 3 # Same passes over the data in every TRAIN_MODE (a pack step holds ~5x the examples)
 
 # 1. Load the Model
 model, tokenizer = FastLanguageModel.from_pretrained(
@@ -25,6 +32,12 @@ model, tokenizer = FastLanguageModel.from_pretrained(
     load_in_4bit = load_in_4bit,
 )
 
+# Packed rows only keep examples apart under flash-attention-2 (see akrizu_train.packing);
+# on xformers/sdpa (e.g. Colab T4, fp16) packed examples would attend to each other
+if TRAIN_MODE == "pack" and not varlen_attention(model):
+    print("⚠️  Flash-attention-2 is not active, packed examples would see each other: using TRAIN_MODE = \"bucket\"")
+    TRAIN_MODE = "bucket"
+
 # 2. Add LoRA Adapters
 model = FastLanguageModel.get_peft_model(
     model,
@@ -39,49 +52,50 @@ model = FastLanguageModel.get_peft_model(
 )
 
 # --- STEP 2: LOAD THE DATA ---
-# IMPORTANT: Upload 'fine-tuning-file.json' to Colab before running this.
-with open("fine-tuning-file.json", "r") as f:
-    raw_data = json.load(f)
-
-# Instruction Prompt Template (Standard Alpaca format)
-alpaca_prompt = """Below is an instruction that describes a task, paired with an input that provides further context. Write a response that appropriately completes the request.
-
-### Instruction:
-{}
-
-### Input:
-{}
+# IMPORTANT: Upload 'fine-tuning-file.json' (and optionally 'finetune-draft.jsonl')
+# plus the 'akrizu_train' folder to Colab before running this.
+# Records are streamed, formatted with the Alpaca template and tokenized once;
+# the token cache is keyed by a hash of data + template + tokenizer, so re-runs
+# and hyperparameter sweeps skip preprocessing entirely.
+DATA_FILES = [p for p in ["fine-tuning-file.json", "finetune-draft.jsonl"] if os.path.exists(p)]
+MERGED_FILE = "finetune-merged.jsonl" # Exact and near duplicates removed, sorted
+TOKEN_CACHE_DIR = "token_cache"
 
-### Response:
-{}"""
+dedup_files(DATA_FILES, MERGED_FILE, index_path = MERGED_FILE + ".index.npz")
+token_cache = build_token_cache([MERGED_FILE], tokenizer, max_seq_length, TOKEN_CACHE_DIR)
 
-EOS_TOKEN = tokenizer.eos_token
-def formatting_prompts_func(examples):
-    instructions = examples["instruction"]
-    inputs       = examples["input"]
-    outputs      = examples["output"]
-    texts = []
-    for instruction, input, output in zip(instructions, inputs, outputs):
-        text = alpaca_prompt.format(instruction, input, output) + EOS_TOKEN
-        texts.append(text)
-    return { "text" : texts, }
+# Effective tokens per optimizer step and padding waste for each batching mode
+for mode in ("plain", "bucket", "pack"):
+    print(format_report(batch_report(token_cache.lengths, mode, per_device_train_batch_size,
+                                     max_seq_length, gradient_accumulation_steps)))
+steps_per_epoch = batch_report(token_cache.lengths, TRAIN_MODE, per_device_train_batch_size,
+                               max_seq_length, gradient_accumulation_steps)["optimizer_steps_per_epoch"]
+print(f"Training {TRAIN_MODE}: {num_train_epochs} epochs × {steps_per_epoch} steps")
 
-dataset = Dataset.from_list(raw_data)
-dataset = dataset.map(formatting_prompts_func, batched = True,)
+if TRAIN_MODE == "pack":
+    # Rows are already max_seq_length long with per-example position_ids and labels, no attention_mask
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    dataset = packed_hf_dataset(token_cache, max_seq_length, pad_token_id)
+    data_collator = default_data_collator
+else:
+    dataset = to_hf_dataset(token_cache, with_length = TRAIN_MODE == "bucket")
+    data_collator = DataCollatorForLanguageModeling(tokenizer = tokenizer, mlm = False)
 
 # --- STEP 3: TRAIN THE BRAIN ---
 trainer = SFTTrainer(
     model = model,
     tokenizer = tokenizer,
     train_dataset = dataset,
-    dataset_text_field = "text",
+    dataset_text_field = "text", # Required by trl; unused because the dataset is pre-tokenized
     max_seq_length = max_seq_length,
-    dataset_num_proc = 2,
+    dataset_kwargs = {"skip_prepare_dataset": True},
+    data_collator = data_collator,
     args = TrainingArguments(
-        per_device_train_batch_size = 2,
-        gradient_accumulation_steps = 4,
-        warmup_steps = 5,
-        max_steps = 60, # Small dataset (133 pairs), 60 steps is usually enough for a proof of concept
+        per_device_train_batch_size = per_device_train_batch_size,
+        gradient_accumulation_steps = gradient_accumulation_steps,
+        group_by_length = TRAIN_MODE == "bucket",
+        warmup_steps = max(1, round(0.1 * num_train_epochs * steps_per_epoch)), # ~10% of training in any mode
+        num_train_epochs = num_train_epochs, # Small dataset (133 pairs), ~3 epochs is enough for a proof of concept
         learning_rate = 2e-4,
         fp16 = not torch.cuda.is_bf16_supported(),
         bf16 = torch.cuda.is_bf16_supported(),
@@ -97,6 +111,9 @@ trainer = SFTTrainer(
 trainer.train()
 
 # --- STEP 4: EXPORT FOR OLLAMA (GGUF) ---
-# This will save the model in GGUF format which you can download and use in Ollama
-model.save_pretrained_gguf("model_gguf", tokenizer, quantization_method = "q4_k_m")
-print("✅ Training Complete! Download 'model_gguf/unsloth.Q4_K_M.gguf' from the files sidebar.")
+# One GGUF per quantization in QUANT_METHODS (q4_0, q4_k_m, q5_k_m, q8_0), converted from the
+# same trained weights. Download them all, then pick the Modelfile FROM target with:
+#   python -m akrizu_train.quantize model_gguf/      (local CPU llama.cpp benchmark)
+exported = export_gguf_matrix(model, tokenizer, "model_gguf", QUANT_METHODS)
+print(f"✅ Training Complete! Download {', '.join(p.name for p in exported.values())} "
+      "(and quantizations.json) from 'model_gguf/' in the files sidebar.")
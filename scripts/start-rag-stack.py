@@ -1,14 +1,41 @@
 #!/usr/bin/env python3
 """
 Akrizu Stack Startup Automation
-Starts Ollama in WSL, pulls embeddings model, and launches RAG server + sync watcher
+Starts Ollama in WSL, pulls embeddings model, and launches RAG server + sync watcher.
+Independent services start concurrently via a dependency graph (akrizu_stack.startup).
+With --offline, local Ollama/Qdrant stand-ins (akrizu_stack.standin) replace WSL.
+With VECTOR_STORE=embedded in .env, akrizu_stack.vector_store serves QDRANT_URL.
+With --telemetry-port, CPU/RSS/IO of the spawned services is served while they run.
+Services run under the launcher daemon (akrizu_stack.daemon): a re-run attaches
+to it and reuses already-healthy services instead of repeating the cold path.
 """
 
+import argparse
 import subprocess
-import time
 import sys
 import os
+import time
 from pathlib import Path
+from urllib.parse import urlparse
+
+from akrizu_stack import daemon
+from akrizu_stack.ingest import ingest, load_config
+from akrizu_stack.models import ModelManifest, ensure_model, prewarm
+from akrizu_stack.probe import HttpProbe, port_open
+from akrizu_stack.standin import STANDIN_STATE_DIR, offline_env
+from akrizu_stack.startup import Stage, run_stages, format_timings
+from akrizu_stack.telemetry import TelemetrySampler, TelemetryServer
+
+# Persistent keep-alive probes (Ollama in WSL is reachable via localhost forwarding)
+OLLAMA_PROBE = HttpProbe("127.0.0.1", 11434, "/api/tags")
+# A 500 from /health means the server is up but Qdrant is not reachable yet
+RAG_PROBE = HttpProbe("127.0.0.1", 6444, "/health", expect=lambda status: status < 500)
+
+EMBED_MODEL = "nomic-embed-text"
+MODEL_MANIFEST = ModelManifest()
+
+# Control API client of the launcher daemon, which owns every long-running service
+DAEMON = None
 
 # ANSI colors for terminal output
 class Color:
@@ -31,183 +58,298 @@ def check_wsl():
     except (subprocess.CalledProcessError, FileNotFoundError):
         return False
 
-def check_ollama_ready(max_retries=10, delay=2, silent=False):
-    """Check if Ollama server is responding"""
+def check_ollama_ready(deadline=20, silent=False):
+    """Check if Ollama server is responding (in-process HTTP probe with backoff)"""
     if not silent:
         log("Waiting for Ollama to be ready...", Color.YELLOW)
-    for i in range(max_retries):
-        try:
-            # Try to connect to the tags endpoint
-            result = subprocess.run(
-                ["wsl", "-e", "bash", "-c", "curl -s -f http://127.0.0.1:11434/api/tags"],
-                capture_output=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                if not silent:
-                    log("✓ Ollama is ready!", Color.GREEN)
-                return True
-        except (subprocess.TimeoutExpired, Exception):
-            pass
-        
-        if i < max_retries - 1:
-            if not silent:
-                print(f"  Retry {i+1}/{max_retries}...", end='\r')
-            time.sleep(delay)
-    
-    return False
+    result = OLLAMA_PROBE.wait(deadline=deadline) if deadline > 0 else OLLAMA_PROBE.check()
+    if result.ok and not silent:
+        log(f"✓ Ollama is ready! ({result.latency * 1000:.0f}ms)", Color.GREEN)
+    return result.ok
 
 def start_ollama():
-    """Start Ollama server in WSL (background)"""
+    """Start Ollama server in WSL (background). Readiness is gated by the startup graph."""
     # First, check if it's already running
-    if check_ollama_ready(max_retries=1, delay=0, silent=True):
+    if check_ollama_ready(deadline=0, silent=True):
         log("✓ Ollama is already running.", Color.GREEN)
         return True
 
     log("Starting Ollama server in WSL...", Color.BLUE)
+    return start_service("ollama", "Ollama") is not None
+
+def start_service(name, label):
+    """Ask the daemon to start a service; returns its outcome, or None on failure"""
     try:
-        # Start Ollama in background using wsl
-        # We use CREATE_NEW_PROCESS_GROUP to ensure it lives independently of this script's console
-        subprocess.Popen(
-            ["wsl", "-e", "bash", "-c", "OLLAMA_HOST=0.0.0.0:11434 ollama serve"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == 'win32' else 0
-        )
-        
-        # Give it a moment to initialize
-        time.sleep(3)
-        
-        if check_ollama_ready(max_retries=10, delay=2):
-            log("Settle delay (2s)...", Color.YELLOW)
-            time.sleep(2)
-            return True
-        else:
-            log("✗ Ollama failed to start. Check WSL with 'ollama serve' manually.", Color.RED)
+        outcome = DAEMON.start(name)[name]
+    except (OSError, daemon.DaemonError) as e:
+        log(f"✗ Error starting {label}: {e}", Color.RED)
+        return None
+    if outcome.startswith("failed"):
+        log(f"✗ Error starting {label}: {outcome}", Color.RED)
+        return None
+    if outcome != "started":
+        log(f"✓ {label} {'already running' if outcome == 'reused' else outcome} (daemon)", Color.GREEN)
+    return outcome
+
+def owned_by_daemon(name):
+    """True when the daemon already runs `name` (so its ports are busy on purpose)"""
+    service = DAEMON.status()["services"].get(name) or {}
+    return bool(service.get("pid"))
+
+def start_standins():
+    """Start the offline Ollama + Qdrant stand-ins in the background"""
+    if not owned_by_daemon("ollama"):
+        busy = [port for port in (11434, 6333) if port_open("127.0.0.1", port)]
+        if busy:
+            log(f"✗ Port(s) {', '.join(map(str, busy))} already in use — stop the real services for --offline.",
+                Color.RED)
             return False
-    except Exception as e:
-        log(f"✗ Error starting Ollama: {e}", Color.RED)
-        return False
+        log("Starting Ollama/Qdrant stand-ins...", Color.BLUE)
+    return start_service("ollama", "stand-ins") is not None
+
+def start_vector_store(port):
+    """Serve the embedded vector store on the Qdrant port (VECTOR_STORE=embedded)"""
+    if not owned_by_daemon("vector_store"):
+        if port_open("127.0.0.1", port):
+            log(f"✗ Port {port} already in use — stop Qdrant or set VECTOR_STORE=qdrant.", Color.RED)
+            return False
+        log("Starting embedded vector store...", Color.BLUE)
+    return start_service("vector_store", "vector store") is not None
+
+def ollama_ready():
+    """Single readiness probe for the Ollama API"""
+    return check_ollama_ready(deadline=0, silent=True)
 
 def pull_embedding_model():
-    """Pull nomic-embed-text model (blocking)"""
-    log("Checking/Pulling nomic-embed-text model...", Color.BLUE)
+    """Ensure the embedding model is installed (manifest cache → /api/tags → /api/pull)"""
+    log(f"Checking {EMBED_MODEL} model...", Color.BLUE)
     try:
-        # Check if model already exists to avoid unnecessary pull time
-        list_result = subprocess.run(
-            ["wsl", "-e", "bash", "-c", "ollama list"],
-            capture_output=True,
-            text=True
-        )
-        if "nomic-embed-text" in list_result.stdout:
-            log("✓ Model 'nomic-embed-text' already present.", Color.GREEN)
-            return True
-
-        # Otherwise pull it
-        log("Model not found. Pulling now (this may take a minute)...", Color.YELLOW)
-        result = subprocess.run(
-            ["wsl", "-e", "bash", "-c", "ollama pull nomic-embed-text"],
-            check=True
-        )
-        if result.returncode == 0:
-            log("✓ Model pulled successfully!", Color.GREEN)
-            return True
-        return False
-    except subprocess.CalledProcessError as e:
-        log(f"✗ Failed to pull model: {e}", Color.RED)
+        present, source = ensure_model(EMBED_MODEL, client=OLLAMA_PROBE.client, manifest=MODEL_MANIFEST)
+        if not present:
+            log(f"✗ Model '{EMBED_MODEL}' is still missing after pull.", Color.RED)
+            return False
+        messages = {
+            "cache": f"✓ Model '{EMBED_MODEL}' present (manifest cache, digest {str(MODEL_MANIFEST.digest(EMBED_MODEL))[:12]}).",
+            "api": f"✓ Model '{EMBED_MODEL}' already present.",
+            "pulled": "✓ Model pulled successfully!",
+        }
+        log(messages[source], Color.GREEN)
+        return True
+    except Exception as e:
+        log(f"✗ Failed to check/pull model: {e}", Color.RED)
         return False
 
-def start_rag_server(rag_path):
-    """Start npm run serve in rag directory (background)"""
-    log("Starting Akrizu Knowledge server...", Color.BLUE)
+def prewarm_embedding_model():
+    """Load the model into Ollama memory so the first /api/embed is fast"""
     try:
-        npm_cmd = "npm.cmd" if sys.platform == 'win32' else "npm"
-        process = subprocess.Popen(
-            [npm_cmd, "run", "serve"],
-            cwd=rag_path,
-            creationflags=subprocess.CREATE_NEW_CONSOLE if sys.platform == 'win32' else 0
-        )
-        time.sleep(2)
-        log("✓ Akrizu server started in new terminal", Color.GREEN)
-        return process
+        took = prewarm(EMBED_MODEL, manifest=MODEL_MANIFEST)
+        log(f"✓ Model '{EMBED_MODEL}' pre-warmed ({took:.2f}s)", Color.GREEN)
+        return True
     except Exception as e:
-        log(f"✗ Error starting Akrizu server: {e}", Color.RED)
-        return None
+        log(f"⚠ Pre-warm skipped: {e}", Color.YELLOW)
+        return False
+
+def start_rag_server():
+    """Start the RAG server (node src/server.mjs) under the daemon"""
+    log("Starting Akrizu Knowledge server...", Color.BLUE)
+    return start_service("rag_server", "Akrizu server") is not None
 
-def start_sync_watcher(rag_path):
-    """Start npm run sync:watch in rag directory (background)"""
+def rag_server_ready():
+    """Ready once the HTTP server answers /health"""
+    return RAG_PROBE.check().ok
+
+def start_sync_watcher():
+    """Start the sync watcher (node src/sync.mjs --watch) under the daemon — never a second one"""
     log("Starting sync watcher...", Color.BLUE)
+    return start_service("sync_watcher", "sync watcher") is not None
+
+def sync_watcher_ready():
+    """Ready once the watcher has printed its banner (reported by the daemon)"""
+    return DAEMON.status()["services"]["sync_watcher"]["healthy"]
+
+def rebuild_collection():
+    """Re-ingest the knowledge base with batched embeddings and paged upserts"""
+    log("Rebuilding Qdrant collection from the knowledge base...", Color.BLUE)
     try:
-        npm_cmd = "npm.cmd" if sys.platform == 'win32' else "npm"
-        process = subprocess.Popen(
-            [npm_cmd, "run", "sync:watch"],
-            cwd=rag_path,
-            creationflags=subprocess.CREATE_NEW_CONSOLE if sys.platform == 'win32' else 0
-        )
-        time.sleep(1)
-        log("✓ Sync watcher started in new terminal", Color.GREEN)
-        return process
+        stats = ingest(log=log)
+        return stats["failed"] == 0
     except Exception as e:
-        log(f"✗ Error starting sync watcher: {e}", Color.RED)
-        return None
+        log(f"✗ Ingestion failed: {e}", Color.RED)
+        return False
+
+def build_stages(with_ingest=False, offline=False, vector_store_port=None):
+    """
+    Startup dependency graph:
+      wsl → ollama → model → sync_watcher
+                           → prewarm (background, optional)
+                           → ingest (only with --ingest, optional)
+      rag_server (independent — it only needs Ollama at request time)
+      vector_store (only with VECTOR_STORE=embedded; ingest waits for it)
+    Offline, the "ollama" stage starts the stand-ins and there is no wsl stage.
+    Services are spawned by the launcher daemon; the stages only wait for them.
+    """
+    if offline:
+        stages = [Stage("ollama", start_standins, ready=ollama_ready, timeout=30)]
+    else:
+        stages = [
+            Stage("wsl", check_wsl),
+            Stage("ollama", start_ollama, deps=["wsl"], ready=ollama_ready, timeout=30),
+        ]
+    stages += [
+        Stage("model", pull_embedding_model, deps=["ollama"]),
+        Stage("prewarm", prewarm_embedding_model, deps=["model"], required=False),
+        Stage("rag_server", start_rag_server, ready=rag_server_ready, timeout=30),
+        Stage("sync_watcher", start_sync_watcher, deps=["model"],
+              ready=sync_watcher_ready, timeout=15, required=False),
+    ]
+    ingest_deps = ["model"]
+    if vector_store_port and not offline:
+        probe = HttpProbe("127.0.0.1", vector_store_port, "/healthz")
+        stages.append(Stage("vector_store", lambda: start_vector_store(vector_store_port),
+                            ready=lambda: probe.check().ok, timeout=15))
+        ingest_deps.append("vector_store")
+    if with_ingest:
+        stages.append(Stage("ingest", rebuild_collection, deps=ingest_deps, required=False))
+    return stages
+
+def exit_with_error(message):
+    log(message, Color.RED)
+    input("\nPress Enter to exit...")
+    sys.exit(1)
 
 def main():
     """Main execution flow"""
+    parser = argparse.ArgumentParser(description="Start the Akrizu RAG stack")
+    parser.add_argument("--ingest", action="store_true",
+                        help="Rebuild the Qdrant collection once the embedding model is ready")
+    parser.add_argument("--offline", action="store_true",
+                        help="Use local Ollama/Qdrant stand-ins instead of WSL Ollama and a real Qdrant")
+    parser.add_argument("--telemetry-port", type=int, default=None,
+                        help="Serve CPU/RSS/IO of the spawned services on /metrics and /telemetry (Linux)")
+    parser.add_argument("--telemetry-interval", type=float, default=1.0,
+                        help="Seconds between telemetry samples")
+    parser.add_argument("--status", action="store_true", help="Show the launcher daemon's services and exit")
+    parser.add_argument("--stop", action="store_true",
+                        help="Stop every service (process groups in parallel) and the launcher daemon")
+    args = parser.parse_args()
+
+    if args.status or args.stop:
+        return daemon.main(["status" if args.status else "shutdown"])
+
     print(f"\n{Color.BOLD}{'='*60}{Color.RESET}")
     print(f"{Color.BOLD}{Color.BLUE}   🧠 Akrizu Engine Startup Automation{Color.RESET}")
     print(f"{Color.BOLD}{'='*60}{Color.RESET}\n")
-    
-    # Step 0: Check WSL
-    if not check_wsl():
-        log("✗ WSL is not available. Please install WSL first.", Color.RED)
-        input("\nPress Enter to exit...")
-        sys.exit(1)
-    
-    # Step 1: Start Ollama
-    if not start_ollama():
-        log("✗ Failed to start Ollama. Exiting.", Color.RED)
-        input("\nPress Enter to exit...")
-        sys.exit(1)
-    
-    # Step 2: Pull embedding model
-    if not pull_embedding_model():
-        log("✗ Failed to pull nomic-embed-text model. Exiting.", Color.RED)
-        input("\nPress Enter to exit...")
-        sys.exit(1)
-    
-    # Step 3: Determine paths
+
     script_dir = Path(__file__).parent.parent
     akrizu_path = script_dir / "akrizu-knowledge"
-    
+
     if not akrizu_path.exists():
-        log(f"✗ Akrizu directory not found: {akrizu_path}", Color.RED)
-        input("\nPress Enter to exit...")
-        sys.exit(1)
-    
-    # Step 4: Start Akrizu Knowledge server
-    server_process = start_rag_server(str(akrizu_path))
-    
-    # Step 5: Start sync watcher
-    sync_process = start_sync_watcher(str(akrizu_path))
-    
+        exit_with_error(f"✗ Akrizu directory not found: {akrizu_path}")
+
+    if args.offline:
+        # Inherited by the Node children and used by the in-process ingester;
+        # stand-in state (model list, cache, sync manifest) is kept apart from the real one
+        global MODEL_MANIFEST
+        os.environ.update(offline_env("http://127.0.0.1:11434", "http://127.0.0.1:6333"))
+        MODEL_MANIFEST = ModelManifest(path=akrizu_path / STANDIN_STATE_DIR / "ollama-models.json")
+        log("Offline mode: using Ollama/Qdrant stand-ins", Color.YELLOW)
+
+    config = load_config()
+    vector_store_port = None
+    if config["vector_store"] == "embedded" and not args.offline:
+        vector_store_port = urlparse(config["qdrant_url"]).port or 6333
+        log(f"Embedded vector store: {config['vector_store_path']}", Color.YELLOW)
+
+    global DAEMON
+    attach_start = time.perf_counter()
+    try:
+        DAEMON, attached = daemon.ensure(offline=args.offline)
+        status = DAEMON.status()
+    except (OSError, daemon.DaemonError) as e:
+        exit_with_error(f"✗ Launcher daemon unavailable: {e}")
+    attach_ms = (time.perf_counter() - attach_start) * 1000
+    if status["daemon"]["offline"] != args.offline:
+        mode = "offline" if status["daemon"]["offline"] else "online"
+        exit_with_error(f"✗ The running launcher daemon is {mode}. Stop it first: start-rag-stack.py --stop")
+    log(f"{'Attached to' if attached else 'Started'} launcher daemon (pid {status['daemon']['pid']}, "
+        f"{attach_ms:.0f}ms)", Color.GREEN if attached else Color.BLUE)
+
+    def on_done(result):
+        if result.ok:
+            log(f"✓ {result.name} ready in {result.duration:.2f}s", Color.GREEN)
+        elif result.required:
+            log(f"✗ {result.name}: {result.error}", Color.RED)
+        else:
+            log(f"⚠ {result.name}: {result.error}", Color.YELLOW)
+
+    telemetry = None
+    if args.telemetry_port is not None:
+        telemetry = TelemetrySampler(DAEMON.pids, interval=args.telemetry_interval)
+        if telemetry.available:
+            telemetry.start()
+            server = TelemetryServer(telemetry, port=args.telemetry_port).start()
+            log(f"Telemetry: {server.url}/metrics", Color.YELLOW)
+        else:
+            log("⚠ Telemetry needs /proc (Linux); skipped.", Color.YELLOW)
+            telemetry = None
+
+    if attached and all(s["healthy"] for s in status["services"].values()):
+        # Warm path: everything is up, only the optional ingest is left to do
+        log(f"✓ All services already healthy — reused in {attach_ms:.0f}ms", Color.GREEN)
+        results = {}
+        if args.ingest:
+            results = run_stages([Stage("ingest", rebuild_collection, required=False)], on_done=on_done)
+    else:
+        results = run_stages(build_stages(with_ingest=args.ingest, offline=args.offline,
+                                          vector_store_port=vector_store_port),
+                             on_done=on_done)
+        print(f"\n{Color.BOLD}Startup timings:{Color.RESET}")
+        print(format_timings(results))
+
+    failed = [r for r in results.values() if r.required and not r.ok]
+    if failed:
+        hints = {
+            "wsl": "✗ WSL is not available. Please install WSL first.",
+            "ollama": "✗ Ollama failed to start. Check WSL with 'ollama serve' manually.",
+            "model": f"✗ Failed to pull {EMBED_MODEL} model.",
+            "rag_server": "✗ Akrizu server did not become ready on port 6444.",
+            "vector_store": "✗ Embedded vector store did not start (python -m akrizu_stack.vector_store).",
+        }
+        for r in failed:
+            log(hints.get(r.name, f"✗ {r.name} failed"), Color.RED)
+        exit_with_error("✗ Startup failed. Exiting.")
+
     # Summary
     print(f"\n{Color.BOLD}{'='*60}{Color.RESET}")
     log("✓ All services started!", Color.GREEN)
     print(f"{Color.BOLD}{'='*60}{Color.RESET}\n")
-    
+
     print(f"{Color.YELLOW}Services running:{Color.RESET}")
-    print(f"  • Ollama Server (WSL): http://localhost:11434")
+    if args.offline:
+        print(f"  • Ollama stand-in:      http://localhost:11434")
+        print(f"  • Qdrant stand-in:      http://localhost:6333")
+    else:
+        print(f"  • Ollama Server (WSL): http://localhost:11434")
+    if vector_store_port:
+        print(f"  • Vector store:         http://localhost:{vector_store_port} (embedded)")
     print(f"  • Akrizu Dashboard:     http://localhost:6444")
-    print(f"  • Sync Watcher:         Active")
-    
-    print(f"\n{Color.YELLOW}Note:{Color.RESET} Close the spawned terminal windows to stop services.")
+    watcher = DAEMON.status()["services"]["sync_watcher"]
+    print(f"  • Sync Watcher:         {'Active' if watcher['healthy'] else 'Not running'}")
+
+    print(f"\n{Color.YELLOW}Note:{Color.RESET} Services keep running under the launcher daemon; "
+          f"re-run to attach, --stop to stop them.")
+    print(f"{Color.YELLOW}Logs:{Color.RESET}  python -m akrizu_stack.daemon logs rag_server (from scripts/)")
     print(f"{Color.YELLOW}Tip:{Color.RESET} Use the dashboard to update settings.\n")
-    
-    input("Press Enter to exit this launcher...")
+
+    if telemetry is not None:
+        input("Press Enter to stop sampling and exit this launcher...")
+        telemetry.stop()
+        print(f"\n{Color.BOLD}Resource usage:{Color.RESET}")
+        print(telemetry.format_summary())
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         log("\n✗ Interrupted by user", Color.YELLOW)
         sys.exit(0)
@@ -0,0 +1,42 @@
+"""
+Akrizu Train — Token cache tests
+Usage (from scripts/):
+  python -m unittest discover -s tests
+
+Requires tokenizers and transformers.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from akrizu_train.bench import byte_tokenizer
+from akrizu_train.dataset import build_token_cache, cache_key
+
+RECORDS = [
+    {"instruction": "Explain the rule", "input": "", "output": "Keep functions small."},
+    {"instruction": "Name the workflow", "input": "mvp", "output": "Ship the thinnest slice first."},
+]
+
+
+class TokenCacheTest(unittest.TestCase):
+    def test_second_build_in_same_process_hits_cache(self):
+        tokenizer = byte_tokenizer()
+        with tempfile.TemporaryDirectory() as tmp:
+            data = Path(tmp) / "data.json"
+            data.write_text(json.dumps(RECORDS), encoding="utf-8")
+            logs = []
+            key = cache_key([str(data)], tokenizer, 64)
+            first = build_token_cache([data], tokenizer, 64, Path(tmp) / "cache", log=logs.append)
+            # Tokenizing sets the backend's truncation state; the key must not follow it
+            self.assertEqual(cache_key([str(data)], tokenizer, 64), key)
+            second = build_token_cache([data], tokenizer, 64, Path(tmp) / "cache", log=logs.append)
+            self.assertTrue(logs[-1].startswith("📦 Token cache hit"), logs)
+            self.assertEqual(second.path, first.path)
+            self.assertEqual(second.lengths.tolist(), first.lengths.tolist())
+            del first, second
+
+
+if __name__ == "__main__":
+    unittest.main()
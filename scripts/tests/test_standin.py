@@ -0,0 +1,55 @@
+"""
+Akrizu Stack — Stand-in server tests
+Usage (from scripts/):
+  python -m unittest discover -s tests
+"""
+
+import http.client
+import json
+import unittest
+
+from akrizu_stack.standin import QdrantStandin
+from akrizu_stack.standin.common import StandinServer
+
+
+def request(conn, method, path, body=None):
+    conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+class Broken(StandinServer):
+    def __init__(self):
+        super().__init__()
+        self.route("GET", "/boom", "boom", self.boom)
+
+    def boom(self, request):
+        raise RuntimeError("handler bug")
+
+
+class DispatchErrorTest(unittest.TestCase):
+    def test_malformed_body_is_a_400_on_the_same_connection(self):
+        with QdrantStandin() as qdrant:
+            conn = http.client.HTTPConnection(qdrant.host, qdrant.port, timeout=5)
+            status, _ = request(conn, "PUT", "/collections/x", {"vectors": {"size": 2, "distance": "Cosine"}})
+            self.assertEqual(status, 200)
+            status, body = request(conn, "POST", "/collections/x/points/search", {"limit": 3})
+            self.assertEqual(status, 400)
+            self.assertIn("vector", body["status"]["error"])
+            # The connection is still usable
+            status, _ = request(conn, "POST", "/collections/x/points/delete", {"points": [1, 1]})
+            self.assertEqual(status, 200)
+            conn.close()
+
+    def test_unexpected_exception_is_a_500(self):
+        with Broken() as server:
+            conn = http.client.HTTPConnection(server.host, server.port, timeout=5)
+            status, body = request(conn, "GET", "/boom")
+            self.assertEqual(status, 500)
+            self.assertIn("handler bug", body["error"])
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Akrizu Stack — Embedded Vector Store tests
+Usage (from scripts/):
+  python -m unittest discover -s tests
+"""
+
+import http.client
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from akrizu_stack.vector_store import VectorStore, VectorStoreServer
+
+
+def point(pid, section=None):
+    vector = [float(pid), 1.0, 0.0, 0.5]
+    return {"id": pid, "vector": vector, "payload": {"section": section or f"s{pid}", "line_start": pid}}
+
+
+def state(store):
+    """Everything observable about each point: id → (payload, vector)"""
+    page, _ = store.scroll(limit=len(store) + 1)
+    return {p["id"]: (p["payload"], p["vector"].round(6).tolist()) for p in page}
+
+
+class VectorStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = VectorStore("test", 4)
+        self.store.upsert([point(pid) for pid in range(1, 6)])
+
+    def test_delete_repeated_id_removes_only_that_point(self):
+        self.store.delete({"points": [2, 2]})
+        self.assertEqual(sorted(state(self.store)), [1, 3, 4, 5])
+
+    def test_delete_keeps_rows_consistent(self):
+        expected = state(self.store)
+        self.store.delete({"points": [1, 3, 99]})
+        for pid in (1, 3):
+            del expected[pid]
+        self.assertEqual(state(self.store), expected)
+        self.assertEqual(len(self.store), 3)
+        for pid in expected:
+            self.assertEqual(self.store.get(pid)["id"], pid)
+
+    def test_delete_by_filter(self):
+        self.store.delete({"filter": {"must": [{"key": "section", "match": {"any": ["s2", "s4"]}}]}})
+        self.assertEqual(sorted(state(self.store)), [1, 3, 5])
+
+    def test_upsert_overwrites_existing_id(self):
+        self.store.upsert([point(3, "changed"), point(3, "twice")])
+        self.assertEqual(len(self.store), 5)
+        self.assertEqual(self.store.get(3)["payload"]["section"], "twice")
+
+    def test_snapshot_round_trip(self):
+        self.store.delete({"points": [2]})
+        self.store.upsert([point(7)])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.store.save(Path(tmp) / "test.akvec")
+            loaded = VectorStore.load(path)
+            self.assertEqual(state(loaded), state(self.store))
+            # The loaded store stays writable (its matrix is memory-mapped copy-on-write)
+            loaded.delete({"points": [1, 1]})
+            loaded.upsert([point(8)])
+            self.assertEqual(sorted(state(loaded)), [3, 4, 5, 7, 8])
+            score, best = loaded.search(point(8)["vector"], limit=1)[0]
+            self.assertEqual(best["id"], 8)
+            self.assertAlmostEqual(score, 1.0, places=5)
+            del loaded
+
+
+class VectorStoreServerTest(unittest.TestCase):
+    def test_dropped_collection_stays_dropped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = VectorStore("kb", 4)
+            store.upsert([point(pid) for pid in range(1, 4)])
+            snapshot = store.save(Path(tmp) / "kb.akvec")
+            # Loaded back memory-mapped, as on a restart
+            server = VectorStoreServer(port=0, path=tmp, snapshot_every=3600).start()
+            try:
+                loaded = server.collections["kb"]
+                loaded.dirty = True  # a write the snapshot thread has not saved yet
+                conn = http.client.HTTPConnection(server.host, server.port, timeout=5)
+                conn.request("DELETE", "/collections/kb")
+                response = conn.getresponse()
+                self.assertEqual(response.status, 200)
+                self.assertTrue(json.loads(response.read())["result"])
+                conn.close()
+                self.assertFalse(snapshot.exists())
+                # Windows cannot delete a mapped file: the mapping must be gone first
+                self.assertNotIsInstance(loaded._matrix, np.memmap)
+                server.save_all()
+                self.assertFalse(snapshot.exists())
+            finally:
+                server.stop()
+            self.assertFalse(snapshot.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()